@@ -27,6 +27,10 @@ class UtilityContract(BaseModel):
     entrypoints: List[EntryPoint]
     deps: List[Dependency] = []
     tests: List[str] = []
+    # Alternative names the planner may use for this utility
+    aliases: List[str] = []
+    # Entrypoints are deterministic: results may be memoized by the executor
+    cache_safe: bool = False
 
     class Config:
         title = "PrometheusBlocks Utility Contract"
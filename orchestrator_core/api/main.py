@@ -1,24 +1,48 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+import json
+import logging
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from orchestrator_core.catalog.index import load_specs
+from orchestrator_core.catalog.resolver import get_resolver
+from orchestrator_core.planner.store import get_plan_store, record_plan
+from orchestrator_core.telemetry import collect_llm_calls, memory_sink, summarize
+
+logger = logging.getLogger(__name__)
 
 WEBUI_DIR = Path(__file__).resolve().parents[2] / "webui"
 
 app = FastAPI()
 
 
+@app.middleware("http")
+async def llm_usage_middleware(request: Request, call_next):
+    """Attach a per-request summary of LLM token usage and latency."""
+    with collect_llm_calls() as llm_calls:
+        response = await call_next(request)
+    if llm_calls:
+        summary = summarize(llm_calls)
+        response.headers["X-LLM-Calls"] = str(summary["calls"])
+        response.headers["X-LLM-Input-Tokens"] = str(summary["input_tokens"])
+        response.headers["X-LLM-Output-Tokens"] = str(summary["output_tokens"])
+        response.headers["X-LLM-Wall-Ms"] = str(summary["wall_ms"])
+        logger.info("%s %s LLM usage: %s", request.method, request.url.path, summary)
+    return response
+
+
 def normalize_plan_for_scaffolding(raw_plan: Any) -> Dict[str, list]:
     """Convert various plan formats into a scaffolding-friendly dict.
 
     The scaffolder expects a ``{"resolved": [...], "missing": [...]}`` layout. This
     helper accepts execution plans returned by the planner or provided by the
-    user and extracts the needed lists.
+    user and extracts the needed lists. Names are resolved against the catalog
+    with the fuzzy name resolver, so near-misses such as
+    ``financial-document-parser`` map to the existing ``FinancialDocumentParser``.
     """
 
-    specs = load_specs()
+    resolver = get_resolver(load_specs())
 
     if isinstance(raw_plan, list):
         actions = [
@@ -26,8 +50,7 @@ def normalize_plan_for_scaffolding(raw_plan: Any) -> Dict[str, list]:
             for step in raw_plan
             if isinstance(step, dict) and "action" in step
         ]
-        resolved = [a for a in actions if a in specs]
-        missing = [a for a in actions if a not in specs]
+        resolved, missing = resolver.classify(actions)
         return {"resolved": resolved, "missing": missing}
 
     if isinstance(raw_plan, dict):
@@ -43,8 +66,7 @@ def normalize_plan_for_scaffolding(raw_plan: Any) -> Dict[str, list]:
                 for item in raw_plan.get("proposed_utilities", [])
                 if isinstance(item, dict) and item.get("name")
             ]
-            resolved = [u for u in utilities if u in specs]
-            missing = [u for u in utilities if u not in specs]
+            resolved, missing = resolver.classify(utilities)
             return {"resolved": resolved, "missing": missing}
 
         if "used_capabilities" in raw_plan or "missing_capabilities" in raw_plan:
@@ -58,8 +80,12 @@ def normalize_plan_for_scaffolding(raw_plan: Any) -> Dict[str, list]:
                 for cap in raw_plan.get("missing_capabilities", [])
                 if isinstance(cap, (str, dict))
             ]
-            resolved = [u for u in used if u in specs]
-            missing = [u for u in miss if u not in specs or u not in resolved]
+            resolved = resolver.classify(used)[0]
+            missing = []
+            for u in miss:
+                match = resolver.resolve(u)
+                if match is None or match.name not in resolved:
+                    missing.append(u)
             return {"resolved": resolved, "missing": missing}
 
     raise HTTPException(status_code=400, detail="Invalid plan format")
@@ -82,10 +108,245 @@ def plan(payload: dict):
         raise HTTPException(
             status_code=400, detail="Missing or invalid 'prompt' in payload"
         )
+    mode = payload.get("mode")
+    if mode is not None and mode not in ("llm", "local"):
+        raise HTTPException(status_code=400, detail="'mode' must be 'llm' or 'local'")
+    budget_ms = payload.get("latency_budget_ms")
+    if budget_ms is not None and mode != "local":
+        if not isinstance(budget_ms, (int, float)) or budget_ms <= 0:
+            raise HTTPException(
+                status_code=400, detail="'latency_budget_ms' must be a positive number"
+            )
+    from orchestrator_core.planner.parser import load_catalog, prompt_to_plan
+
+    # The catalog the plan is made against is also recorded with it
+    specs = load_catalog()
+    if budget_ms is not None and mode != "local":
+        # Race the LLM against the local planner; report which one won
+        from orchestrator_core.planner.hedge import hedged_prompt_to_plan
+
+        hedged = hedged_prompt_to_plan(prompt, budget_ms / 1000.0, specs=specs)
+        record_plan(prompt, hedged["plan"], source="api", specs=specs)
+        return hedged
     # Use LLM-based planner for structured execution plan
-    from orchestrator_core.planner.parser import prompt_to_plan
+    plan_steps = prompt_to_plan(
+        prompt, mode=mode, reuse=payload.get("reuse"), specs=specs
+    )
+    record_plan(prompt, plan_steps, source="api", specs=specs)
+    return plan_steps
+
+
+@app.post("/plan:batch")
+def plan_batch_endpoint(payload: dict):
+    """Plan many prompts concurrently, streaming JSON lines in completion order."""
+    prompts = payload.get("prompts")
+    if (
+        not isinstance(prompts, list)
+        or not prompts
+        or not all(isinstance(p, str) and p for p in prompts)
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="'prompts' must be a non-empty list of non-empty strings",
+        )
+    from orchestrator_core.planner.batch import (
+        DEFAULT_CONCURRENCY,
+        DEFAULT_TIMEOUT,
+        plan_batch,
+    )
+
+    try:
+        concurrency = int(payload.get("concurrency", DEFAULT_CONCURRENCY))
+        timeout = float(payload.get("timeout", DEFAULT_TIMEOUT))
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=400, detail="'concurrency' and 'timeout' must be numbers"
+        )
+    mode = payload.get("mode")
+    if mode is not None and mode not in ("llm", "local"):
+        raise HTTPException(status_code=400, detail="'mode' must be 'llm' or 'local'")
+
+    from orchestrator_core.planner.parser import load_catalog
+
+    specs = load_catalog()
+
+    async def _stream():
+        # The calls finish after the headers are sent, so the X-LLM-* headers
+        # cannot cover them; their usage is reported on the final line instead
+        with collect_llm_calls() as llm_calls:
+            async for result in plan_batch(
+                prompts,
+                concurrency,
+                timeout,
+                mode=mode,
+                reuse=payload.get("reuse"),
+                specs=specs,
+            ):
+                result["plan_id"] = record_plan(
+                    result["prompt"], result["plan"], source="api-batch", specs=specs
+                )
+                yield json.dumps(result) + "\n"
+        yield json.dumps({"llm_usage": summarize(llm_calls)}) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
 
-    return prompt_to_plan(prompt)
+
+def _execution_reply(
+    result: Any = None, exc: Optional[Exception] = None
+) -> Dict[str, Any]:
+    """Describe an execution's result, or the exception it raised, as JSON."""
+    from orchestrator_core.executor.process import ExecutionError
+
+    if exc is not None:
+        reply = {
+            "ok": False,
+            "error": getattr(exc, "error", "") or type(exc).__name__,
+            "message": str(exc),
+        }
+        if isinstance(exc, ExecutionError):
+            reply.update(stdout=exc.stdout, stderr=exc.stderr)
+        return reply
+    return {
+        "ok": True,
+        "return": result.return_value,
+        "stdout": result.stdout,
+        "stderr": result.stderr,
+    }
+
+
+@app.post("/execute")
+async def execute_endpoint(payload: dict):
+    """Execute a utility entrypoint in a scaffolded project.
+
+    With ``"follow": true`` the response streams JSON lines: one
+    ``{"stream", "data"}`` event per chunk of output as it is written, then the
+    result without ``stdout``/``stderr``. Otherwise the call is awaited, so
+    in-process ``async def`` entrypoints share the server's event loop, and
+    the result is returned once it finishes.
+    """
+    import threading
+
+    from orchestrator_core.executor.capture import OutputCapture
+    from orchestrator_core.executor.runner import (
+        EXECUTION_MODES,
+        execute_utility,
+        execute_utility_async,
+    )
+
+    project_dir = payload.get("project_dir")
+    if not isinstance(project_dir, str) or not Path(project_dir).is_dir():
+        raise HTTPException(
+            status_code=400, detail="'project_dir' must be an existing directory"
+        )
+    utility, entrypoint = payload.get("utility"), payload.get("entrypoint")
+    if not all(isinstance(v, str) and v for v in (utility, entrypoint)):
+        raise HTTPException(
+            status_code=400, detail="'utility' and 'entrypoint' must be strings"
+        )
+    params = payload.get("params", {})
+    if not isinstance(params, dict):
+        raise HTTPException(status_code=400, detail="'params' must be an object")
+    mode = payload.get("mode")
+    if mode is not None and mode not in EXECUTION_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"'mode' must be one of {EXECUTION_MODES}"
+        )
+    timeout = payload.get("timeout")
+    if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+        raise HTTPException(
+            status_code=400, detail="'timeout' must be a positive number"
+        )
+    if timeout and (mode or "inprocess") == "inprocess":
+        mode = "subprocess"
+    capture = OutputCapture()
+    cancel = threading.Event() if mode not in (None, "inprocess") else None
+
+    call = (Path(project_dir), utility, entrypoint, params)
+    options = dict(mode=mode, timeout=timeout, cancel=cancel, capture=capture)
+    if not payload.get("follow"):
+        try:
+            result = await execute_utility_async(*call, **options)
+        except Exception as exc:
+            return _execution_reply(exc=exc)
+        return _execution_reply(result)
+
+    outcome: Dict[str, Any] = {}
+
+    def worker() -> None:
+        try:
+            result = execute_utility(*call, **options)
+        except Exception as exc:
+            outcome.update(_execution_reply(exc=exc))
+        else:
+            outcome.update(_execution_reply(result))
+        capture.close()
+
+    def _stream():
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        try:
+            for stream, text in capture.follow():
+                yield json.dumps({"stream": stream, "data": text}) + "\n"
+            thread.join()
+        finally:
+            # The client went away; stop an out-of-process call early
+            if thread.is_alive() and cancel is not None:
+                cancel.set()
+        outcome.pop("stdout", None)
+        outcome.pop("stderr", None)
+        yield json.dumps(outcome) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+@app.get("/plans")
+def list_plans(
+    offset: int = 0,
+    limit: int = 20,
+    q: Optional[str] = None,
+    capability: Optional[str] = None,
+    catalog_fingerprint: Optional[str] = None,
+):
+    """Return a page of recorded plans, newest first."""
+    if offset < 0 or not 0 < limit <= 200:
+        raise HTTPException(
+            status_code=400, detail="'offset' must be >= 0 and 'limit' in 1..200"
+        )
+    return get_plan_store().search(
+        query=q,
+        capability=capability,
+        catalog_fingerprint=catalog_fingerprint,
+        offset=offset,
+        limit=limit,
+    )
+
+
+@app.get("/plans/{plan_id}")
+def get_plan(plan_id: int):
+    """Return a recorded plan with its metadata."""
+    item = get_plan_store().get(plan_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return item
+
+
+@app.post("/plans:replan")
+def replan_plans(payload: Optional[dict] = None):
+    """Incrementally replan stored plans made against older catalogs."""
+    from orchestrator_core.planner.replan import replan_stored
+
+    payload = payload or {}
+    plan_ids = payload.get("plan_ids")
+    if plan_ids is not None and (
+        not isinstance(plan_ids, list) or not all(isinstance(i, int) for i in plan_ids)
+    ):
+        raise HTTPException(
+            status_code=400, detail="'plan_ids' must be a list of integers"
+        )
+    reports = replan_stored(
+        get_plan_store(), use_llm=payload.get("use_llm", True), plan_ids=plan_ids
+    )
+    return {"replanned": reports}
 
 
 @app.post("/scaffold_project")
@@ -145,6 +406,12 @@ def scaffold_project_endpoint(payload: dict):
     return {"project_path": str(project_path)}
 
 
+@app.get("/metrics/llm")
+def llm_metrics():
+    """Return token and latency totals for recent LLM calls, per endpoint."""
+    return summarize(memory_sink.snapshot())
+
+
 @app.get("/utility/{name}")
 def get_utility_contract(name: str):
     """Return the contract for a named utility.
@@ -1,6 +1,8 @@
+import hashlib
 import json
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from packaging.version import InvalidVersion, Version
 
@@ -63,3 +65,47 @@ def load_specs() -> Dict[str, dict]:
         # If GitHub integration fails, proceed with local specs only
         pass
     return specs
+
+
+def catalog_versions(specs: Dict[str, dict]) -> Dict[str, str]:
+    """Return a mapping of utility name to version string."""
+    return {name: str(spec.get("version", "")) for name, spec in sorted(specs.items())}
+
+
+def catalog_fingerprint(specs: Dict[str, dict]) -> str:
+    """
+    Return a stable hash identifying the catalog contents (names and versions).
+    Two catalogs with the same utilities at the same versions share a fingerprint.
+    """
+    versions = sorted(catalog_versions(specs).items())
+    return hashlib.sha256(json.dumps(versions).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class CatalogDiff:
+    """Utilities added, removed and changed in version between two catalogs."""
+
+    added: Dict[str, str] = field(default_factory=dict)
+    removed: Dict[str, str] = field(default_factory=dict)
+    # name -> (old version, new version)
+    changed: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+
+    @property
+    def names(self) -> List[str]:
+        """All utility names touched by the diff."""
+        return sorted({*self.added, *self.removed, *self.changed})
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_catalogs(old: Dict[str, str], new: Dict[str, str]) -> CatalogDiff:
+    """
+    Compare two name-to-version mappings (see catalog_versions) and return what
+    was added, removed or changed version.
+    """
+    return CatalogDiff(
+        added={n: v for n, v in new.items() if n not in old},
+        removed={n: v for n, v in old.items() if n not in new},
+        changed={n: (old[n], v) for n, v in new.items() if n in old and old[n] != v},
+    )
@@ -0,0 +1,215 @@
+"""Fuzzy resolution of capability names against the catalog.
+
+Planners (and the LLM in particular) often name a utility slightly differently
+from the catalog: ``financial-document-parser`` for ``FinancialDocumentParser``,
+or a one-letter typo. Treating those as missing triggers expensive scaffolding of
+a new utility, so names are resolved in order of decreasing confidence:
+
+1. exact catalog name (confidence 1.0);
+2. same name after case/separator normalization (0.95);
+3. a declared alias of a utility, normalized (0.9);
+4. the closest normalized name or alias within a small edit distance, found with
+   a BK-tree (0.9 scaled down by the relative distance).
+
+Ambiguous matches (two utilities equally close) are not resolved.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Words in camelCase / PascalCase names, acronyms and digit runs
+_WORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+DEFAULT_MIN_CONFIDENCE = 0.75
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase ``name`` and drop case changes and separators."""
+    return "".join(word.lower() for word in _WORD_RE.findall(name or ""))
+
+
+def levenshtein(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Edit distance between ``a`` and ``b``.
+
+    With ``max_distance``, returns ``max_distance + 1`` as soon as the distance is
+    known to exceed it.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree over strings for bounded edit-distance lookup."""
+
+    def __init__(self, words: Iterable[str] = ()) -> None:
+        # node: (word, {distance: child node})
+        self._root: Optional[Tuple[str, dict]] = None
+        self._size = 0
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, word: str) -> None:
+        if self._root is None:
+            self._root = (word, {})
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = levenshtein(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                self._size += 1
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Return ``(distance, word)`` pairs within ``max_distance``, closest first."""
+        found: List[Tuple[int, str]] = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node_word, children = stack.pop()
+            distance = levenshtein(word, node_word)
+            if distance <= max_distance:
+                found.append((distance, node_word))
+            # Triangle inequality: only children in this band can be close enough
+            for d, child in children.items():
+                if distance - max_distance <= d <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """A capability name resolved to a catalog utility."""
+
+    query: str
+    name: str
+    confidence: float
+    method: str  # "exact" | "normalized" | "alias" | "fuzzy"
+
+
+def max_edit_distance(key: str) -> int:
+    """Edit distance tolerated for a normalized name; short names must match."""
+    return min(2, len(key) // 5)
+
+
+class NameResolver:
+    """Resolves names to catalog utilities by exact, normalized and fuzzy lookup."""
+
+    def __init__(
+        self,
+        specs: Dict[str, dict],
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ) -> None:
+        self.names: Set[str] = set(specs)
+        self.min_confidence = min_confidence
+        self._normalized: Dict[str, Set[str]] = {}
+        self._aliases: Dict[str, Set[str]] = {}
+        for name, spec in specs.items():
+            self._normalized.setdefault(normalize_name(name), set()).add(name)
+            aliases = spec.get("aliases") if isinstance(spec, dict) else None
+            for alias in aliases or []:
+                if isinstance(alias, str) and normalize_name(alias):
+                    self._aliases.setdefault(normalize_name(alias), set()).add(name)
+        self._tree = BKTree([*self._normalized, *self._aliases])
+
+    def _targets(self, key: str) -> Set[str]:
+        return self._normalized.get(key, set()) | self._aliases.get(key, set())
+
+    def resolve(self, query: str) -> Optional[Resolution]:
+        """Return the best catalog match for ``query``, or None."""
+        if not isinstance(query, str) or not query:
+            return None
+        if query in self.names:
+            return Resolution(query, query, 1.0, "exact")
+        key = normalize_name(query)
+        if not key:
+            return None
+        for method, confidence, table in (
+            ("normalized", 0.95, self._normalized),
+            ("alias", 0.9, self._aliases),
+        ):
+            targets = table.get(key, set())
+            if len(targets) == 1:
+                return Resolution(query, next(iter(targets)), confidence, method)
+            if targets:
+                return None
+        matches = self._tree.search(key, max_edit_distance(key))
+        if not matches:
+            return None
+        best = matches[0][0]
+        targets = set().union(*(self._targets(w) for d, w in matches if d == best))
+        if len(targets) != 1:
+            return None
+        length = max(len(key), max(len(w) for d, w in matches if d == best))
+        confidence = round(0.9 * (1 - best / length), 3)
+        if confidence < self.min_confidence:
+            return None
+        return Resolution(query, next(iter(targets)), confidence, "fuzzy")
+
+    def classify(self, names: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Split ``names`` into (resolved catalog names, unresolved names)."""
+        resolved: List[str] = []
+        missing: List[str] = []
+        for name in names:
+            match = self.resolve(name)
+            if match is None:
+                missing.append(name)
+                continue
+            if match.method != "exact":
+                logger.info(
+                    "Resolved %r to %r (%s, confidence %.2f)",
+                    name,
+                    match.name,
+                    match.method,
+                    match.confidence,
+                )
+            resolved.append(match.name)
+        return resolved, missing
+
+
+_RESOLVER_CACHE: Dict[str, NameResolver] = {}
+
+
+def get_resolver(specs: Dict[str, dict]) -> NameResolver:
+    """Return a resolver for ``specs``, rebuilding it only when the catalog changes."""
+    entries = sorted(
+        (name, str(spec.get("version", "")), spec.get("aliases") or [])
+        for name, spec in specs.items()
+        if isinstance(spec, dict)
+    )
+    key = hashlib.sha256(
+        json.dumps([len(specs), entries], default=str).encode("utf-8")
+    ).hexdigest()
+    resolver = _RESOLVER_CACHE.get(key)
+    if resolver is None:
+        resolver = NameResolver(specs)
+        # Keep only the resolver for the latest catalog
+        _RESOLVER_CACHE.clear()
+        _RESOLVER_CACHE[key] = resolver
+    return resolver
@@ -1,9 +1,13 @@
 import argparse
 import json
+import os
 import sys
+import threading
 from pathlib import Path
+from typing import Optional
 
 from orchestrator_core.catalog.index import load_specs
+from orchestrator_core.telemetry import collect_llm_calls, summarize
 from orchestrator_core.skills.core import (
     PlanningSkill,
     CodeGenerationSkill,
@@ -25,6 +29,371 @@ def _load_params(source: str) -> dict:
         sys.exit(f"Invalid JSON for parameters: {exc}")
 
 
+def _load_batch_prompts(source: str) -> list[str]:
+    """Load prompts from a JSON-lines file (strings or objects with a 'prompt' key)."""
+    path = Path(source)
+    if not path.exists():
+        sys.exit(f"Batch file '{source}' not found")
+    prompts: list[str] = []
+    for lineno, line in enumerate(path.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as exc:
+            sys.exit(f"Invalid JSON on line {lineno} of '{source}': {exc}")
+        if isinstance(item, dict):
+            item = item.get("prompt")
+        if not isinstance(item, str) or not item:
+            sys.exit(f"Line {lineno} of '{source}' has no prompt")
+        prompts.append(item)
+    return prompts
+
+
+def _plan_batch(
+    source: str,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    mode: Optional[str] = None,
+    reuse: Optional[bool] = None,
+) -> None:
+    """Plan every prompt in ``source``, printing one JSON line per result."""
+    import asyncio
+
+    from orchestrator_core.planner.batch import (
+        DEFAULT_CONCURRENCY,
+        DEFAULT_TIMEOUT,
+        plan_batch,
+    )
+    from orchestrator_core.planner.parser import load_catalog
+    from orchestrator_core.planner.store import record_plan
+
+    prompts = _load_batch_prompts(source)
+    concurrency = concurrency or DEFAULT_CONCURRENCY
+    timeout = timeout or DEFAULT_TIMEOUT
+    specs = load_catalog()
+
+    async def _run() -> None:
+        async for result in plan_batch(
+            prompts, concurrency, timeout, mode=mode, reuse=reuse, specs=specs
+        ):
+            result["plan_id"] = record_plan(
+                result["prompt"], result["plan"], source="cli-batch", specs=specs
+            )
+            print(json.dumps(result), flush=True)
+
+    asyncio.run(_run())
+
+
+def _print_plan_page(page: dict) -> None:
+    """Print a page of stored plans as a table."""
+    print("Id | Created | Capabilities | Prompt")
+    for item in page["items"]:
+        caps = ", ".join(item["capabilities"])
+        print(f"{item['id']} | {item['created_at']} | {caps} | {item['prompt']}")
+    shown = len(page["items"])
+    print(
+        f"({page['offset'] + 1 if shown else 0}-{page['offset'] + shown}"
+        f" of {page['total']})"
+    )
+
+
+def _plans(args) -> None:
+    """List, show or search plans recorded in the plan store."""
+    from orchestrator_core.planner.store import get_plan_store
+
+    store = get_plan_store()
+    if args.plans_cmd == "replan":
+        from orchestrator_core.planner.replan import replan_stored
+
+        reports = replan_stored(
+            store, use_llm=not args.no_llm, plan_ids=args.plan_ids or None
+        )
+        for report in reports:
+            print(json.dumps(report))
+        changed = sum(r["new_plan_id"] is not None for r in reports)
+        llm_calls = sum(r["llm"] for r in reports)
+        print(
+            f"{changed} of {len(reports)} affected plans replanned"
+            f" ({llm_calls} needed the LLM)",
+            file=sys.stderr,
+        )
+    elif args.plans_cmd == "show":
+        item = store.get(args.plan_id)
+        if item is None:
+            sys.exit(f"plan {args.plan_id} not found")
+        print(json.dumps(item, indent=2))
+    elif args.plans_cmd == "search":
+        _print_plan_page(
+            store.search(
+                query=args.query,
+                capability=args.capability,
+                catalog_fingerprint=args.fingerprint,
+                offset=args.offset,
+                limit=args.limit,
+            )
+        )
+    else:
+        _print_plan_page(store.list(offset=args.offset, limit=args.limit))
+
+
+def _package_store(args) -> None:
+    """Show or garbage-collect the shared package store."""
+    from orchestrator_core.executor.pkgstore import PackageStore, default_package_store
+
+    store = PackageStore(Path(args.root)) if args.root else default_package_store()
+    store = store or PackageStore(Path.home() / ".pb_store")
+    if args.store_cmd == "gc":
+        print(json.dumps(store.gc(dry_run=args.dry_run), indent=2))
+    else:
+        print(json.dumps(store.status(), indent=2))
+
+
+def _read_params_jsonl(source: str):
+    """Yield parameter dicts from a JSON-lines file or stdin, one line at a time."""
+    stream = sys.stdin if source == "-" else open(source)
+    with stream:
+        for lineno, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                params = json.loads(line)
+            except json.JSONDecodeError as exc:
+                sys.exit(f"{source}:{lineno}: invalid JSON: {exc}")
+            if not isinstance(params, dict):
+                sys.exit(f"{source}:{lineno}: expected a JSON object of parameters")
+            yield params
+
+
+def _execute_many(args) -> None:
+    """Map an entrypoint over --params-jsonl and stream JSON-lines results."""
+    from orchestrator_core.executor.batch import execute_many
+    from orchestrator_core.executor.deps import DependencyConflictError
+
+    if args.params_jsonl != "-" and not Path(args.params_jsonl).exists():
+        sys.exit(f"Parameters file '{args.params_jsonl}' not found")
+    # Batches always run in a pool of worker processes
+    if args.mode not in (None, "pool"):
+        sys.exit(
+            f"--params-jsonl runs in a worker pool; --mode {args.mode} is not supported"
+        )
+    out = open(args.output, "w") if args.output else sys.stdout
+    failed = total = 0
+    try:
+        for item in execute_many(
+            Path(args.project),
+            args.utility,
+            args.entrypoint,
+            _read_params_jsonl(args.params_jsonl),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            ordered=not args.unordered,
+            timeout=args.timeout,
+            force_reinstall=args.force_reinstall,
+            wheelhouse=Path(args.wheelhouse) if args.wheelhouse else None,
+            memory_limit=args.memory_limit * 2**20 if args.memory_limit else None,
+        ):
+            out.write(json.dumps(item.to_dict()) + "\n")
+            total += 1
+            failed += not item.ok
+    except DependencyConflictError as exc:
+        sys.exit(str(exc))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{total - failed} succeeded, {failed} failed", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+def _run_plan(args) -> None:
+    """Execute a plan against a project and print per-step timings."""
+    from orchestrator_core.executor.deps import DependencyConflictError
+    from orchestrator_core.executor.plan_runner import plan_changes, run_plan
+
+    plan_file = Path(args.plan)
+    if not plan_file.exists():
+        sys.exit(f"Plan file '{args.plan}' not found")
+    try:
+        raw_plan = json.loads(plan_file.read_text())
+    except ValueError as exc:
+        sys.exit(f"Failed to load {args.plan}: {exc}")
+    project = Path(args.project)
+    if args.state_dir:
+        state_dir = Path(args.state_dir)
+    else:
+        state_dir = project / ".pb_plan_state" / plan_file.stem
+    if args.dry_run:
+        try:
+            changes = plan_changes(project, raw_plan, state_dir)
+        except ValueError as exc:
+            sys.exit(str(exc))
+        for sid, change in changes.items():
+            action = "run" if change.rerun else "reuse"
+            print(f"{sid:>4}  {action:<6} {change.reason}")
+        return
+    try:
+        report = run_plan(
+            project,
+            raw_plan,
+            workers=args.workers,
+            fail_fast=not args.continue_on_error,
+            timeout=args.timeout,
+            force_reinstall=args.force_reinstall,
+            wheelhouse=Path(args.wheelhouse) if args.wheelhouse else None,
+            state_dir=state_dir,
+            rerun_all=args.rerun_all,
+            mode=args.mode,
+        )
+    except (DependencyConflictError, ValueError) as exc:
+        sys.exit(str(exc))
+    results = json.dumps(report.to_dict(), indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(results + "\n")
+    else:
+        print(results)
+    print(report.format(), file=sys.stderr)
+    if not report.ok:
+        sys.exit(1)
+
+
+def _output_capture(args):
+    """The capture for ``execute`` and, with --follow, a thread echoing it.
+
+    The thread copies output to stderr as it arrives and ends once the capture
+    is closed.
+    """
+    from orchestrator_core.executor.capture import OutputCapture
+
+    capture = OutputCapture(
+        limit=args.output_limit, spill=Path(args.spill) if args.spill else None
+    )
+    if not args.follow:
+        return capture, None
+
+    def echo() -> None:
+        for _, text in capture.follow():
+            sys.stderr.write(text)
+            sys.stderr.flush()
+
+    follower = threading.Thread(target=echo, daemon=True)
+    follower.start()
+    return capture, follower
+
+
+def _execution_mode(args) -> Optional[str]:
+    """Pick the execution mode when ``execute --mode`` is not given."""
+    from orchestrator_core.executor.pool import running_pool
+
+    if args.mode or args.memory_limit:
+        return args.mode or "subprocess"
+    # An explicitly configured mode wins over a running pool
+    if os.getenv("PB_EXECUTION_MODE"):
+        return os.environ["PB_EXECUTION_MODE"]
+    if running_pool(Path(args.project)) is not None:
+        return "pool"
+    # Timeouts only apply out of process
+    return "subprocess" if args.timeout else None
+
+
+def _pool(args) -> None:
+    """Serve, inspect or stop the warm worker pool of a project."""
+    from orchestrator_core.executor.pool import running_pool, serve_pool
+    from orchestrator_core.executor.runner import prepare_environment
+
+    project = Path(args.project)
+    if args.pool_cmd == "serve":
+        venv_dir = prepare_environment(project)
+        server = serve_pool(
+            project,
+            venv_dir,
+            min_workers=args.min_workers,
+            max_workers=args.max_workers,
+            idle_timeout=args.idle_timeout,
+            health_interval=args.health_interval,
+            memory_limit=args.memory_limit * 2**20 if args.memory_limit else None,
+        )
+        print(f"Worker pool for {project} listening on {server.path}")
+        with server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return
+    client = running_pool(project)
+    if client is None:
+        sys.exit(f"no worker pool is running for {project}")
+    if args.pool_cmd == "stop":
+        client.shutdown()
+        print(f"Stopped the worker pool for {project}")
+    else:
+        print(json.dumps(client.status(), indent=2))
+
+
+def _venv_template(args) -> None:
+    """Build or show the template venvs new project venvs are cloned from."""
+    from orchestrator_core.executor.venv_template import (
+        VenvTemplates,
+        common_catalog_requirements,
+        default_venv_templates,
+    )
+    from orchestrator_core.executor.wheelhouse import catalog_requirements
+
+    templates = VenvTemplates(Path(args.root)) if args.root else None
+    templates = templates or default_venv_templates()
+    templates = templates or VenvTemplates(Path.home() / ".pb_venv_templates")
+    if args.template_cmd == "build":
+        seed = list(args.requirement)
+        if args.seed_catalog:
+            seed += common_catalog_requirements(
+                catalog_requirements(load_specs()), min_utilities=args.min_utilities
+            )
+        path = templates.ensure(seed=seed, rebuild=True)
+        print(f"Template for this interpreter at {path} ({len(seed)} seeded)")
+        print(f"Clone new project venvs with: PB_VENV_TEMPLATES={templates.root}")
+    else:
+        print(json.dumps(templates.status(), indent=2))
+
+
+def _result_cache(args) -> None:
+    """Show, prune or clear the memoized entrypoint results."""
+    from orchestrator_core.executor.result_cache import (
+        ResultCache,
+        default_result_cache,
+    )
+
+    cache = ResultCache(Path(args.root)) if args.root else default_result_cache()
+    cache = cache or ResultCache(Path.home() / ".pb_result_cache")
+    if args.cache_cmd == "prune":
+        print(f"Removed {cache.prune()} entries")
+    elif args.cache_cmd == "clear":
+        print(f"Removed {cache.clear()} entries")
+    else:
+        print(json.dumps(cache.status(), indent=2))
+
+
+def _wheelhouse_build(args) -> None:
+    """Build the local wheelhouse from catalog deps and project requirements."""
+    from orchestrator_core.executor.wheelhouse import (
+        build_wheelhouse,
+        catalog_requirements,
+        default_wheelhouse,
+        project_utility_requirements,
+    )
+
+    dest = Path(args.dest) if args.dest else default_wheelhouse()
+    dest = dest or Path.home() / ".pb_wheelhouse"
+    per_utility = {}
+    if not args.no_catalog:
+        per_utility.update(catalog_requirements(load_specs()))
+    per_utility.update(project_utility_requirements(Path(p) for p in args.project))
+    if not per_utility:
+        sys.exit("no dependencies found in the catalog or the given projects")
+    manifest = build_wheelhouse(dest, per_utility)
+    print(f"{len(manifest['wheels'])} wheels in {dest}")
+    print(f"Install offline with: PB_WHEELHOUSE={dest}")
+
+
 def _list() -> None:
     """Print a table of available specs."""
     specs = load_specs()
@@ -47,17 +416,17 @@ def _show(name: str) -> None:
 
 def _self_improve(goal: str) -> None:
     """Improve the orchestrator's capabilities to achieve a goal."""
-    print(f"\U0001F9E0 Planning self-improvement for: {goal}")
+    print(f"\U0001f9e0 Planning self-improvement for: {goal}")
 
     try:
         planner = PlanningSkill()
         plan = planner.plan_self_improvement(goal)
 
-        print(f"\U0001F4CB Generated plan with {len(plan)} steps:")
+        print(f"\U0001f4cb Generated plan with {len(plan)} steps:")
         for step in plan:
             print(f"  {step['step_id']}: {step['description']}")
 
-        print("\n\u26A0\uFE0F SAFETY CHECK \u26A0\uFE0F")
+        print("\n\u26a0\ufe0f SAFETY CHECK \u26a0\ufe0f")
         print("This will modify the orchestrator codebase.")
         print("Review the plan carefully:")
         for step in plan:
@@ -83,7 +452,7 @@ def _self_improve(goal: str) -> None:
             description = step["description"]
             inputs = step.get("inputs", {})
 
-            print(f"\n\U0001F527 Executing: {description}")
+            print(f"\n\U0001f527 Executing: {description}")
 
             if action == "generate_code":
                 _execute_generate_code(inputs)
@@ -94,12 +463,12 @@ def _self_improve(goal: str) -> None:
             elif action == "test_capability":
                 _execute_test_capability(inputs)
             else:
-                print(f"\u26A0\uFE0F  Unknown action: {action}")
+                print(f"\u26a0\ufe0f  Unknown action: {action}")
 
-        print("\n\U0001F389 Self-improvement complete!")
+        print("\n\U0001f389 Self-improvement complete!")
 
     except Exception as e:
-        print(f"\u274C Self-improvement failed: {e}")
+        print(f"\u274c Self-improvement failed: {e}")
 
 
 def _execute_generate_code(inputs: dict) -> None:
@@ -117,7 +486,7 @@ def _execute_generate_code(inputs: dict) -> None:
         print(f"\u2705 Generated code: {output_path}")
 
     except Exception as e:
-        print(f"\u274C Code generation failed: {e}")
+        print(f"\u274c Code generation failed: {e}")
 
 
 def _execute_modify_existing(inputs: dict) -> None:
@@ -125,7 +494,7 @@ def _execute_modify_existing(inputs: dict) -> None:
     file_path = inputs.get("file_path", "")
     modification = inputs.get("modification", "")
 
-    print("\u26A0\uFE0F  Manual modification needed:")
+    print("\u26a0\ufe0f  Manual modification needed:")
     print(f"   File: {file_path}")
     print(f"   Change: {modification}")
     print("   (Automatic modification not implemented yet)")
@@ -134,7 +503,7 @@ def _execute_modify_existing(inputs: dict) -> None:
 def _validate_generated_code(code: str, utility_name: str) -> bool:
     """Validate that generated code is functional and not just placeholders."""
     if not code or len(code.strip()) < 50:
-        print(f"\u26A0\uFE0F  Generated code for {utility_name} is too short")
+        print(f"\u26a0\ufe0f  Generated code for {utility_name} is too short")
         return False
 
     placeholder_signs = [
@@ -148,13 +517,19 @@ def _validate_generated_code(code: str, utility_name: str) -> bool:
     ]
 
     code_lower = code.lower()
-    placeholder_count = sum(1 for sign in placeholder_signs if sign.lower() in code_lower)
+    placeholder_count = sum(
+        1 for sign in placeholder_signs if sign.lower() in code_lower
+    )
     if placeholder_count > 2:
-        print(f"\u26A0\uFE0F  Generated code for {utility_name} appears to have too many placeholders")
+        print(
+            f"\u26a0\ufe0f  Generated code for {utility_name} appears to have too many placeholders"
+        )
         return False
 
     if "def " not in code:
-        print(f"\u26A0\uFE0F  Generated code for {utility_name} doesn't contain function definitions")
+        print(
+            f"\u26a0\ufe0f  Generated code for {utility_name} doesn't contain function definitions"
+        )
         return False
 
     try:
@@ -162,7 +537,7 @@ def _validate_generated_code(code: str, utility_name: str) -> bool:
         print(f"\u2705 Generated code for {utility_name} passes syntax validation")
         return True
     except SyntaxError as e:
-        print(f"\u274C Generated code for {utility_name} has syntax errors: {e}")
+        print(f"\u274c Generated code for {utility_name} has syntax errors: {e}")
         return False
 
 
@@ -172,20 +547,28 @@ def _execute_create_utility(inputs: dict) -> None:
         name = inputs.get("name", "new_utility")
         description = inputs.get("description", "Generated utility")
 
-        print(f"\U0001F916 Using o4-mini to generate functional code for {name}...")
+        print(f"\U0001f916 Using o4-mini to generate functional code for {name}...")
 
         code_gen = CodeGenerationSkill()
 
         contract = code_gen.generate_utility_contract(name, description)
-        print(f"\U0001F4CB Generated contract for {name}")
+        print(f"\U0001f4cb Generated contract for {name}")
 
-        print(f"\U0001F9E0 o4-mini reasoning through implementation...")
-        implementation_code = code_gen.generate_complete_utility_implementation(name, description, contract)
+        print(f"\U0001f9e0 o4-mini reasoning through implementation...")
+        implementation_code = code_gen.generate_complete_utility_implementation(
+            name, description, contract
+        )
 
         if not _validate_generated_code(implementation_code, name):
-            print(f"\u26A0\uFE0F Code quality check failed for {name}. Proceeding anyway...")
-            print("\U0001F4DD Preview of generated code:")
-            print(implementation_code[:500] + "..." if len(implementation_code) > 500 else implementation_code)
+            print(
+                f"\u26a0\ufe0f Code quality check failed for {name}. Proceeding anyway..."
+            )
+            print("\U0001f4dd Preview of generated code:")
+            print(
+                implementation_code[:500] + "..."
+                if len(implementation_code) > 500
+                else implementation_code
+            )
 
         from orchestrator_core.executor.scaffolder import scaffold_project
 
@@ -199,7 +582,7 @@ def _execute_create_utility(inputs: dict) -> None:
             "https://github.com/PrometheusBlocks/block-template.git",
         )
 
-        print(f"\U0001F4DD Writing o4-mini generated code...")
+        print(f"\U0001f4dd Writing o4-mini generated code...")
 
         implementation_files = [
             project_path / name / f"{name}.py",
@@ -216,7 +599,7 @@ def _execute_create_utility(inputs: dict) -> None:
                     code_written = True
                     break
                 except Exception as e:
-                    print(f"\u26A0\uFE0F  Failed to write to {impl_file}: {e}")
+                    print(f"\u26a0\ufe0f  Failed to write to {impl_file}: {e}")
 
         if not code_written:
             standalone_file = output_dir / f"{name}_implementation.py"
@@ -226,30 +609,37 @@ def _execute_create_utility(inputs: dict) -> None:
         contract_file = project_path / name / "utility_contract.json"
         if contract_file.exists():
             import json
-            with contract_file.open('w') as f:
+
+            with contract_file.open("w") as f:
                 json.dump(contract, f, indent=2)
-            print(f"\U0001F4C4 Updated contract: {contract_file}")
+            print(f"\U0001f4c4 Updated contract: {contract_file}")
 
-        print(f"\U0001F389 Created functional utility with o4-mini: {project_path}")
-        print(f"\U0001F9EA Test the implementation:")
+        print(f"\U0001f389 Created functional utility with o4-mini: {project_path}")
+        print(f"\U0001f9ea Test the implementation:")
         print(f"   cd {project_path}/{name}")
         print(f"   python {name}.py")
 
     except Exception as e:
-        print(f"\u274C o4-mini utility creation failed: {e}")
+        print(f"\u274c o4-mini utility creation failed: {e}")
         import traceback
+
         traceback.print_exc()
 
 
 def _execute_test_capability(inputs: dict) -> None:
     """Execute capability testing step."""
     capability = inputs.get("capability", "unknown")
-    print(f"\U0001F9EA Testing capability: {capability}")
+    print(f"\U0001f9ea Testing capability: {capability}")
     print("   (Automatic testing not implemented yet)")
 
 
 def main(argv=None) -> None:
     parser = argparse.ArgumentParser("orchestrator_core")
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print token and latency totals for the LLM calls made by the command",
+    )
     sub = parser.add_subparsers(dest="cmd")
     sub.add_parser("list")
     show = sub.add_parser("show")
@@ -259,13 +649,72 @@ def main(argv=None) -> None:
         "plan",
         help="Generate execution plan from a natural language prompt (LLM-based) and write plan.json to the current directory",
     )
-    plan_p.add_argument("prompt", nargs="+", help="Prompt text for planning")
+    plan_p.add_argument("prompt", nargs="*", help="Prompt text for planning")
+    plan_p.add_argument(
+        "--batch",
+        metavar="PROMPTS_JSONL",
+        help="Plan every prompt in a JSON-lines file and stream results as JSON lines",
+    )
+    plan_p.add_argument(
+        "--local",
+        action="store_true",
+        help="Plan without the LLM using the local BM25 capability ranker",
+    )
+    plan_p.add_argument(
+        "--reuse",
+        action="store_true",
+        default=None,
+        help="Reuse the plan of a near-duplicate past prompt instead of calling the LLM",
+    )
+    plan_p.add_argument(
+        "--latency-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Race the LLM against the local planner; use the local plan if the LLM is slower",
+    )
+    plan_p.add_argument(
+        "--concurrency",
+        type=int,
+        help="Maximum concurrent LLM calls in batch mode "
+        "(default: planner.batch.DEFAULT_CONCURRENCY)",
+    )
+    plan_p.add_argument(
+        "--timeout",
+        type=float,
+        help="Per-prompt planning timeout in seconds in batch mode "
+        "(default: planner.batch.DEFAULT_TIMEOUT)",
+    )
+    plans_p = sub.add_parser("plans", help="Browse the history of generated plans")
+    plans_sub = plans_p.add_subparsers(dest="plans_cmd")
+    plans_list_p = plans_sub.add_parser("list", help="List recent plans")
+    plans_show_p = plans_sub.add_parser("show", help="Show a stored plan")
+    plans_show_p.add_argument("plan_id", type=int)
+    plans_search_p = plans_sub.add_parser("search", help="Search stored plans")
+    plans_search_p.add_argument("query", nargs="?", help="Substring of the prompt")
+    plans_search_p.add_argument("--capability", help="Only plans using this capability")
+    plans_search_p.add_argument("--fingerprint", help="Only plans for this catalog")
+    plans_replan_p = plans_sub.add_parser(
+        "replan", help="Update stored plans made against an older catalog"
+    )
+    plans_replan_p.add_argument(
+        "plan_ids", nargs="*", type=int, help="Only replan these plans"
+    )
+    plans_replan_p.add_argument(
+        "--no-llm",
+        action="store_true",
+        help="Never call the LLM; report plans that need a structural replan",
+    )
+    for page_p in (plans_p, plans_list_p, plans_search_p):
+        page_p.add_argument("--offset", type=int, default=0)
+        page_p.add_argument("--limit", type=int, default=20)
     # scaffold command to scaffold project based on plan.json
     scaffold_p = sub.add_parser(
         "scaffold",
         help="Scaffold project directories for utilities defined in plan.json",
     )
-    scaffold_p.add_argument("project_name", help="Name of the project directory to create")
+    scaffold_p.add_argument(
+        "project_name", help="Name of the project directory to create"
+    )
     scaffold_p.add_argument(
         "directory",
         help="Base directory where the project should be created",
@@ -291,25 +740,291 @@ def main(argv=None) -> None:
         default="{}",
         help="JSON string or path to JSON file with parameters",
     )
+    execute_p.add_argument(
+        "--params-jsonl",
+        help="Run once per line of this JSON-lines file ('-' for stdin) and "
+        "write one JSON result per line",
+    )
+    execute_p.add_argument(
+        "--output", help="With --params-jsonl, write results here (default: stdout)"
+    )
+    execute_p.add_argument(
+        "--workers",
+        type=int,
+        help="With --params-jsonl, worker processes (default: CPU count)",
+    )
+    execute_p.add_argument(
+        "--chunk-size",
+        type=int,
+        default=64,
+        help="With --params-jsonl, parameter sets sent to a worker at once",
+    )
+    execute_p.add_argument(
+        "--unordered",
+        action="store_true",
+        help="With --params-jsonl, write results as they finish, not in input order",
+    )
+    execute_p.add_argument(
+        "--force-reinstall",
+        action="store_true",
+        help="Reinstall requirements even if they are unchanged",
+    )
+    execute_p.add_argument(
+        "--wheelhouse",
+        help="Install offline from this wheel directory (default: $PB_WHEELHOUSE)",
+    )
+    execute_p.add_argument(
+        "--mode",
+        choices=["inprocess", "subprocess", "pool", "forkserver"],
+        help="Where the entrypoint runs (default: $PB_EXECUTION_MODE or inprocess)",
+    )
+    execute_p.add_argument(
+        "--timeout", type=float, help="Kill the entrypoint after this many seconds"
+    )
+    execute_p.add_argument(
+        "--memory-limit",
+        type=int,
+        help="Address-space limit for the entrypoint's process, in MB",
+    )
+    execute_p.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore $PB_RESULT_CACHE for this call",
+    )
+    execute_p.add_argument(
+        "--follow",
+        action="store_true",
+        help="Echo the entrypoint's output to stderr while it runs",
+    )
+    execute_p.add_argument(
+        "--output-limit",
+        type=int,
+        help="Characters of output to keep (default: $PB_OUTPUT_LIMIT or 1 Mi)",
+    )
+    execute_p.add_argument(
+        "--spill",
+        help="Also write the full stdout.log and stderr.log to this directory",
+    )
+    run_plan_p = sub.add_parser(
+        "run-plan",
+        help="Execute every step of a plan in a scaffolded project, in parallel",
+    )
+    run_plan_p.add_argument("project", help="Path to project directory")
+    run_plan_p.add_argument(
+        "--plan", default="plan.json", help="Plan file (default: plan.json)"
+    )
+    run_plan_p.add_argument(
+        "--workers", type=int, help="Steps run at once (default: CPU count)"
+    )
+    run_plan_p.add_argument(
+        "--mode",
+        choices=["pool", "inprocess"],
+        default="pool",
+        help="Run steps in pooled workers, or in this process on an event loop "
+        "so async entrypoints overlap (default: pool)",
+    )
+    run_plan_p.add_argument(
+        "--continue-on-error",
+        action="store_true",
+        help="Keep running steps that do not depend on a failed step",
+    )
+    run_plan_p.add_argument(
+        "--timeout", type=float, help="Kill a step after this many seconds"
+    )
+    run_plan_p.add_argument(
+        "--output", help="Write the JSON results here (default: stdout)"
+    )
+    run_plan_p.add_argument(
+        "--state-dir",
+        help="Where step outputs are kept between runs "
+        "(default: PROJECT/.pb_plan_state/<plan name>)",
+    )
+    run_plan_p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show which steps would run and which would be reused, and why",
+    )
+    run_plan_p.add_argument(
+        "--rerun-all",
+        action="store_true",
+        help="Run every step even if its stored output is up to date",
+    )
+    run_plan_p.add_argument(
+        "--force-reinstall",
+        action="store_true",
+        help="Reinstall requirements even if they are unchanged",
+    )
+    run_plan_p.add_argument(
+        "--wheelhouse",
+        help="Install offline from this wheel directory (default: $PB_WHEELHOUSE)",
+    )
+    store_p = sub.add_parser(
+        "package-store", help="Inspect or clean the shared package store"
+    )
+    store_p.add_argument(
+        "--root", help="Store directory (default: $PB_PACKAGE_STORE or ~/.pb_store)"
+    )
+    store_sub = store_p.add_subparsers(dest="store_cmd", required=True)
+    store_sub.add_parser("status", help="List stored packages and their references")
+    store_gc_p = store_sub.add_parser(
+        "gc", help="Delete packages no project venv uses any more"
+    )
+    store_gc_p.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be removed"
+    )
+    pool_p = sub.add_parser(
+        "pool", help="Keep warm worker processes for a project (execute --mode pool)"
+    )
+    pool_sub = pool_p.add_subparsers(dest="pool_cmd", required=True)
+    pool_serve_p = pool_sub.add_parser(
+        "serve", help="Run the project's worker pool in the foreground"
+    )
+    pool_serve_p.add_argument("project", help="Path to project directory")
+    pool_serve_p.add_argument("--min-workers", type=int, default=1)
+    pool_serve_p.add_argument("--max-workers", type=int, default=4)
+    pool_serve_p.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=300.0,
+        help="Close workers idle this many seconds (down to --min-workers)",
+    )
+    pool_serve_p.add_argument(
+        "--health-interval",
+        type=float,
+        default=30.0,
+        help="Ping idle workers this often, in seconds",
+    )
+    pool_serve_p.add_argument(
+        "--memory-limit", type=int, help="Address-space limit per worker, in MB"
+    )
+    for name, text in (("status", "Show pool workers"), ("stop", "Stop the pool")):
+        pool_sub.add_parser(name, help=text).add_argument(
+            "project", help="Path to project directory"
+        )
+    template_p = sub.add_parser(
+        "venv-template", help="Manage the template venvs project venvs are cloned from"
+    )
+    template_p.add_argument(
+        "--root",
+        help="Template directory (default: $PB_VENV_TEMPLATES or ~/.pb_venv_templates)",
+    )
+    template_sub = template_p.add_subparsers(dest="template_cmd", required=True)
+    template_sub.add_parser("status", help="List the built templates")
+    template_build_p = template_sub.add_parser(
+        "build", help="(Re)build the template for the running interpreter"
+    )
+    template_build_p.add_argument(
+        "--seed-catalog",
+        action="store_true",
+        help="Pre-install catalog deps shared by several utilities",
+    )
+    template_build_p.add_argument(
+        "--min-utilities",
+        type=int,
+        default=2,
+        help="With --seed-catalog, seed packages used by at least this many utilities",
+    )
+    template_build_p.add_argument(
+        "--requirement",
+        action="append",
+        default=[],
+        help="Also pre-install this requirement (repeatable)",
+    )
+    cache_p = sub.add_parser(
+        "result-cache", help="Manage memoized results of cache-safe utilities"
+    )
+    cache_p.add_argument(
+        "--root",
+        help="Cache directory (default: $PB_RESULT_CACHE or ~/.pb_result_cache)",
+    )
+    cache_sub = cache_p.add_subparsers(dest="cache_cmd", required=True)
+    cache_sub.add_parser("status", help="Show the number and size of entries")
+    cache_sub.add_parser("prune", help="Drop expired and over-budget entries")
+    cache_sub.add_parser("clear", help="Drop every entry")
+    wheelhouse_p = sub.add_parser(
+        "wheelhouse", help="Manage the local wheelhouse for offline installs"
+    )
+    wheelhouse_sub = wheelhouse_p.add_subparsers(dest="wheelhouse_cmd", required=True)
+    wheelhouse_build_p = wheelhouse_sub.add_parser(
+        "build", help="Build or download wheels for catalog and project dependencies"
+    )
+    wheelhouse_build_p.add_argument(
+        "--dest",
+        help="Wheel directory (default: $PB_WHEELHOUSE or ~/.pb_wheelhouse)",
+    )
+    wheelhouse_build_p.add_argument(
+        "--project",
+        action="append",
+        default=[],
+        help="Also include the utilities' requirements.txt of this project",
+    )
+    wheelhouse_build_p.add_argument(
+        "--no-catalog",
+        action="store_true",
+        help="Skip the deps declared in the catalog",
+    )
     args = parser.parse_args(argv)
+    with collect_llm_calls() as llm_calls:
+        try:
+            _dispatch(args, parser)
+        finally:
+            if args.stats:
+                print(json.dumps(summarize(llm_calls), indent=2), file=sys.stderr)
+
+
+def _dispatch(args, parser) -> None:
+    """Run the command selected on the command line."""
     if args.cmd == "list":
         _list()
     elif args.cmd == "show":
         _show(args.name)
+    elif args.cmd == "plan" and args.batch:
+        if args.prompt:
+            sys.exit("give either a prompt or --batch, not both")
+        _plan_batch(
+            args.batch,
+            args.concurrency,
+            args.timeout,
+            mode="local" if args.local else None,
+            reuse=args.reuse,
+        )
     elif args.cmd == "plan":
+        if not args.prompt:
+            sys.exit("a prompt is required unless --batch is given")
         # build and display structured execution plan via LLM parser
         prompt = " ".join(args.prompt)
-        from orchestrator_core.planner.parser import prompt_to_plan
+        from orchestrator_core.planner.parser import load_catalog, prompt_to_plan
+
+        # The catalog the plan is made against is also recorded with it
+        specs = load_catalog()
+        if args.latency_budget is not None and not args.local:
+            from orchestrator_core.planner.hedge import hedged_prompt_to_plan
 
-        plan_steps = prompt_to_plan(prompt)
+            hedged = hedged_prompt_to_plan(prompt, args.latency_budget, specs=specs)
+            plan_steps = hedged["plan"]
+            print(json.dumps(hedged["planner"]), file=sys.stderr)
+        else:
+            plan_steps = prompt_to_plan(
+                prompt,
+                mode="local" if args.local else None,
+                reuse=args.reuse,
+                specs=specs,
+            )
         # Print plan as JSON
         print(json.dumps(plan_steps, indent=2))
+        from orchestrator_core.planner.store import record_plan
+
+        plan_id = record_plan(prompt, plan_steps, source="cli", specs=specs)
+        if plan_id is not None:
+            print(f"Recorded plan {plan_id} in plan store", file=sys.stderr)
         # write plan.json to current directory
         try:
             with open("plan.json", "w") as f:
                 json.dump(plan_steps, f, indent=2)
         except Exception as e:
             print(f"Warning: failed to write plan.json: {e}", file=sys.stderr)
+    elif args.cmd == "plans":
+        _plans(args)
     elif args.cmd == "scaffold":
         plan_file = Path("plan.json")
         if not plan_file.exists():
@@ -320,9 +1035,13 @@ def main(argv=None) -> None:
             sys.exit(f"Failed to load plan.json: {e}")
         proposed = []
         if isinstance(raw_plan, dict) and "proposed_utilities" in raw_plan:
-            proposed = [u for u in raw_plan["proposed_utilities"] if isinstance(u, dict)]
+            proposed = [
+                u for u in raw_plan["proposed_utilities"] if isinstance(u, dict)
+            ]
         if not proposed:
-            sys.exit("plan.json must contain 'proposed_utilities' with utility contracts")
+            sys.exit(
+                "plan.json must contain 'proposed_utilities' with utility contracts"
+            )
         plan = {
             "resolved": [],
             "missing": [u.get("name") for u in proposed if u.get("name")],
@@ -338,12 +1057,39 @@ def main(argv=None) -> None:
         )
         print(f"Scaffolded project created at: {project_path}")
     elif args.cmd == "execute":
+        from orchestrator_core.executor.deps import DependencyConflictError
+        from orchestrator_core.executor.process import ExecutionError
         from orchestrator_core.executor.runner import execute_utility
 
+        if args.params_jsonl:
+            _execute_many(args)
+            return
         params = _load_params(args.params_json)
-        result = execute_utility(
-            Path(args.project), args.utility, args.entrypoint, params
-        )
+        capture, follower = _output_capture(args)
+        try:
+            result = execute_utility(
+                Path(args.project),
+                args.utility,
+                args.entrypoint,
+                params,
+                force_reinstall=args.force_reinstall,
+                wheelhouse=Path(args.wheelhouse) if args.wheelhouse else None,
+                mode=_execution_mode(args),
+                timeout=args.timeout,
+                memory_limit=args.memory_limit * 2**20 if args.memory_limit else None,
+                use_cache=not args.no_cache,
+                capture=capture,
+            )
+        except DependencyConflictError as exc:
+            sys.exit(str(exc))
+        except ExecutionError as exc:
+            if follower is not None:
+                follower.join()
+            if exc.traceback:
+                print(exc.traceback, file=sys.stderr, end="")
+            sys.exit(str(exc))
+        if follower is not None:
+            follower.join()
         print(
             json.dumps(
                 {
@@ -354,6 +1100,18 @@ def main(argv=None) -> None:
                 indent=2,
             )
         )
+    elif args.cmd == "run-plan":
+        _run_plan(args)
+    elif args.cmd == "package-store":
+        _package_store(args)
+    elif args.cmd == "pool":
+        _pool(args)
+    elif args.cmd == "venv-template":
+        _venv_template(args)
+    elif args.cmd == "result-cache":
+        _result_cache(args)
+    elif args.cmd == "wheelhouse":
+        _wheelhouse_build(args)
     elif args.cmd == "improve":
         goal = " ".join(args.goal)
         _self_improve(goal)
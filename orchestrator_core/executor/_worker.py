@@ -0,0 +1,372 @@
+"""Entrypoint worker run by a project venv's interpreter.
+
+Started as ``<venv>/bin/python _worker.py <project_dir> [--memory-limit BYTES]``
+with only the standard library, so it works whatever the venv has installed.
+Requests and responses travel over the process's original stdin/stdout as
+frames: a 4-byte big-endian length followed by that many bytes of UTF-8 JSON.
+Before serving, the worker moves the channel to private descriptors and points
+fds 0 and 1 at ``/dev/null`` and stderr, so nothing a utility reads or prints,
+from Python or C, can corrupt a frame.
+
+A request is ``{"utility", "entrypoint", "params"}``; the reply is
+``{"ok": true, "return", "stdout", "stderr"}`` or ``{"ok": false, "kind",
+"error", "message", "traceback", "stdout", "stderr"}`` where ``kind`` is
+``"load"`` when the entrypoint could not be imported and ``"call"`` when it
+raised. A request with ``"batch": [params, ...]`` instead of ``"params"`` runs
+the entrypoint once per item and replies ``{"ok": true, "results": [reply, ...]}``.
+An ``async def`` entrypoint is run to completion on a fresh event loop.
+``{"op": "ping"}`` is answered with ``{"ok": true}`` for health checks.
+A request with ``"stream": true`` gets its output as it is written, in
+``{"stream": "stdout" | "stderr", "data"}`` frames sent before the reply (at
+least every 50 ms), and the reply's ``stdout``/``stderr`` are then empty.
+Otherwise only the last ``PB_OUTPUT_LIMIT`` characters (default 1 Mi) of each
+stream are kept for the reply, after a ``[N characters dropped]`` line.
+The worker serves requests until stdin is closed, keeping imported utilities
+loaded in between.
+
+With ``--forkserver SOCKET`` the process instead imports the ``--preload``
+modules once, reports ``{"ok": true, "pid", "preloaded", "failed"}`` on the
+channel and then forks a child per connection on the Unix socket ``SOCKET``.
+Children share the preloaded modules' memory copy-on-write. A child first
+sends ``{"pid"}`` so the caller can kill it, then reads one request (which may
+carry a ``memory_limit``) and sends its reply. ``{"op": "preload", "modules"}``
+on the channel imports more modules into the parent (no child is forked
+meanwhile) and is answered with ``{"ok": true, "preloaded", "failed"}``. The
+fork server exits when its stdin is closed.
+"""
+
+import importlib
+import io
+import json
+import os
+import struct
+import sys
+import threading
+import traceback
+from collections import deque
+from contextlib import redirect_stderr, redirect_stdout
+
+_HEADER = struct.Struct(">I")
+_OUTPUT_LIMIT = 1 << 20
+
+
+def write_frame(stream, message) -> None:
+    """Write one JSON message as a length-prefixed frame."""
+    data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def read_frame(stream):
+    """Read one frame; return None at end of stream."""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (size,) = _HEADER.unpack(header)
+    data = stream.read(size)
+    if len(data) < size:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+def _limit_memory(limit: int) -> None:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class _OutputStreamer:
+    """Sends written output as stream frames from a background thread."""
+
+    INTERVAL = 0.05
+    MAX_PENDING = 1 << 16
+
+    def __init__(self, send) -> None:
+        self.send = send
+        self.lock = threading.Lock()
+        # [stream, [text, ...]] runs in write order
+        self.pending = []
+        self.size = 0
+        self.closed = False
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, stream: str, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        with self.lock:
+            if self.closed:
+                # A thread left behind by the utility; never after the reply
+                return sys.__stderr__.write(text)
+            if self.pending and self.pending[-1][0] == stream:
+                self.pending[-1][1].append(text)
+            else:
+                self.pending.append([stream, [text]])
+            self.size += len(text)
+            if self.size >= self.MAX_PENDING:
+                self._flush()
+        return len(text)
+
+    def _flush(self) -> None:
+        for stream, parts in self.pending:
+            self.send({"stream": stream, "data": "".join(parts)})
+        self.pending = []
+        self.size = 0
+
+    def flush(self) -> None:
+        with self.lock:
+            self._flush()
+
+    def _run(self) -> None:
+        while not self.done.wait(self.INTERVAL):
+            self.flush()
+
+    def close(self) -> None:
+        self.done.set()
+        self.thread.join()
+        with self.lock:
+            self._flush()
+            self.closed = True
+
+
+class _TailBuffer(io.TextIOBase):
+    """A text file that keeps only the last ``limit`` characters written."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self.lock = threading.Lock()
+        self.parts = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        written = len(text)
+        with self.lock:
+            if written > self.limit:
+                start = written - self.limit
+                self.dropped += start
+                text = text[start:]
+            self.parts.append(text)
+            self.size += len(text)
+            while self.size > self.limit:
+                excess = self.size - self.limit
+                if excess < len(self.parts[0]):
+                    self.parts[0] = self.parts[0][excess:]
+                else:
+                    excess = len(self.parts.popleft())
+                self.size -= excess
+                self.dropped += excess
+        return written
+
+    def getvalue(self) -> str:
+        with self.lock:
+            text = "".join(self.parts)
+            if self.dropped:
+                return f"[{self.dropped} characters dropped]\n{text}"
+            return text
+
+
+class _StreamFile(io.TextIOBase):
+    """A text file whose writes go to an :class:`_OutputStreamer`."""
+
+    def __init__(self, streamer: _OutputStreamer, name: str) -> None:
+        self.streamer = streamer
+        self.name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        return self.streamer.write(self.name, text)
+
+    def flush(self) -> None:
+        self.streamer.flush()
+
+
+def _run_async(awaitable):
+    """Run an async entrypoint's awaitable to completion."""
+    # Imported here to keep asyncio out of every worker's start-up
+    import asyncio
+
+    async def wait():
+        return await awaitable
+
+    return asyncio.run(wait())
+
+
+def handle(request, send=None) -> dict:
+    """Run one entrypoint call and build its reply.
+
+    ``send`` writes a frame to the caller; it is needed to stream output.
+    """
+    if request.get("op") == "ping":
+        return {"ok": True}
+    if "batch" in request:
+        base = {k: v for k, v in request.items() if k != "batch"}
+        results = [handle(dict(base, params=params)) for params in request["batch"]]
+        return {"ok": True, "results": results}
+    try:
+        module = importlib.import_module(request["utility"])
+        func = getattr(module, request["entrypoint"])
+    except Exception as exc:
+        return {
+            "ok": False,
+            "kind": "load",
+            "error": type(exc).__name__,
+            "message": str(exc),
+            "traceback": traceback.format_exc(),
+            "stdout": "",
+            "stderr": "",
+        }
+    streamer = None
+    if request.get("stream") and send is not None:
+        streamer = _OutputStreamer(send)
+        stdout = _StreamFile(streamer, "stdout")
+        stderr = _StreamFile(streamer, "stderr")
+    else:
+        limit = int(os.getenv("PB_OUTPUT_LIMIT") or _OUTPUT_LIMIT)
+        stdout = _TailBuffer(limit)
+        stderr = _TailBuffer(limit)
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            result = func(**request.get("params", {}))
+            if hasattr(result, "__await__"):
+                result = _run_async(result)
+        json.dumps(result)
+    except Exception as exc:
+        reply = {
+            "ok": False,
+            "kind": "call",
+            "error": type(exc).__name__,
+            "message": str(exc),
+            "traceback": traceback.format_exc(),
+        }
+    else:
+        reply = {"ok": True, "return": result}
+    if streamer is not None:
+        streamer.close()
+        reply.update(stdout="", stderr="")
+    else:
+        reply.update(stdout=stdout.getvalue(), stderr=stderr.getvalue())
+    return reply
+
+
+def open_channel():
+    """Move the request/reply channel off fds 0 and 1."""
+    channel_in = os.fdopen(os.dup(0), "rb")
+    channel_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    return channel_in, channel_out
+
+
+def serve_forks(
+    socket_path: str, preload, channel_in, channel_out, max_children: int
+) -> None:
+    """Preload modules, then fork a child to serve each socket connection."""
+    import socketserver
+    import threading
+
+    def import_all(names):
+        failed = {}
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception as exc:
+                failed[name] = f"{type(exc).__name__}: {exc}"
+        return [name for name in names if name not in failed], failed
+
+    loaded, failed = import_all(preload)
+    # Held while importing so no child is forked from a half-imported module
+    forking = threading.Lock()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            # Forked children would otherwise all draw the same numbers
+            if "random" in sys.modules:
+                sys.modules["random"].seed()
+            write_frame(self.wfile, {"pid": os.getpid()})
+            request = read_frame(self.rfile)
+            if request is None:
+                return
+            if request.get("memory_limit"):
+                _limit_memory(int(request["memory_limit"]))
+            reply = handle(request, lambda frame: write_frame(self.wfile, frame))
+            write_frame(self.wfile, reply)
+
+    class ForkServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+        def process_request(self, request, client_address) -> None:
+            with forking:
+                super().process_request(request, client_address)
+
+    ForkServer.max_children = max_children
+    server = ForkServer(socket_path, Handler)
+    os.chmod(socket_path, 0o600)
+
+    def control() -> None:
+        while True:
+            request = read_frame(channel_in)
+            if request is None:
+                break
+            if request.get("op") == "preload":
+                with forking:
+                    added, errors = import_all(request["modules"])
+                reply = {"ok": True, "preloaded": added, "failed": errors}
+            else:
+                reply = {"ok": False, "error": f"unknown op {request.get('op')!r}"}
+            write_frame(channel_out, reply)
+        server.shutdown()
+
+    threading.Thread(target=control, daemon=True).start()
+    write_frame(
+        channel_out,
+        {"ok": True, "pid": os.getpid(), "preloaded": loaded, "failed": failed},
+    )
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+def main(argv) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("project_dir")
+    parser.add_argument("--memory-limit", type=int)
+    parser.add_argument("--forkserver", metavar="SOCKET")
+    parser.add_argument("--preload", default="")
+    parser.add_argument("--max-children", type=int, default=64)
+    args = parser.parse_args(argv)
+    if args.memory_limit:
+        _limit_memory(args.memory_limit)
+    # Drop this script's own directory; the project is the import root
+    sys.path[0] = args.project_dir
+    channel_in, channel_out = open_channel()
+    if args.forkserver:
+        preload = [name for name in args.preload.split(",") if name]
+        serve_forks(
+            args.forkserver, preload, channel_in, channel_out, args.max_children
+        )
+        return
+    while True:
+        request = read_frame(channel_in)
+        if request is None:
+            return
+        reply = handle(request, lambda frame: write_frame(channel_out, frame))
+        write_frame(channel_out, reply)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,151 @@
+"""Map one entrypoint over a stream of parameter sets.
+
+:func:`execute_many` prepares the project venv once, then sends the parameter
+sets in chunks to a pool of worker processes (see :mod:`.pool`). Each chunk is
+one request that the worker runs item by item, so the per-call IPC cost is
+spread over ``chunk_size`` items. Results come back as :class:`BatchItem`
+objects, either in input order or as chunks finish.
+
+Input is read lazily and at most ``2 * workers`` chunks are in flight. Results
+are yielded as soon as possible, so memory use does not grow with the input.
+In ordered mode a slow chunk holds back later results, and no more input is read
+until it finishes.
+"""
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .pool import WorkerPool
+from .process import ExecutionError
+from .runner import prepare_environment
+
+
+@dataclass
+class BatchItem:
+    """The outcome of one parameter set."""
+
+    index: int
+    ok: bool
+    return_value: Any = None
+    stdout: str = ""
+    stderr: str = ""
+    error: str = ""
+    message: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-lines record: ``return`` on success, ``error``/``message`` if not."""
+        record: Dict[str, Any] = {"index": self.index}
+        if self.ok:
+            record["return"] = self.return_value
+        else:
+            record.update(error=self.error, message=self.message)
+        record.update(stdout=self.stdout, stderr=self.stderr)
+        return record
+
+
+def _item(index: int, reply: Dict[str, Any]) -> BatchItem:
+    if reply.get("ok"):
+        return BatchItem(
+            index,
+            True,
+            reply.get("return"),
+            reply.get("stdout", ""),
+            reply.get("stderr", ""),
+        )
+    return BatchItem(
+        index,
+        False,
+        stdout=reply.get("stdout", ""),
+        stderr=reply.get("stderr", ""),
+        error=reply.get("error", ""),
+        message=reply.get("message", ""),
+    )
+
+
+def _chunks(params: Iterable[Dict[str, Any]], size: int) -> Iterator[List[dict]]:
+    iterator = iter(params)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def execute_many(
+    project_dir: Path,
+    utility: str,
+    entrypoint: str,
+    params: Iterable[Dict[str, Any]],
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    ordered: bool = True,
+    timeout: Optional[float] = None,
+    force_reinstall: bool = False,
+    wheelhouse: Optional[Path] = None,
+    memory_limit: Optional[int] = None,
+) -> Iterator[BatchItem]:
+    """Run ``entrypoint`` once per parameter set; yield a result for each.
+
+    ``workers`` (default: CPU count) worker processes run chunks of
+    ``chunk_size`` items. With ``ordered=False`` results are yielded as chunks
+    complete. A failing item is reported in its :class:`BatchItem` and does not
+    stop the batch. ``timeout`` is a per-item budget: a chunk gets ``timeout``
+    times its size, and when it runs out every item of the chunk fails.
+    ``memory_limit`` (bytes) caps the address space of each worker process.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    workers = workers or os.cpu_count() or 1
+    venv_dir = prepare_environment(
+        project_dir, force_reinstall=force_reinstall, wheelhouse=wheelhouse
+    )
+    pool = WorkerPool(
+        project_dir,
+        venv_dir,
+        min_workers=0,
+        max_workers=workers,
+        memory_limit=memory_limit,
+    )
+
+    def run_chunk(start: int, chunk: List[dict]) -> List[BatchItem]:
+        request = {"utility": utility, "entrypoint": entrypoint, "batch": chunk}
+        budget = timeout * len(chunk) if timeout else None
+        try:
+            reply = pool.call_raw(request, timeout=budget)
+        except ExecutionError as exc:
+            return [
+                BatchItem(start + i, False, error=type(exc).__name__, message=str(exc))
+                for i in range(len(chunk))
+            ]
+        return [_item(start + i, r) for i, r in enumerate(reply["results"])]
+
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="pb-batch")
+    pending: deque = deque()
+    try:
+        start = 0
+        for chunk in _chunks(params, chunk_size):
+            pending.append(executor.submit(run_chunk, start, chunk))
+            start += len(chunk)
+            while len(pending) >= 2 * workers:
+                yield from _drain(pending, ordered)
+        while pending:
+            yield from _drain(pending, ordered)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        pool.close()
+
+
+def _drain(pending: deque, ordered: bool) -> Iterator[BatchItem]:
+    """Yield the results of the next finished chunk and forget it."""
+    if ordered:
+        yield from pending.popleft().result()
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        yield from future.result()
@@ -0,0 +1,196 @@
+"""Bounded, followable capture of an execution's stdout and stderr.
+
+An :class:`OutputCapture` belongs to one execution. Output arrives as it is
+written: from the in-process redirect below, or from the output frames of an
+out-of-process worker (see :mod:`._worker`). Only the most recent ``limit``
+characters of both streams together are kept in memory. Older output is
+dropped, or also written in full to ``<spill>/stdout.log`` and
+``<spill>/stderr.log`` when a ``spill`` directory is given. Other threads can
+:meth:`~OutputCapture.follow` the output live.
+
+In-process executions use :func:`capture_output`. It routes ``sys.stdout`` and
+``sys.stderr`` by context variable rather than swapping them for everyone, so
+concurrent executions in different threads each capture only their own output,
+and other threads keep printing normally. Threads started by the utility itself
+do not inherit the context, so their output is not captured.
+
+``PB_OUTPUT_LIMIT`` sets the default in-memory limit (characters, default 1 Mi).
+"""
+
+import contextvars
+import itertools
+import os
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Deque, Dict, Iterator, Optional, TextIO, Tuple
+
+DEFAULT_LIMIT = 1 << 20
+STREAMS = ("stdout", "stderr")
+
+
+def default_output_limit() -> int:
+    return int(os.getenv("PB_OUTPUT_LIMIT") or DEFAULT_LIMIT)
+
+
+class OutputCapture:
+    """The stdout and stderr of one execution, bounded and followable."""
+
+    def __init__(self, limit: Optional[int] = None, spill: Optional[Path] = None):
+        self.limit = max(1, limit or default_output_limit())
+        self.spill = Path(spill) if spill is not None else None
+        self.dropped: Dict[str, int] = {name: 0 for name in STREAMS}
+        self.closed = False
+        # (stream, text) in arrival order; _start counts chunks evicted so far
+        self._chunks: Deque[Tuple[str, str]] = deque()
+        self._size = 0
+        self._start = 0
+        self._cond = threading.Condition()
+        self._files: Dict[str, TextIO] = {}
+
+    def write(self, stream: str, text: str) -> None:
+        """Record ``text`` written to ``stream`` (``"stdout"`` or ``"stderr"``)."""
+        if not text:
+            return
+        with self._cond:
+            if self.closed:
+                return
+            if self.spill is not None:
+                self._spill_file(stream).write(text)
+            limit = self.limit
+            if len(text) > limit:
+                self.dropped[stream] += len(text) - limit
+                text = text[-limit:]
+            self._chunks.append((stream, text))
+            self._size += len(text)
+            while self._size > self.limit:
+                old_stream, old = self._chunks[0]
+                excess = self._size - self.limit
+                if excess < len(old):
+                    # Keep the newest part of the oldest chunk
+                    self._chunks[0] = (old_stream, old[excess:])
+                else:
+                    self._chunks.popleft()
+                    self._start += 1
+                    excess = len(old)
+                self._size -= excess
+                self.dropped[old_stream] += excess
+            self._cond.notify_all()
+
+    def _spill_file(self, stream: str) -> TextIO:
+        if stream not in self._files:
+            self.spill.mkdir(parents=True, exist_ok=True)
+            path = self.spill / f"{stream}.log"
+            self._files[stream] = path.open("w", encoding="utf-8", errors="replace")
+        return self._files[stream]
+
+    def close(self) -> None:
+        """Mark the execution finished; followers stop after the last chunk."""
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            for f in self._files.values():
+                f.close()
+            self._cond.notify_all()
+
+    def getvalue(self, stream: str) -> str:
+        """The kept output of ``stream``, noting how much was dropped."""
+        with self._cond:
+            text = "".join(t for s, t in self._chunks if s == stream)
+            dropped = self.dropped[stream]
+        if not dropped:
+            return text
+        where = f"; full output in {self.spill / f'{stream}.log'}" if self.spill else ""
+        return f"[{dropped} characters dropped{where}]\n{text}"
+
+    @property
+    def stdout(self) -> str:
+        return self.getvalue("stdout")
+
+    @property
+    def stderr(self) -> str:
+        return self.getvalue("stderr")
+
+    def follow(self, timeout: Optional[float] = None) -> Iterator[Tuple[str, str]]:
+        """Yield ``(stream, text)`` chunks as they arrive, until closed.
+
+        Starts with the output still kept. A follower that falls more than
+        ``limit`` behind skips what was dropped meanwhile. With ``timeout``, it
+        also stops after that many seconds without output.
+        """
+        index = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(
+                    lambda: self.closed or index < self._start + len(self._chunks),
+                    timeout,
+                ):
+                    return
+                index = max(index, self._start)
+                batch = list(itertools.islice(self._chunks, index - self._start, None))
+                index += len(batch)
+                done = self.closed
+            yield from batch
+            if done:
+                return
+
+
+_current: contextvars.ContextVar[Optional[OutputCapture]] = contextvars.ContextVar(
+    "pb_output_capture", default=None
+)
+_install_lock = threading.Lock()
+_active = 0
+_originals: Dict[str, TextIO] = {}
+
+
+class _Router:
+    """Stands in for sys.stdout/sys.stderr while captures are active."""
+
+    def __init__(self, name: str, original: TextIO) -> None:
+        self._name = name
+        self._original = original
+
+    def write(self, text: str) -> int:
+        capture = _current.get()
+        if capture is None:
+            return self._original.write(text)
+        capture.write(self._name, text)
+        return len(text)
+
+    def flush(self) -> None:
+        if _current.get() is None:
+            self._original.flush()
+
+    def isatty(self) -> bool:
+        return _current.get() is None and self._original.isatty()
+
+    def __getattr__(self, name: str):
+        return getattr(self._original, name)
+
+
+@contextmanager
+def capture_output(capture: OutputCapture) -> Iterator[OutputCapture]:
+    """Send this context's ``sys.stdout``/``sys.stderr`` writes to ``capture``."""
+    global _active
+    with _install_lock:
+        if _active == 0:
+            for name in STREAMS:
+                _originals[name] = getattr(sys, name)
+                setattr(sys, name, _Router(name, _originals[name]))
+        _active += 1
+    token = _current.set(capture)
+    try:
+        yield capture
+    finally:
+        _current.reset(token)
+        with _install_lock:
+            _active -= 1
+            if _active == 0:
+                for name in STREAMS:
+                    # Leave streams alone that someone else replaced meanwhile
+                    if isinstance(getattr(sys, name), _Router):
+                        setattr(sys, name, _originals[name])
+                _originals.clear()
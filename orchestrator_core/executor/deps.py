@@ -0,0 +1,193 @@
+"""Merge the dependencies of every utility in a project into one requirement set.
+
+Each utility contributes the lines of its ``requirements.txt`` and the ``deps``
+declared in its ``utility_contract.json``. Requirements on the same package (and
+environment marker) are merged by intersecting their version specifiers, so the
+whole project is resolved and installed by a single installer run instead of one
+pip process per utility that may undo the previous one's pins. Packages whose
+merged specifiers cannot be satisfied are reported per utility before anything is
+installed.
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+# Option lines whose argument is a path relative to the requirements file
+_PATH_OPTIONS = ("-r", "--requirement", "-c", "--constraint", "-e", "--editable")
+
+
+@dataclass
+class DependencyConflict:
+    """A package whose requirements from different utilities cannot all hold."""
+
+    package: str
+    # (utility, requirement as declared)
+    sources: List[Tuple[str, str]]
+
+    def __str__(self) -> str:
+        wanted = "; ".join(f"{util} wants {req}" for util, req in self.sources)
+        return f"{self.package}: {wanted}"
+
+
+class DependencyConflictError(RuntimeError):
+    """Raised when utility requirements conflict; lists every conflict."""
+
+    def __init__(self, conflicts: List[DependencyConflict]) -> None:
+        self.conflicts = conflicts
+        lines = "\n".join(f"  {c}" for c in conflicts)
+        super().__init__(f"Conflicting utility requirements:\n{lines}")
+
+
+@dataclass
+class _Merged:
+    name: str
+    extras: set
+    specifier: SpecifierSet
+    marker: str
+    url: Optional[str]
+    sources: List[Tuple[str, str]] = field(default_factory=list)
+
+    def line(self) -> str:
+        text = self.name
+        if self.extras:
+            text += f"[{','.join(sorted(self.extras))}]"
+        text += f" @ {self.url}" if self.url else str(self.specifier)
+        if self.marker:
+            text += f"; {self.marker}"
+        return text
+
+
+@dataclass
+class MergedRequirements:
+    """The merged requirement set of a project."""
+
+    requirements: List[str] = field(default_factory=list)
+    # Option lines and non-PEP 508 entries, passed through unchanged
+    passthrough: List[str] = field(default_factory=list)
+    conflicts: List[DependencyConflict] = field(default_factory=list)
+    # Utility -> the requirements it declared
+    by_utility: Dict[str, List[str]] = field(default_factory=dict)
+
+    def text(self) -> str:
+        """Render as a requirements file."""
+        return "".join(f"{line}\n" for line in self.passthrough + self.requirements)
+
+
+def contract_requirement(dep: dict) -> Optional[str]:
+    """Turn a contract ``{"package", "version"}`` dependency into a requirement."""
+    package = str(dep.get("package", "")).strip()
+    version = str(dep.get("version", "")).strip()
+    if not package:
+        return None
+    if version in ("", "*"):
+        return package
+    if version[0] in "<>=!~":
+        return f"{package}{version}"
+    return f"{package}=={version}"
+
+
+def _absolutize(line: str, base: Path) -> str:
+    option, _, arg = line.partition(" ")
+    arg = arg.strip()
+    if option in _PATH_OPTIONS and arg and "://" not in arg:
+        path = Path(arg)
+        if not path.is_absolute():
+            return f"{option} {base / path}"
+    return line
+
+
+def utility_requirements(util_dir: Path) -> List[str]:
+    """Return a utility's requirement lines from requirements.txt and its contract."""
+    lines: List[str] = []
+    req_file = util_dir / "requirements.txt"
+    if req_file.exists():
+        for raw in req_file.read_text().splitlines():
+            line = raw.split(" #", 1)[0].strip()
+            if line and not line.startswith("#"):
+                lines.append(_absolutize(line, util_dir))
+    contract_file = util_dir / "utility_contract.json"
+    if contract_file.exists():
+        try:
+            deps = json.loads(contract_file.read_text()).get("deps") or []
+        except (ValueError, AttributeError):
+            deps = []
+        for dep in deps:
+            req = contract_requirement(dep) if isinstance(dep, dict) else None
+            if req:
+                lines.append(req)
+    return lines
+
+
+def _satisfiable(specifier: SpecifierSet) -> bool:
+    """Whether some version can satisfy ``specifier``.
+
+    Probes the zero version (for ranges with only upper bounds), the versions
+    named in the specifiers and a version just above each; disjoint ranges and
+    clashing pins are caught, odd corner cases are let through.
+    """
+    if not str(specifier):
+        return True
+    candidates = [Version("0")]
+    for spec in specifier:
+        text = spec.version.rstrip(".*")
+        for probe in (text, f"{text}.0.1"):
+            try:
+                candidates.append(Version(probe))
+            except InvalidVersion:
+                continue
+    return any(specifier.contains(v, prereleases=True) for v in candidates)
+
+
+def merge_requirements(per_utility: Dict[str, List[str]]) -> MergedRequirements:
+    """Merge requirement lines declared by each utility into one set."""
+    result = MergedRequirements(by_utility=dict(per_utility))
+    merged: Dict[Tuple[str, str], _Merged] = {}
+    clashing_urls = set()
+    for utility in sorted(per_utility):
+        for line in per_utility[utility]:
+            try:
+                req = Requirement(line)
+            except InvalidRequirement:
+                if line not in result.passthrough:
+                    result.passthrough.append(line)
+                continue
+            marker = str(req.marker) if req.marker else ""
+            key = (canonicalize_name(req.name), marker)
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = _Merged(
+                    req.name, set(req.extras), req.specifier, marker, req.url
+                )
+            else:
+                entry.extras |= req.extras
+                entry.specifier &= req.specifier
+                if req.url and entry.url and req.url != entry.url:
+                    clashing_urls.add(key)
+                entry.url = entry.url or req.url
+            entry.sources.append((utility, line))
+    for key in sorted(merged):
+        entry = merged[key]
+        if key in clashing_urls or not _satisfiable(entry.specifier):
+            result.conflicts.append(DependencyConflict(entry.name, entry.sources))
+        else:
+            result.requirements.append(entry.line())
+    return result
+
+
+def project_requirements(project_dir: Path) -> MergedRequirements:
+    """Merge the requirements of every utility directory in ``project_dir``."""
+    per_utility = {}
+    for util_dir in sorted(project_dir.iterdir()):
+        if not util_dir.is_dir() or util_dir.name == "venv":
+            continue
+        lines = utility_requirements(util_dir)
+        if lines:
+            per_utility[util_dir.name] = lines
+    return merge_requirements(per_utility)
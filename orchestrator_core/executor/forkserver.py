@@ -0,0 +1,231 @@
+"""Fork server that serves each job from a parent with utilities preloaded.
+
+A :class:`ForkServer` is the project venv's interpreter running :mod:`._worker`
+in fork-server mode. It imports a configurable set of modules once (utility
+packages and anything heavy they depend on, e.g. ``pandas``), then forks a
+child per job. Children start in about a millisecond with every preloaded
+module in place, and share those pages with the parent copy-on-write, so
+dozens of parallel jobs cost little more memory than one. Each job runs in its
+own child, so a crash, timeout or memory limit affects only that job.
+
+The modules to preload come from the ``preload`` argument and
+``PB_FORKSERVER_PRELOAD`` (comma-separated) when the server starts; the executor
+adds each utility it runs, importing it into the running server the first
+time it is asked for. Modules that fail to preload are still imported by the
+jobs that need them, just not shared. Unix only.
+"""
+
+import atexit
+import logging
+import os
+import signal
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from ._worker import read_frame, write_frame
+from .pool import _connect, _socket_dir
+from .process import (
+    WORKER_SCRIPT,
+    OutputCallback,
+    no_reply_error,
+    read_reply,
+    reply_result,
+    streaming,
+    venv_python,
+    watchdog,
+)
+from .runner import environment_version
+
+logger = logging.getLogger(__name__)
+
+
+def default_preload() -> List[str]:
+    """Modules listed in ``PB_FORKSERVER_PRELOAD``."""
+    value = os.getenv("PB_FORKSERVER_PRELOAD", "")
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class ForkServer:
+    """A preloaded parent process that forks one child per job."""
+
+    def __init__(
+        self,
+        project_dir: Path,
+        venv_dir: Path,
+        preload: Iterable[str] = (),
+        max_children: int = 64,
+    ) -> None:
+        if not hasattr(os, "fork"):
+            raise RuntimeError("the forkserver execution mode needs os.fork")
+        self.project_dir = Path(project_dir).absolute()
+        self.socket_path = _socket_dir() / (
+            f"pb-fork-{os.getpid()}-{uuid.uuid4().hex[:12]}.sock"
+        )
+        args = [
+            str(venv_python(Path(venv_dir).absolute())),
+            str(WORKER_SCRIPT),
+            str(self.project_dir),
+            "--forkserver",
+            str(self.socket_path),
+            "--preload",
+            ",".join(preload),
+            "--max-children",
+            str(max_children),
+        ]
+        self.proc = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=str(self.project_dir),
+        )
+        ready = read_frame(self.proc.stdout)
+        if ready is None:
+            self.proc.wait()
+            raise RuntimeError(
+                f"Fork server for {self.project_dir} exited with code"
+                f" {self.proc.returncode}"
+            )
+        self.env_version = environment_version(Path(venv_dir))
+        self.preloaded: List[str] = ready["preloaded"]
+        self.failed: Dict[str, str] = ready["failed"]
+        for name, error in self.failed.items():
+            logger.warning("Fork server could not preload %s: %s", name, error)
+        logger.debug("Fork server %s preloaded %s", self.proc.pid, self.preloaded)
+        self._control = threading.Lock()
+
+    def preload(self, modules: Iterable[str]) -> None:
+        """Import more modules into the running server so later jobs share them.
+
+        Modules already preloaded, or that already failed, are skipped.
+        """
+        with self._control:
+            wanted = [
+                name
+                for name in modules
+                if name not in self.preloaded and name not in self.failed
+            ]
+            if not wanted:
+                return
+            write_frame(self.proc.stdin, {"op": "preload", "modules": wanted})
+            reply = read_frame(self.proc.stdout)
+            if reply is None:
+                raise RuntimeError(f"Fork server for {self.project_dir} exited")
+            self.preloaded.extend(reply["preloaded"])
+            self.failed.update(reply["failed"])
+            for name, error in reply["failed"].items():
+                logger.warning("Fork server could not preload %s: %s", name, error)
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def call_raw(
+        self,
+        request: Dict[str, Any],
+        timeout: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        cancel: Optional[threading.Event] = None,
+        on_output: Optional[OutputCallback] = None,
+    ) -> Dict[str, Any]:
+        """Run one request in a freshly forked child and return its reply."""
+        if memory_limit:
+            request = dict(request, memory_limit=int(memory_limit))
+        child: List[int] = []
+
+        def kill() -> None:
+            if child:
+                try:
+                    os.kill(child[0], signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+        reply = None
+        with _connect(self.socket_path) as sock:
+            stream = sock.makefile("rwb")
+            with stream, watchdog(timeout, cancel, kill) as stopped:
+                try:
+                    # The child introduces itself so it can be killed
+                    hello = read_frame(stream)
+                    if hello is not None:
+                        child.append(hello["pid"])
+                        write_frame(stream, streaming(request, on_output))
+                        reply = read_reply(stream, on_output)
+                except (OSError, ValueError):
+                    reply = None
+        if reply is not None:
+            return reply
+        raise no_reply_error(
+            request, stopped, timeout, f"Forked worker for {request['utility']} died"
+        )
+
+    def call(
+        self,
+        utility: str,
+        entrypoint: str,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        cancel: Optional[threading.Event] = None,
+        on_output: Optional[OutputCallback] = None,
+    ):
+        """Run an entrypoint in a forked child; return (value, stdout, stderr)."""
+        request = {"utility": utility, "entrypoint": entrypoint, "params": params}
+        reply = self.call_raw(request, timeout, memory_limit, cancel, on_output)
+        return reply_result(request, reply)
+
+    def close(self) -> None:
+        """Stop the fork server; running children finish first."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+_servers: Dict[str, ForkServer] = {}
+_servers_lock = threading.Lock()
+
+
+def get_forkserver(
+    project_dir: Path, venv_dir: Path, preload: Iterable[str] = ()
+) -> ForkServer:
+    """Return this process's fork server for a project, starting it if needed.
+
+    ``preload`` and ``PB_FORKSERVER_PRELOAD`` are read when the server starts.
+    Modules in ``preload`` that a running server has not imported yet are
+    imported into it before it is returned. A server started before the venv
+    was last reinstalled is replaced.
+    """
+    key = str(Path(project_dir).absolute())
+    with _servers_lock:
+        server = _servers.get(key)
+        if server is not None and server.env_version != environment_version(
+            Path(venv_dir)
+        ):
+            logger.info("Venv changed; restarting fork server")
+            server.close()
+            server = None
+        if server is None or not server.alive:
+            wanted = list(dict.fromkeys(list(preload) + default_preload()))
+            server = _servers[key] = ForkServer(project_dir, venv_dir, preload=wanted)
+    server.preload(preload)
+    return server
+
+
+@atexit.register
+def close_forkservers() -> None:
+    """Stop every fork server started by :func:`get_forkserver`."""
+    with _servers_lock:
+        servers = list(_servers.values())
+        _servers.clear()
+    for server in servers:
+        server.close()
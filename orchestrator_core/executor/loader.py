@@ -0,0 +1,118 @@
+"""Import utilities of a project without touching ``sys.path``.
+
+Each project directory gets a synthetic package, ``_pb_projects.p<hash>``, whose
+``__path__`` is the project directory. A utility is imported as a submodule of
+that package, so the standard path finder locates it in the project only.
+Projects that both ship a ``myutil`` therefore get separate modules, and
+nothing is added to ``sys.path`` for other threads to resolve against. Imports
+run under the import system's per-module locks, so concurrent executions can
+load utilities safely.
+
+While a utility is first imported, absolute imports of the project's own
+modules (``from myutil.core import run`` in ``myutil/__init__.py``) resolve to
+the same namespaced modules, so nothing is imported twice. These first imports
+run one at a time, and the plain names only exist in ``sys.modules`` while
+they do. Imports made later, inside entrypoint functions, should be relative
+(``from . import helpers``).
+"""
+
+import hashlib
+import importlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, List
+
+NAMESPACE = "_pb_projects"
+_lock = threading.Lock()
+_alias_lock = threading.RLock()
+
+
+def _package(name: str, path: str = None) -> ModuleType:
+    """Create and register an empty package searching ``path`` (if any)."""
+    spec = importlib.machinery.ModuleSpec(name, None, is_package=True)
+    spec.submodule_search_locations = [path] if path else []
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    return module
+
+
+def project_package(project_dir: Path) -> str:
+    """Return the name of the package that holds a project's utilities."""
+    path = os.path.realpath(project_dir)
+    digest = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+    name = f"{NAMESPACE}.p{digest}"
+    if name in sys.modules:
+        return name
+    with _lock:
+        root = sys.modules.get(NAMESPACE) or _package(NAMESPACE)
+        if name not in sys.modules:
+            setattr(root, name.rpartition(".")[2], _package(name, path))
+    return name
+
+
+class _AliasFinder(importlib.abc.MetaPathFinder):
+    """Resolves a project's top-level names to its namespaced modules.
+
+    Installed by :func:`load_utility` for one import, and only answers the
+    thread that installed it.
+    """
+
+    def __init__(self, package: str) -> None:
+        self.package = package
+        self.path = sys.modules[package].__path__[0]
+        self.thread = threading.get_ident()
+        self.aliases: List[str] = []
+
+    def find_spec(self, fullname, path=None, target=None):
+        if threading.get_ident() != self.thread:
+            return None
+        top = fullname.partition(".")[0]
+        spec = importlib.machinery.PathFinder.find_spec(top, [self.path])
+        # Plain directories such as the venv are not the project's modules
+        if spec is None or spec.origin is None:
+            return None
+        return importlib.util.spec_from_loader(fullname, _AliasLoader(self))
+
+
+class _AliasLoader(importlib.abc.Loader):
+    """Puts the namespaced module in ``sys.modules`` under its plain name."""
+
+    def __init__(self, finder: _AliasFinder) -> None:
+        self.finder = finder
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module: ModuleType) -> None:
+        name = module.__name__
+        # The import system returns whatever sys.modules holds afterwards
+        sys.modules[name] = importlib.import_module(f"{self.finder.package}.{name}")
+        self.finder.aliases.append(name)
+
+
+def load_utility(project_dir: Path, utility: str) -> ModuleType:
+    """Import (or return the already imported) module of a project's utility."""
+    package = project_package(project_dir)
+    name = f"{package}.{utility}"
+    if name in sys.modules:
+        return importlib.import_module(name)
+    with _alias_lock:
+        finder = _AliasFinder(package)
+        sys.meta_path.insert(0, finder)
+        try:
+            return importlib.import_module(name)
+        finally:
+            sys.meta_path.remove(finder)
+            for alias in finder.aliases:
+                sys.modules.pop(alias, None)
+
+
+def load_entrypoint(project_dir: Path, utility: str, entrypoint: str) -> Callable:
+    """Return the entrypoint function of a project's utility."""
+    return getattr(load_utility(project_dir, utility), entrypoint)
@@ -0,0 +1,225 @@
+"""Content-addressed package store shared by project venvs.
+
+Each unique package version (keyed by name, version and archive hash) is
+installed once into ``<root>/packages/<key>/``. Project venvs are created without
+pip and get the package files hardlinked into their site-packages (symlinked
+when the store is on another filesystem), so disk usage and setup time grow with
+the number of unique package versions rather than with the number of projects.
+Console scripts are copied with their shebang pointed at the venv's interpreter.
+
+Every venv lists the keys it uses in ``venv/.pb_store_refs.json`` and the store
+keeps a reference file per (package, venv). Resolutions are cached under
+``<root>/resolutions/`` so relinking an already-resolved set runs no pip at
+all. :meth:`PackageStore.gc` drops references whose venv is gone or no longer
+lists the package, then deletes packages left without references.
+
+Enable with ``PB_PACKAGE_STORE=<dir>`` (or the ``package_store`` argument of
+``prepare_environment``). Files in the venv are shared with the store: they must
+be replaced rather than edited in place.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from packaging.utils import canonicalize_name
+
+logger = logging.getLogger(__name__)
+
+VENV_REFS = ".pb_store_refs.json"
+
+
+def default_package_store() -> Optional["PackageStore"]:
+    """Return the store configured with ``PB_PACKAGE_STORE``, if any."""
+    root = os.getenv("PB_PACKAGE_STORE")
+    return PackageStore(Path(root).expanduser()) if root else None
+
+
+def venv_site_packages(venv_dir: Path) -> Path:
+    """Return the site-packages directory of a venv made by this interpreter."""
+    if sys.platform.startswith("win"):
+        return venv_dir / "Lib" / "site-packages"
+    version = f"python{sys.version_info[0]}.{sys.version_info[1]}"
+    return venv_dir / "lib" / version / "site-packages"
+
+
+def _venv_id(venv_dir: Path) -> str:
+    return hashlib.sha256(str(venv_dir.resolve()).encode("utf-8")).hexdigest()[:16]
+
+
+def package_key(item: Dict[str, Any]) -> str:
+    """Store key for one entry of a pip installation report."""
+    meta = item.get("metadata", {})
+    info = item.get("download_info", {})
+    hashes = info.get("archive_info", {}).get("hashes", {})
+    digest = (
+        hashes.get("sha256")
+        or hashlib.sha256(info.get("url", "").encode("utf-8")).hexdigest()
+    )
+    return f"{canonicalize_name(meta['name'])}-{meta['version']}-{digest[:12]}"
+
+
+class PackageStore:
+    """A directory of unpacked packages that venvs link into."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.packages = self.root / "packages"
+        self.refs = self.root / "refs"
+        for path in (
+            self.packages,
+            self.refs,
+            self.root / "resolutions",
+            self.root / "tmp",
+        ):
+            path.mkdir(parents=True, exist_ok=True)
+
+    def resolve(
+        self, requirements: Path, wheelhouse: Optional[Path] = None
+    ) -> List[Dict[str, Any]]:
+        """Resolve a requirements file to the exact packages to install.
+
+        Resolutions are cached by the requirements text, interpreter and
+        wheelhouse, so an identical set is linked without running pip at all.
+        """
+        cache_key = hashlib.sha256(
+            json.dumps(
+                [requirements.read_text(), sys.version, str(wheelhouse or "")]
+            ).encode("utf-8")
+        ).hexdigest()[:24]
+        cached = self.root / "resolutions" / f"{cache_key}.json"
+        if cached.exists():
+            return json.loads(cached.read_text())
+        with tempfile.TemporaryDirectory(dir=self.root / "tmp") as tmp:
+            report = Path(tmp) / "report.json"
+            args = [sys.executable, "-m", "pip", "install", "--dry-run", "--quiet"]
+            args += ["--ignore-installed", "--report", str(report)]
+            args += ["-r", str(requirements)]
+            if wheelhouse is not None:
+                args += ["--no-index", "--find-links", str(wheelhouse)]
+            subprocess.run(args, check=True)
+            items = json.loads(report.read_text()).get("install", [])
+        cached.write_text(json.dumps(items))
+        return items
+
+    def ensure(self, item: Dict[str, Any]) -> str:
+        """Install a resolved package into the store unless present; return its key."""
+        key = package_key(item)
+        target = self.packages / key
+        if target.exists():
+            return key
+        staging = Path(tempfile.mkdtemp(prefix=f"{key}-", dir=self.root / "tmp"))
+        try:
+            logger.info("Adding %s to package store", key)
+            subprocess.run(
+                [sys.executable, "-m", "pip", "install", "--quiet", "--no-deps"]
+                + ["--no-compile", "--target", str(staging)]
+                + [item["download_info"]["url"]],
+                check=True,
+            )
+            try:
+                staging.rename(target)
+            except OSError:
+                # Another process stored the same package first
+                if not target.exists():
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return key
+
+    @staticmethod
+    def _link_file(source: Path, out: Path) -> None:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if out.exists() or out.is_symlink():
+            out.unlink()
+        try:
+            os.link(source, out)
+        except OSError:
+            # Store on another filesystem (or no hardlink support)
+            out.symlink_to(source)
+
+    def _copy_scripts(self, source: Path, venv_dir: Path) -> None:
+        bin_dir = venv_dir / ("Scripts" if sys.platform.startswith("win") else "bin")
+        python = bin_dir / (
+            "python.exe" if sys.platform.startswith("win") else "python"
+        )
+        bin_dir.mkdir(parents=True, exist_ok=True)
+        for script in source.iterdir():
+            data = script.read_bytes()
+            if data.startswith(b"#!"):
+                _, newline, body = data.partition(b"\n")
+                data = b"#!" + str(python).encode() + newline + body
+            out = bin_dir / script.name
+            out.write_bytes(data)
+            out.chmod(0o755)
+
+    def link(self, venv_dir: Path, keys: List[str]) -> None:
+        """Link the given packages into a venv and record the references."""
+        site = venv_site_packages(venv_dir)
+        for key in keys:
+            package = self.packages / key
+            for path in sorted(package.rglob("*")):
+                rel = path.relative_to(package)
+                if rel.parts[0] == "bin" or path.is_dir():
+                    continue
+                self._link_file(path, site / rel)
+            if (package / "bin").is_dir():
+                self._copy_scripts(package / "bin", venv_dir)
+            ref_dir = self.refs / key
+            ref_dir.mkdir(exist_ok=True)
+            (ref_dir / _venv_id(venv_dir)).write_text(str(venv_dir.resolve()))
+        (venv_dir / VENV_REFS).write_text(json.dumps(sorted(keys), indent=2))
+
+    def install(
+        self, venv_dir: Path, requirements: Path, wheelhouse: Optional[Path] = None
+    ) -> List[str]:
+        """Resolve ``requirements``, store missing packages and link them in."""
+        keys = [self.ensure(item) for item in self.resolve(requirements, wheelhouse)]
+        self.link(venv_dir, keys)
+        return keys
+
+    def gc(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Delete packages that no live venv references."""
+        removed: List[str] = []
+        freed = 0
+        for package in sorted(self.packages.iterdir()):
+            key = package.name
+            live = 0
+            ref_dir = self.refs / key
+            for ref in list(ref_dir.iterdir()) if ref_dir.exists() else []:
+                venv_dir = Path(ref.read_text())
+                try:
+                    used = key in json.loads((venv_dir / VENV_REFS).read_text())
+                except (OSError, ValueError):
+                    used = False
+                if used:
+                    live += 1
+                elif not dry_run:
+                    ref.unlink()
+            if live:
+                continue
+            removed.append(key)
+            freed += sum(p.stat().st_size for p in package.rglob("*") if p.is_file())
+            if not dry_run:
+                shutil.rmtree(package)
+                shutil.rmtree(ref_dir, ignore_errors=True)
+        return {"removed": removed, "freed_bytes": freed, "dry_run": dry_run}
+
+    def status(self) -> Dict[str, Any]:
+        """Summarize the packages in the store and how many venvs use each."""
+        packages = {}
+        total = 0
+        for package in sorted(self.packages.iterdir()):
+            size = sum(p.stat().st_size for p in package.rglob("*") if p.is_file())
+            ref_dir = self.refs / package.name
+            refs = len(list(ref_dir.iterdir())) if ref_dir.exists() else 0
+            packages[package.name] = {"bytes": size, "refs": refs}
+            total += size
+        return {"root": str(self.root), "bytes": total, "packages": packages}
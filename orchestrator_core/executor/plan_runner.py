@@ -0,0 +1,435 @@
+"""Run a whole plan against a scaffolded project.
+
+:func:`run_plan` schedules the plan's steps onto a pool of worker processes
+(see :mod:`.pool`). A step starts as soon as every step it depends on has
+succeeded (see :class:`..planner.dag.PlanGraph`). A step runs the entrypoint
+``entrypoint`` of utility ``utility``. The utility defaults to the step's
+``action``, and the entrypoint to the first one in the utility's
+``utility_contract.json``. The step's ``inputs`` become the entrypoint's
+params, with ``$steps.<id>...`` references replaced by upstream return values.
+
+With ``fail_fast`` the first failure cancels the running steps and skips the
+rest. Otherwise only the steps downstream of a failure are skipped. The
+returned :class:`PlanRunReport` holds per-step timings and compares the wall
+time with running the same steps one after another.
+
+With ``mode="inprocess"`` the steps instead run in this interpreter on one
+event loop: ``async def`` entrypoints are awaited concurrently without a thread
+or process each, which suits I/O-bound steps, and synchronous ones run in
+threads.
+
+With a ``state_dir``, runs are incremental (see :mod:`.plan_state`). A step
+whose fingerprint matches a stored output is reused instead of executed, and
+:func:`plan_changes` shows what a run would execute.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from ..planner.dag import DagStep, PlanGraph, resolve_step_references
+from .capture import OutputCapture
+from .plan_state import PlanState, StepChange
+from .pool import WorkerPool
+from .process import ExecutionCancelled, ExecutionError, ExecutionTimeout
+from .runner import call_entrypoint_async, prepare_environment
+
+PLAN_MODES = ("pool", "inprocess")
+
+
+@dataclass
+class StepResult:
+    """The outcome of one plan step; times are seconds from the start of the run.
+
+    ``status`` is ``"succeeded"``, ``"reused"`` (output of an earlier run),
+    ``"failed"``, ``"cancelled"`` (stopped by a failure elsewhere) or
+    ``"skipped"`` (never started).
+    """
+
+    step_id: int
+    utility: str
+    entrypoint: str
+    status: str
+    return_value: Any = None
+    stdout: str = ""
+    stderr: str = ""
+    error: str = ""
+    message: str = ""
+    started: Optional[float] = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("succeeded", "reused")
+
+
+@dataclass
+class PlanRunReport:
+    """Results and timings of a plan run."""
+
+    steps: Dict[int, StepResult]
+    wall_time: float
+    critical_path: List[int] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return all(step.ok for step in self.steps.values())
+
+    @property
+    def serial_time(self) -> float:
+        """Time the steps that ran would have taken one after another."""
+        return sum(step.duration for step in self.steps.values())
+
+    @property
+    def saved(self) -> float:
+        return self.serial_time - self.wall_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "wall_time": self.wall_time,
+            "serial_time": self.serial_time,
+            "saved": self.saved,
+            "critical_path": self.critical_path,
+            "steps": [asdict(self.steps[sid]) for sid in sorted(self.steps)],
+        }
+
+    def format(self) -> str:
+        """A per-step timing table followed by a summary line."""
+        lines = [f"{'step':>4}  {'target':<32} {'status':<10} {'start':>8} {'time':>8}"]
+        for sid in sorted(self.steps):
+            step = self.steps[sid]
+            target = f"{step.utility}.{step.entrypoint}"
+            start = f"{step.started:.2f}s" if step.started is not None else "-"
+            lines.append(
+                f"{sid:>4}  {target:<32} {step.status:<10} {start:>8} "
+                f"{step.duration:>7.2f}s"
+            )
+        speedup = self.serial_time / self.wall_time if self.wall_time else 1.0
+        reused = sum(step.status == "reused" for step in self.steps.values())
+        lines.append(
+            f"wall {self.wall_time:.2f}s, serial {self.serial_time:.2f}s, "
+            f"saved {self.saved:.2f}s ({speedup:.1f}x); "
+            + (f"{reused} reused; " if reused else "")
+            + "critical path "
+            + " -> ".join(str(sid) for sid in self.critical_path)
+        )
+        return "\n".join(lines)
+
+
+def step_target(project_dir: Path, step: DagStep) -> Tuple[str, str]:
+    """Return the ``(utility, entrypoint)`` a step runs; ValueError if unknown."""
+    extra = step.model_extra or {}
+    utility = extra.get("utility") or step.action
+    entrypoint = extra.get("entrypoint")
+    util_dir = project_dir / utility
+    if not util_dir.is_dir():
+        raise ValueError(f"Step {step.step_id}: utility '{utility}' not in project")
+    if not entrypoint:
+        contract_file = util_dir / "utility_contract.json"
+        try:
+            entrypoints = json.loads(contract_file.read_text()).get("entrypoints")
+            entrypoint = entrypoints[0]["name"]
+        except (OSError, ValueError, AttributeError, LookupError, TypeError):
+            raise ValueError(
+                f"Step {step.step_id}: no 'entrypoint' given and none declared "
+                f"in {contract_file}"
+            ) from None
+    return utility, entrypoint
+
+
+@contextmanager
+def _event_loop() -> Iterator[asyncio.AbstractEventLoop]:
+    """An event loop running in a background thread until the block exits."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="pb-plan-loop")
+    thread.start()
+
+    async def drain() -> None:
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        yield loop
+    finally:
+        asyncio.run_coroutine_threadsafe(drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def run_plan(
+    project_dir: Path,
+    plan: Union[PlanGraph, Any],
+    workers: Optional[int] = None,
+    fail_fast: bool = True,
+    timeout: Optional[float] = None,
+    force_reinstall: bool = False,
+    wheelhouse: Optional[Path] = None,
+    state_dir: Optional[Path] = None,
+    rerun_all: bool = False,
+    mode: str = "pool",
+) -> PlanRunReport:
+    """Execute every step of ``plan`` in dependency order, in parallel.
+
+    ``plan`` is a :class:`PlanGraph` or anything :meth:`PlanGraph.from_plan`
+    accepts. ``workers`` (default: CPU count) bounds the steps running at once,
+    and ``timeout`` applies to each step. Steps that name a missing utility or
+    entrypoint raise ``ValueError`` before anything runs. Step failures are
+    reported in the returned :class:`PlanRunReport`, not raised.
+
+    With ``state_dir``, step outputs are stored there and steps whose
+    fingerprint is unchanged are reused. When nothing has to run, the venv is
+    not even prepared; it is prepared late if a step then cannot be reused. ``rerun_all`` executes every step but still stores
+    the outputs.
+
+    ``mode="inprocess"`` runs the steps on an event loop in this process
+    instead of in pooled workers. There ``workers`` bounds the steps in flight,
+    and a step that times out or is cancelled by a failure stops at its next
+    ``await``; a synchronous step keeps running in its thread.
+    """
+    if mode not in PLAN_MODES:
+        raise ValueError(f"Unknown plan mode {mode!r}; use one of {PLAN_MODES}")
+    graph = plan if isinstance(plan, PlanGraph) else PlanGraph.from_plan(plan)
+    targets = {sid: step_target(project_dir, graph.steps[sid]) for sid in graph.steps}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(graph.steps)))
+    state = PlanState(state_dir) if state_dir is not None else None
+    pool = None
+    prepared = False
+
+    def prepare() -> None:
+        """Prepare the venv, and warm the pool, before the first step that runs."""
+        nonlocal pool, prepared
+        if prepared:
+            return
+        venv_dir = prepare_environment(
+            project_dir, force_reinstall=force_reinstall, wheelhouse=wheelhouse
+        )
+        if mode == "pool":
+            pool = WorkerPool(
+                project_dir, venv_dir, min_workers=workers, max_workers=workers
+            )
+            pool.warm()
+        prepared = True
+
+    if (
+        state is None
+        or rerun_all
+        or any(
+            change.rerun
+            for change in state.changes(project_dir, graph, targets).values()
+        )
+    ):
+        # Start the clock with warm workers so timings cover only the steps
+        prepare()
+    cancel = threading.Event()
+    results: Dict[int, StepResult] = {}
+    outputs: Dict[int, Any] = {}
+    # Fingerprint components and output fingerprints, with a state_dir
+    components: Dict[int, Dict[str, Any]] = {}
+    output_fps: Dict[int, str] = {}
+    waiting = {sid: len(deps) for sid, deps in graph.dependencies.items()}
+    ready = sorted(sid for sid, count in waiting.items() if count == 0)
+    t0 = time.perf_counter()
+
+    def failure(sid: int, exc: ExecutionError) -> StepResult:
+        status = "cancelled" if isinstance(exc, ExecutionCancelled) else "failed"
+        return StepResult(
+            sid,
+            *targets[sid],
+            status,
+            stdout=exc.stdout,
+            stderr=exc.stderr,
+            error=exc.error or type(exc).__name__,
+            message=str(exc),
+        )
+
+    def timed(result: StepResult, started: float) -> StepResult:
+        result.started = started - t0
+        result.duration = time.perf_counter() - started
+        return result
+
+    def run_step(sid: int, params: Dict[str, Any]) -> StepResult:
+        utility, entrypoint = targets[sid]
+        started = time.perf_counter()
+        try:
+            value, stdout, stderr = pool.call(
+                utility, entrypoint, params, timeout=timeout, cancel=cancel
+            )
+        except ExecutionError as exc:
+            return timed(failure(sid, exc), started)
+        result = StepResult(
+            sid, utility, entrypoint, "succeeded", value, stdout, stderr
+        )
+        return timed(result, started)
+
+    async def run_step_async(sid: int, params: Dict[str, Any]) -> StepResult:
+        utility, entrypoint = targets[sid]
+        started = time.perf_counter()
+        capture = OutputCapture()
+        try:
+            value = await asyncio.wait_for(
+                call_entrypoint_async(
+                    project_dir, utility, entrypoint, params, capture
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            error = ExecutionTimeout(
+                f"{utility}.{entrypoint} timed out after {timeout}s"
+            )
+        except Exception as exc:
+            error = ExecutionError(
+                f"{utility}.{entrypoint} raised {type(exc).__name__}: {exc}",
+                error=type(exc).__name__,
+            )
+        else:
+            error = None
+        capture.close()
+        if error is not None:
+            error.stdout, error.stderr = capture.stdout, capture.stderr
+            return timed(failure(sid, error), started)
+        result = StepResult(
+            sid, utility, entrypoint, "succeeded", value, capture.stdout, capture.stderr
+        )
+        return timed(result, started)
+
+    def finish(result: StepResult) -> None:
+        results[result.step_id] = result
+        if not result.ok:
+            if fail_fast:
+                cancel.set()
+            return
+        outputs[result.step_id] = result.return_value
+        if state is not None and result.status == "succeeded":
+            # An output that cannot be stored never matches on a later run
+            output_fps[result.step_id] = (
+                state.save(
+                    result.step_id,
+                    components[result.step_id],
+                    result.return_value,
+                    result.stdout,
+                    result.stderr,
+                )
+                or uuid.uuid4().hex
+            )
+        for child in sorted(graph.dependents[result.step_id]):
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                ready.append(child)
+
+    def reuse(sid: int) -> Optional[StepResult]:
+        """The stored result of a step whose fingerprint is unchanged."""
+        if state is None:
+            return None
+        components[sid] = state.components(
+            project_dir,
+            targets[sid],
+            graph.steps[sid].inputs,
+            {dep: output_fps[dep] for dep in graph.dependencies[sid]},
+        )
+        stored = None if rerun_all else state.load(state.fingerprint(components[sid]))
+        if stored is None:
+            return None
+        state.record(sid, components[sid])
+        output_fps[sid] = stored["output"]
+        return StepResult(
+            sid,
+            *targets[sid],
+            "reused",
+            stored["return_value"],
+            stored["stdout"],
+            stored["stderr"],
+        )
+
+    running: Dict[Any, int] = {}
+    try:
+        with ExitStack() as stack:
+            if mode == "pool":
+                executor = stack.enter_context(
+                    ThreadPoolExecutor(workers, thread_name_prefix="pb-plan")
+                )
+            else:
+                loop = stack.enter_context(_event_loop())
+            while ready or running:
+                while ready and not cancel.is_set() and len(running) < workers:
+                    sid = ready.pop(0)
+                    try:
+                        params = resolve_step_references(
+                            graph.steps[sid].inputs, outputs
+                        )
+                    except ValueError as exc:
+                        finish(
+                            StepResult(sid, *targets[sid], "failed", message=str(exc))
+                        )
+                        continue
+                    reused = reuse(sid)
+                    if reused is not None:
+                        finish(reused)
+                        continue
+                    # A stored output predicted to be reused may have gone since
+                    prepare()
+                    if mode == "pool":
+                        future = executor.submit(run_step, sid, params)
+                    else:
+                        future = asyncio.run_coroutine_threadsafe(
+                            run_step_async(sid, params), loop
+                        )
+                    running[future] = sid
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    sid = running.pop(future)
+                    if future.cancelled():
+                        message = "plan stopped after a failure"
+                        finish(
+                            StepResult(sid, *targets[sid], "cancelled", message=message)
+                        )
+                    else:
+                        finish(future.result())
+                if cancel.is_set() and mode == "inprocess":
+                    # Pooled steps see the cancel event; tasks must be cancelled
+                    for future in running:
+                        future.cancel()
+            wall_time = time.perf_counter() - t0
+    finally:
+        cancel.set()
+        if pool is not None:
+            pool.close()
+        if state is not None:
+            state.commit()
+
+    failed = [sid for sid, r in results.items() if r.status == "failed"]
+    for sid in graph.topological_order():
+        if sid in results:
+            continue
+        upstream = sorted(graph.ancestors(sid).intersection(failed))
+        reason = (
+            f"upstream step {upstream[0]} failed"
+            if upstream
+            else "plan stopped after a failure"
+        )
+        results[sid] = StepResult(sid, *targets[sid], "skipped", message=reason)
+    durations = {sid: r.duration for sid, r in results.items()}
+    path, _ = graph.critical_path(durations)
+    return PlanRunReport(results, wall_time, path)
+
+
+def plan_changes(
+    project_dir: Path, plan: Union[PlanGraph, Any], state_dir: Path
+) -> Dict[int, StepChange]:
+    """Show which steps :func:`run_plan` with ``state_dir`` would execute, and why."""
+    graph = plan if isinstance(plan, PlanGraph) else PlanGraph.from_plan(plan)
+    targets = {sid: step_target(project_dir, graph.steps[sid]) for sid in graph.steps}
+    return PlanState(state_dir).changes(project_dir, graph, targets)
@@ -0,0 +1,187 @@
+"""Stored step outputs for incremental, make-style plan reruns.
+
+Each step of a plan run gets a fingerprint made of:
+
+- its utility's fingerprint: contract version and source tree (see
+  :func:`.result_cache.utility_fingerprint`)
+- its entrypoint
+- its raw ``inputs``
+- the output fingerprints of the steps it depends on
+
+A successful step's return value is stored under its fingerprint. A later run
+reuses that output instead of executing the step when the fingerprint matches.
+A step whose inputs or utility changed runs again. Its dependents run again
+only if its output actually changed, since their fingerprints include it.
+
+The state lives in a directory with one ``outputs/<fingerprint>.json`` per
+stored output. ``index.json`` records the latest fingerprint of each step. The
+index is used to explain why a step would rerun and to drop outputs no step
+refers to any more.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..planner.dag import PlanGraph
+from .result_cache import canonical_hash, utility_fingerprint
+
+INDEX_FILE = "index.json"
+
+
+@dataclass
+class StepChange:
+    """Whether a step would run again, and why."""
+
+    step_id: int
+    rerun: bool
+    reason: str
+
+
+def _write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class PlanState:
+    """Fingerprints and stored outputs of previous plan runs."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.outputs = self.root / "outputs"
+        try:
+            index = json.loads((self.root / INDEX_FILE).read_text())
+        except (OSError, ValueError):
+            index = {}
+        # step id -> the components of its latest fingerprint
+        self.index: Dict[int, Dict[str, Any]] = {
+            int(sid): entry for sid, entry in index.items()
+        }
+        self._utilities: Dict[str, str] = {}
+
+    def components(
+        self,
+        project_dir: Path,
+        target: Tuple[str, str],
+        inputs: Dict[str, Any],
+        upstream: Dict[int, str],
+    ) -> Dict[str, Any]:
+        """What a step's fingerprint is made of.
+
+        ``upstream`` maps each dependency's step id to its output fingerprint.
+        """
+        utility, entrypoint = target
+        if utility not in self._utilities:
+            self._utilities[utility] = utility_fingerprint(Path(project_dir) / utility)
+        return {
+            "utility": self._utilities[utility],
+            "entrypoint": entrypoint,
+            "inputs": canonical_hash(inputs),
+            "upstream": {str(sid): fp for sid, fp in sorted(upstream.items())},
+        }
+
+    @staticmethod
+    def fingerprint(components: Dict[str, Any]) -> str:
+        data = json.dumps(components, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def load(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the stored ``return_value``/``stdout``/``stderr``/``output``."""
+        try:
+            return json.loads((self.outputs / f"{fingerprint}.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def save(
+        self,
+        step_id: int,
+        components: Dict[str, Any],
+        return_value: Any,
+        stdout: str = "",
+        stderr: str = "",
+    ) -> Optional[str]:
+        """Store a step's output; return its output fingerprint.
+
+        Returns None, and stores nothing, if the output is not JSON-serializable.
+        """
+        output = canonical_hash(return_value)
+        if output is None:
+            return None
+        fingerprint = self.fingerprint(components)
+        entry = {
+            "return_value": return_value,
+            "stdout": stdout,
+            "stderr": stderr,
+            "output": output,
+        }
+        _write_json(self.outputs / f"{fingerprint}.json", entry)
+        self.record(step_id, components)
+        return output
+
+    def record(self, step_id: int, components: Dict[str, Any]) -> None:
+        """Note the fingerprint a step was last run or reused with."""
+        self.index[step_id] = components
+
+    def commit(self) -> None:
+        """Write the index and drop outputs no indexed step refers to."""
+        _write_json(
+            self.root / INDEX_FILE,
+            {str(sid): entry for sid, entry in sorted(self.index.items())},
+        )
+        live = {f"{self.fingerprint(entry)}.json" for entry in self.index.values()}
+        if self.outputs.is_dir():
+            for path in self.outputs.glob("*.json"):
+                if path.name not in live:
+                    path.unlink(missing_ok=True)
+
+    def changes(
+        self,
+        project_dir: Path,
+        graph: PlanGraph,
+        targets: Dict[int, Tuple[str, str]],
+    ) -> Dict[int, StepChange]:
+        """Predict which steps a run would execute, without running anything.
+
+        A step downstream of one that reruns is assumed to rerun as well, since
+        the new upstream output is not known yet.
+        """
+        changes: Dict[int, StepChange] = {}
+        outputs: Dict[int, str] = {}
+        for sid in graph.topological_order():
+            rerunning = sorted(
+                dep for dep in graph.dependencies[sid] if changes[dep].rerun
+            )
+            if rerunning:
+                reason = f"upstream step {rerunning[0]} reruns"
+                changes[sid] = StepChange(sid, True, reason)
+                continue
+            parts = self.components(
+                project_dir,
+                targets[sid],
+                graph.steps[sid].inputs,
+                {dep: outputs[dep] for dep in graph.dependencies[sid]},
+            )
+            stored = self.load(self.fingerprint(parts))
+            if stored is not None:
+                outputs[sid] = stored["output"]
+                changes[sid] = StepChange(sid, False, "up to date")
+                continue
+            previous = self.index.get(sid)
+            if previous is None:
+                reason = "no previous run"
+            else:
+                changed = [key for key in parts if parts[key] != previous.get(key)]
+                reason = f"{', '.join(changed)} changed" if changed else "no output"
+            changes[sid] = StepChange(sid, True, reason)
+        return changes
@@ -0,0 +1,475 @@
+"""Warm pools of long-lived workers that keep utility modules imported.
+
+A :class:`WorkerPool` owns between ``min_workers`` and ``max_workers``
+:class:`.process.WorkerProcess` instances for one project venv. A worker that
+finishes a call goes back to the pool with everything it imported still loaded,
+so the next call skips interpreter start-up and imports. A maintenance thread
+closes workers idle longer than ``idle_timeout`` (keeping ``min_workers``),
+pings idle workers every ``health_interval`` and replaces any that do not answer.
+Workers that time out, are cancelled or crash are discarded. When the venv is
+reinstalled (its stamp changes), idle workers are retired so no call runs
+against stale packages. Edits to utility code need a pool restart.
+
+Pools live in the process that uses them (:func:`get_pool`), or in a pool server
+(:func:`serve_pool`, ``cli pool serve``) that other processes reach through a
+Unix socket per project. Calls to the server use the same length-prefixed JSON
+frames as workers, which keeps a warm ``cli execute`` to a few milliseconds of
+overhead. Sockets live in a directory only the current user can enter, and
+clients only connect to sockets, and servers, owned by that user.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ._worker import read_frame, write_frame
+from .process import (
+    ExecutionCancelled,
+    ExecutionTimeout,
+    OutputCallback,
+    WorkerCrashed,
+    WorkerProcess,
+    read_reply,
+    reply_result,
+    streaming,
+)
+from .runner import environment_version
+
+logger = logging.getLogger(__name__)
+
+_ERRORS = {
+    "timeout": ExecutionTimeout,
+    "cancelled": ExecutionCancelled,
+    "crashed": WorkerCrashed,
+}
+
+
+class WorkerPool:
+    """Workers for one project venv, reused across calls."""
+
+    def __init__(
+        self,
+        project_dir: Path,
+        venv_dir: Path,
+        min_workers: int = 1,
+        max_workers: int = 4,
+        idle_timeout: float = 300.0,
+        health_interval: float = 30.0,
+        memory_limit: Optional[int] = None,
+    ) -> None:
+        if not 0 <= min_workers <= max_workers or max_workers < 1:
+            raise ValueError(
+                "need 0 <= min_workers <= max_workers and max_workers >= 1"
+            )
+        self.project_dir = Path(project_dir)
+        self.venv_dir = Path(venv_dir)
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.memory_limit = memory_limit
+        # Most recently used last; (worker, released at)
+        self._idle: List[Tuple[WorkerProcess, float]] = []
+        self._busy = 0
+        self._calls = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._version = environment_version(self.venv_dir)
+        self._stop = threading.Event()
+        self._fill()
+        self._maintainer = threading.Thread(
+            target=self._maintain, name="pb-pool-maintainer", daemon=True
+        )
+        self._maintainer.start()
+
+    def _spawn(self) -> WorkerProcess:
+        worker = WorkerProcess(
+            self.project_dir, self.venv_dir, memory_limit=self.memory_limit
+        )
+        worker.env_version = self._version
+        return worker
+
+    def _fill(self) -> None:
+        """Start workers until the pool holds ``min_workers``."""
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) + self._busy >= self.min_workers:
+                    return
+                self._busy += 1
+            try:
+                worker = self._spawn()
+            except Exception:
+                with self._cond:
+                    self._busy -= 1
+                raise
+            self._release(worker)
+
+    def _acquire(self) -> WorkerProcess:
+        stale: List[WorkerProcess] = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("worker pool is closed")
+                    version = environment_version(self.venv_dir)
+                    if version != self._version:
+                        logger.info("Venv changed; retiring idle workers")
+                        self._version = version
+                        stale += [worker for worker, _ in self._idle]
+                        self._idle.clear()
+                    while self._idle:
+                        worker, _ = self._idle.pop()
+                        if worker.alive:
+                            self._busy += 1
+                            return worker
+                        stale.append(worker)
+                    if self._busy < self.max_workers:
+                        self._busy += 1
+                        break
+                    self._cond.wait()
+        finally:
+            for worker in stale:
+                worker.kill()
+        try:
+            return self._spawn()
+        except Exception:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, worker: WorkerProcess) -> None:
+        with self._cond:
+            self._busy -= 1
+            keep = (
+                worker.alive
+                and not self._closed
+                and worker.env_version == self._version
+            )
+            if keep:
+                self._idle.append((worker, time.monotonic()))
+            self._cond.notify()
+        if not keep:
+            worker.kill()
+
+    def call_raw(
+        self,
+        request: Dict[str, Any],
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        on_output: Optional[OutputCallback] = None,
+    ) -> Dict[str, Any]:
+        """Send a request to a pooled worker and return its reply as is."""
+        worker = self._acquire()
+        try:
+            return worker.call(
+                request, timeout=timeout, cancel=cancel, on_output=on_output
+            )
+        finally:
+            self._release(worker)
+            with self._cond:
+                self._calls += 1
+
+    def call(
+        self,
+        utility: str,
+        entrypoint: str,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        on_output: Optional[OutputCallback] = None,
+    ):
+        """Run an entrypoint on a pooled worker; return (value, stdout, stderr)."""
+        request = {"utility": utility, "entrypoint": entrypoint, "params": params}
+        reply = self.call_raw(request, timeout, cancel, on_output)
+        return reply_result(request, reply)
+
+    def _maintain(self) -> None:
+        last_check = time.monotonic()
+        tick = max(0.05, min(1.0, self.idle_timeout / 2, self.health_interval / 2))
+        while not self._stop.wait(tick):
+            now = time.monotonic()
+            expired: List[WorkerProcess] = []
+            with self._cond:
+                total = len(self._idle) + self._busy
+                # Oldest first; keep at least min_workers
+                while (
+                    self._idle
+                    and total > self.min_workers
+                    and now - self._idle[0][1] >= self.idle_timeout
+                ):
+                    expired.append(self._idle.pop(0)[0])
+                    total -= 1
+                check: List[WorkerProcess] = []
+                if now - last_check >= self.health_interval:
+                    last_check = now
+                    check = [worker for worker, _ in self._idle]
+                    self._busy += len(check)
+                    self._idle.clear()
+            for worker in expired:
+                logger.debug("Closing idle worker %s", worker.proc.pid)
+                worker.close()
+            for worker in check:
+                if not worker.ping():
+                    logger.warning("Worker %s failed its health check", worker.proc.pid)
+                    worker.kill()
+                self._release(worker)
+            try:
+                self._fill()
+            except Exception:  # pragma: no cover - retried next tick
+                logger.exception("Could not start a pool worker")
+
+    def warm(self) -> None:
+        """Wait until the idle workers have started up and answer requests."""
+        with self._cond:
+            workers = [worker for worker, _ in self._idle]
+            self._busy += len(workers)
+            self._idle.clear()
+        for worker in workers:
+            if not worker.ping():
+                worker.kill()
+            self._release(worker)
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "project": str(self.project_dir),
+                "idle": len(self._idle),
+                "busy": self._busy,
+                "min_workers": self.min_workers,
+                "max_workers": self.max_workers,
+                "calls": self._calls,
+                "pids": [worker.proc.pid for worker, _ in self._idle],
+            }
+
+    def close(self) -> None:
+        """Stop maintenance and shut down idle workers; busy ones exit when done."""
+        with self._cond:
+            self._closed = True
+            idle = [worker for worker, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        self._stop.set()
+        for worker in idle:
+            worker.close()
+
+
+_pools: Dict[str, WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(project_dir: Path, venv_dir: Path, **options: Any) -> WorkerPool:
+    """Return this process's pool for a project, creating it on first use."""
+    key = str(Path(project_dir).absolute())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = _pools[key] = WorkerPool(project_dir, venv_dir, **options)
+        return pool
+
+
+@atexit.register
+def close_pools() -> None:
+    """Close every pool created by :func:`get_pool`."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _socket_dir() -> Path:
+    """Directory for pool and fork server sockets, private to the current user.
+
+    ``$XDG_RUNTIME_DIR/pb-pool`` when that is set, else ``pb-pool-<uid>`` in the
+    temp directory. Raises ``PermissionError`` if the directory exists but is not
+    a directory owned by and private to this user.
+    """
+    runtime = os.getenv("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        path = Path(runtime) / "pb-pool"
+    else:
+        path = Path(tempfile.gettempdir()) / f"pb-pool-{os.getuid()}"
+    path.mkdir(mode=0o700, exist_ok=True)
+    info = path.lstat()
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise PermissionError(f"{path} is not a directory private to this user")
+    return path
+
+
+def pool_socket(project_dir: Path) -> Path:
+    """Socket path of the pool server for a project.
+
+    Named by a hash of the project path, because Unix socket paths are limited to
+    about 100 bytes.
+    """
+    digest = hashlib.sha256(str(Path(project_dir).absolute()).encode()).hexdigest()
+    return _socket_dir() / f"pb-pool-{digest[:16]}.sock"
+
+
+def _connect(path: Path, timeout: Optional[float] = None) -> socket.socket:
+    """Connect to a Unix socket, refusing one another user owns or serves."""
+    info = path.lstat()
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a socket owned by this user")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        if hasattr(socket, "SO_PEERCRED"):
+            creds = sock.getsockopt(
+                socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+            )
+            _pid, uid, _gid = struct.unpack("3i", creds)
+            if uid != os.getuid():
+                raise PermissionError(f"{path} is served by another user")
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+class PoolClient:
+    """Talks to a running pool server over its Unix socket."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+    def request(
+        self,
+        message: Dict[str, Any],
+        timeout: Optional[float] = None,
+        on_output: Optional[OutputCallback] = None,
+    ):
+        with _connect(self.path, timeout) as sock:
+            with sock.makefile("rwb") as stream:
+                write_frame(stream, streaming(message, on_output))
+                reply = read_reply(stream, on_output)
+        if reply is None:
+            raise WorkerCrashed("Pool server closed the connection")
+        return reply
+
+    def call(
+        self,
+        utility: str,
+        entrypoint: str,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+        on_output: Optional[OutputCallback] = None,
+    ):
+        """Run an entrypoint on the server's pool; return (value, stdout, stderr)."""
+        request = {"utility": utility, "entrypoint": entrypoint, "params": params}
+        # The server enforces the timeout; the socket only guards against a hang
+        reply = self.request(
+            dict(request, timeout=timeout),
+            timeout=timeout + 5 if timeout else None,
+            on_output=on_output,
+        )
+        if reply.get("kind") in _ERRORS:
+            raise _ERRORS[reply["kind"]](reply.get("message", ""))
+        return reply_result(request, reply)
+
+    def status(self) -> Dict[str, Any]:
+        return self.request({"op": "status"}, timeout=5)
+
+    def shutdown(self) -> None:
+        self.request({"op": "shutdown"}, timeout=5)
+
+
+def running_pool(project_dir: Path) -> Optional[PoolClient]:
+    """Return a client for the project's pool server if one is listening."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        path = pool_socket(project_dir)
+        if not path.exists():
+            return None
+        _connect(path).close()
+    except PermissionError as e:
+        logger.warning("Not using the pool server: %s", e)
+        return None
+    except OSError:
+        return None
+    return PoolClient(path)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        while True:
+            try:
+                message = read_frame(self.rfile)
+            except (OSError, ValueError):
+                return
+            if message is None:
+                return
+            relay = self._relay if message.get("stream") else None
+            write_frame(self.wfile, self.server.dispatch(message, relay))
+
+    def _relay(self, stream: str, text: str) -> None:
+        """Pass a worker's output frame on to the client as it arrives."""
+        write_frame(self.wfile, {"stream": stream, "data": text})
+
+
+class PoolServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a :class:`WorkerPool` on a Unix socket, one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, pool: WorkerPool) -> None:
+        self.pool = pool
+        self.path = Path(path)
+        super().__init__(str(self.path), _Handler)
+        os.chmod(self.path, 0o600)
+
+    def dispatch(
+        self, message: Dict[str, Any], on_output: Optional[OutputCallback] = None
+    ) -> Dict[str, Any]:
+        op = message.get("op")
+        if op == "status":
+            return dict(self.pool.status(), ok=True, pid=os.getpid())
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        request = {
+            "utility": message.get("utility"),
+            "entrypoint": message.get("entrypoint"),
+            "params": message.get("params", {}),
+        }
+        try:
+            return self.pool.call_raw(
+                request, timeout=message.get("timeout"), on_output=on_output
+            )
+        except Exception as exc:
+            kind = next(
+                (k for k, cls in _ERRORS.items() if isinstance(exc, cls)), "crashed"
+            )
+            return {"ok": False, "kind": kind, "message": str(exc)}
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.path.unlink(missing_ok=True)
+        self.pool.close()
+
+
+def serve_pool(project_dir: Path, venv_dir: Path, **options: Any) -> PoolServer:
+    """Start a pool server for a project; call ``serve_forever`` on the result."""
+    if running_pool(project_dir) is not None:
+        raise RuntimeError(f"A pool server is already running for {project_dir}")
+    path = pool_socket(project_dir)
+    # Left behind by a server that did not shut down cleanly
+    path.unlink(missing_ok=True)
+    return PoolServer(path, WorkerPool(project_dir, venv_dir, **options))
@@ -0,0 +1,278 @@
+"""Run utility entrypoints in a worker process using the project venv.
+
+Each :class:`WorkerProcess` is the venv's interpreter running :mod:`._worker`,
+which imports utilities from the project directory. Nothing is imported into
+the orchestrator, and concurrent executions each get their own process. Params
+and results are JSON frames over the worker's stdin/stdout pipes, so they must
+be JSON-serializable.
+
+A call can be bounded by a timeout and cancelled from another thread through a
+:class:`threading.Event`; either kills the worker. A memory limit is applied to
+the worker's address space with ``RLIMIT_AS``, so an entrypoint that exceeds it
+gets a ``MemoryError`` (Unix only).
+
+Pass ``on_output(stream, text)`` to receive the entrypoint's output while it
+runs instead of in the reply (see :mod:`.capture`).
+"""
+
+import logging
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ._worker import read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+OutputCallback = Callable[[str, str], None]
+
+WORKER_SCRIPT = Path(__file__).with_name("_worker.py")
+
+
+class ExecutionError(RuntimeError):
+    """An entrypoint failed in its worker; carries the worker's traceback."""
+
+    def __init__(
+        self,
+        message: str,
+        error: str = "",
+        traceback: str = "",
+        stdout: str = "",
+        stderr: str = "",
+    ) -> None:
+        super().__init__(message)
+        self.error = error
+        self.traceback = traceback
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class ExecutionTimeout(ExecutionError):
+    """The entrypoint ran past its timeout and the worker was killed."""
+
+
+class ExecutionCancelled(ExecutionError):
+    """The execution was cancelled and the worker was killed."""
+
+
+class WorkerCrashed(ExecutionError):
+    """The worker exited without replying."""
+
+
+def venv_python(venv_dir: Path) -> Path:
+    """Return the interpreter of a venv."""
+    if sys.platform.startswith("win"):
+        return venv_dir / "Scripts" / "python.exe"
+    return venv_dir / "bin" / "python"
+
+
+def _name(request: Dict[str, Any]) -> str:
+    if "op" in request:
+        return request["op"]
+    return f"{request['utility']}.{request['entrypoint']}"
+
+
+def read_reply(stream, on_output: Optional[OutputCallback] = None):
+    """Read frames up to the reply, passing output frames to ``on_output``."""
+    while True:
+        frame = read_frame(stream)
+        if frame is None or "stream" not in frame:
+            return frame
+        if on_output is not None:
+            on_output(frame["stream"], frame["data"])
+
+
+def streaming(
+    request: Dict[str, Any], on_output: Optional[OutputCallback]
+) -> Dict[str, Any]:
+    """The request, asking for streamed output when there is an ``on_output``."""
+    return dict(request, stream=True) if on_output is not None else request
+
+
+def _watch(done, stopped, timeout, cancel, kill) -> None:
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while not done.wait(0.01):
+        if cancel is not None and cancel.is_set():
+            stopped.append("cancelled")
+        elif deadline is not None and time.monotonic() >= deadline:
+            stopped.append("timeout")
+        else:
+            continue
+        kill()
+        return
+
+
+@contextmanager
+def watchdog(
+    timeout: Optional[float],
+    cancel: Optional[threading.Event],
+    kill: Callable[[], None],
+) -> Iterator[List[str]]:
+    """Call ``kill`` if the block outlives ``timeout`` or ``cancel`` is set.
+
+    Yields a list that holds ``"timeout"`` or ``"cancelled"`` once ``kill`` ran.
+    """
+    stopped: List[str] = []
+    if timeout is None and cancel is None:
+        yield stopped
+        return
+    done = threading.Event()
+    watcher = threading.Thread(
+        target=_watch, args=(done, stopped, timeout, cancel, kill), daemon=True
+    )
+    watcher.start()
+    try:
+        yield stopped
+    finally:
+        done.set()
+        watcher.join()
+
+
+def no_reply_error(
+    request: Dict[str, Any],
+    stopped: List[str],
+    timeout: Optional[float],
+    crashed: str,
+) -> ExecutionError:
+    """The error for a call whose worker died before replying."""
+    if stopped and stopped[0] == "timeout":
+        return ExecutionTimeout(f"{_name(request)} timed out after {timeout}s")
+    if stopped:
+        return ExecutionCancelled(f"{_name(request)} was cancelled")
+    return WorkerCrashed(crashed)
+
+
+class WorkerProcess:
+    """A worker process serving entrypoint calls for one project."""
+
+    def __init__(
+        self, project_dir: Path, venv_dir: Path, memory_limit: Optional[int] = None
+    ) -> None:
+        # Absolute, not resolved: the venv's python must stay the symlink
+        self.project_dir = Path(project_dir).absolute()
+        python = venv_python(Path(venv_dir).absolute())
+        args = [str(python), str(WORKER_SCRIPT), str(self.project_dir)]
+        if memory_limit:
+            args += ["--memory-limit", str(int(memory_limit))]
+        self.proc = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=str(self.project_dir),
+        )
+        self._lock = threading.Lock()
+        # Set by owners to tell apart workers started for different venv states
+        self.env_version: Any = None
+        logger.debug("Started worker %s for %s", self.proc.pid, self.project_dir)
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def call(
+        self,
+        request: Dict[str, Any],
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        on_output: Optional[OutputCallback] = None,
+    ) -> Dict[str, Any]:
+        """Send one request and wait for the reply.
+
+        Raises :class:`ExecutionTimeout`, :class:`ExecutionCancelled` or
+        :class:`WorkerCrashed` when no reply arrives; the worker is dead then.
+        """
+        with self._lock, watchdog(timeout, cancel, self.proc.kill) as stopped:
+            try:
+                write_frame(self.proc.stdin, streaming(request, on_output))
+                reply = read_reply(self.proc.stdout, on_output)
+            except (BrokenPipeError, OSError, ValueError):
+                reply = None
+        if reply is not None:
+            return reply
+        self.kill()
+        raise no_reply_error(
+            request,
+            stopped,
+            timeout,
+            f"Worker for {_name(request)} exited with code {self.proc.returncode}",
+        )
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        """Health check: whether the worker answers within ``timeout``."""
+        try:
+            return bool(self.call({"op": "ping"}, timeout=timeout).get("ok"))
+        except ExecutionError:
+            return False
+
+    def kill(self) -> None:
+        if self.alive:
+            self.proc.kill()
+        self.proc.wait()
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """Ask the worker to exit by closing its input, then reap it."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+
+
+def reply_result(request: Dict[str, Any], reply: Dict[str, Any]):
+    """Turn a worker reply into the call's return value, stdout and stderr."""
+    if reply.get("ok"):
+        return reply.get("return"), reply.get("stdout", ""), reply.get("stderr", "")
+    if reply.get("kind") == "load":
+        message = (
+            f"Failed to load entrypoint '{request['entrypoint']}' from utility"
+            f" '{request['utility']}': {reply.get('message')}"
+        )
+    else:
+        message = (
+            f"{_name(request)} raised {reply.get('error')}: {reply.get('message')}"
+        )
+    raise ExecutionError(
+        message,
+        error=reply.get("error", ""),
+        traceback=reply.get("traceback", ""),
+        stdout=reply.get("stdout", ""),
+        stderr=reply.get("stderr", ""),
+    )
+
+
+def run_in_subprocess(
+    project_dir: Path,
+    venv_dir: Path,
+    utility: str,
+    entrypoint: str,
+    params: Dict[str, Any],
+    timeout: Optional[float] = None,
+    memory_limit: Optional[int] = None,
+    cancel: Optional[threading.Event] = None,
+    on_output: Optional[OutputCallback] = None,
+):
+    """Run one entrypoint in a fresh worker; return (value, stdout, stderr)."""
+    request = {"utility": utility, "entrypoint": entrypoint, "params": params}
+    worker = WorkerProcess(project_dir, venv_dir, memory_limit=memory_limit)
+    try:
+        reply = worker.call(
+            request, timeout=timeout, cancel=cancel, on_output=on_output
+        )
+    finally:
+        if worker.alive:
+            worker.close()
+    return reply_result(request, reply)
@@ -0,0 +1,270 @@
+"""On-disk memoization of entrypoint results.
+
+A result is cached under a key that combines the utility name, its contract
+``version``, a hash of the utility's source tree, the entrypoint name and a
+canonical hash of the params. Editing any file of the utility therefore gives
+its calls new keys. That includes its ``requirements.txt`` and contract
+``deps``. Only utilities whose ``utility_contract.json`` sets
+``"cache_safe": true`` are cached. Only successful calls with JSON-serializable
+params and return values, whose output was kept in full, are stored.
+
+Entries are JSON files under ``<root>/<key[:2]>/<key>.json``. Entries older
+than ``ttl`` seconds are ignored and dropped. When the store grows past
+``max_bytes``, the least recently used entries are evicted.
+
+Enable with ``PB_RESULT_CACHE=<dir>`` (or the ``result_cache`` argument of
+``execute_utility``). ``PB_RESULT_CACHE_MAX_MB`` (default 512) and
+``PB_RESULT_CACHE_TTL`` (seconds, default: no expiry) tune eviction.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 512
+# Not part of a utility's behaviour
+_IGNORED_DIRS = {"__pycache__", ".git", ".pytest_cache", "venv", ".venv"}
+# Per utility directory: (stat signature of the tree, its source hash)
+_tree_hashes: Dict[str, Tuple[Tuple, str]] = {}
+_tree_lock = threading.Lock()
+
+
+def default_result_cache() -> Optional["ResultCache"]:
+    """Return the cache configured with ``PB_RESULT_CACHE``, if any."""
+    root = os.getenv("PB_RESULT_CACHE")
+    if not root:
+        return None
+    max_mb = float(os.getenv("PB_RESULT_CACHE_MAX_MB") or DEFAULT_MAX_MB)
+    ttl = os.getenv("PB_RESULT_CACHE_TTL")
+    return ResultCache(
+        Path(root).expanduser(),
+        max_bytes=int(max_mb * 2**20),
+        ttl=float(ttl) if ttl else None,
+    )
+
+
+def _tree_files(util_dir: Path) -> List[Path]:
+    files = []
+    for dirpath, dirnames, filenames in os.walk(util_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in _IGNORED_DIRS)
+        files.extend(
+            Path(dirpath) / name
+            for name in sorted(filenames)
+            if not name.endswith((".pyc", ".pyo"))
+        )
+    return files
+
+
+def source_tree_hash(util_dir: Path) -> str:
+    """Hash the relative paths and contents of every file of a utility.
+
+    Contents are only re-read when a file's size or mtime changed since the
+    last call in this process.
+    """
+    files = _tree_files(util_dir)
+    signature = []
+    for path in files:
+        stat = path.stat()
+        signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+    signature_key = tuple(signature)
+    with _tree_lock:
+        cached = _tree_hashes.get(str(util_dir))
+    if cached is not None and cached[0] == signature_key:
+        return cached[1]
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(path.relative_to(util_dir).as_posix().encode("utf-8") + b"\0")
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    value = digest.hexdigest()
+    with _tree_lock:
+        _tree_hashes[str(util_dir)] = (signature_key, value)
+    return value
+
+
+def canonical_hash(value: Any) -> Optional[str]:
+    """Hash of the canonical JSON form of ``value``; None if not serializable."""
+    try:
+        canonical = json.dumps(
+            value, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def read_contract(util_dir: Path) -> Dict[str, Any]:
+    """Return a utility's ``utility_contract.json``, or {} if there is none."""
+    try:
+        contract = json.loads((util_dir / "utility_contract.json").read_text())
+    except (OSError, ValueError):
+        return {}
+    return contract if isinstance(contract, dict) else {}
+
+
+def utility_fingerprint(util_dir: Path) -> str:
+    """Hash of a utility's contract version and source tree."""
+    version = str(read_contract(util_dir).get("version", ""))
+    tree = source_tree_hash(util_dir)
+    return hashlib.sha256(f"{version}\0{tree}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """A directory of memoized entrypoint results."""
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = DEFAULT_MAX_MB * 2**20,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Estimated size of the store; None until the first scan
+        self._size: Optional[int] = None
+
+    def key(
+        self,
+        project_dir: Path,
+        utility: str,
+        entrypoint: str,
+        params: Dict[str, Any],
+    ) -> Optional[str]:
+        """Cache key for a call, or None when the call must not be cached."""
+        util_dir = Path(project_dir) / utility
+        if read_contract(util_dir).get("cache_safe") is not True:
+            return None
+        digest = canonical_hash(params)
+        if digest is None:
+            return None
+        parts = [utility, utility_fingerprint(util_dir), entrypoint, digest]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored ``{"return", "stdout", "stderr"}`` for ``key``."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None and self._expired(entry.get("created", 0), time.time()):
+            path.unlink(missing_ok=True)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        try:
+            # Recency for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return {k: entry.get(k) for k in ("return", "stdout", "stderr")}
+
+    def put(
+        self,
+        key: str,
+        return_value: Any,
+        stdout: str = "",
+        stderr: str = "",
+    ) -> bool:
+        """Store a result; returns False if it is not JSON-serializable."""
+        entry = {
+            "created": time.time(),
+            "return": return_value,
+            "stdout": stdout,
+            "stderr": stderr,
+        }
+        try:
+            data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        except (TypeError, ValueError):
+            logger.debug("Result for %s is not JSON-serializable; not cached", key)
+            return False
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data)
+            scan = self._size is None or self._size > self.max_bytes
+        if scan:
+            self.prune()
+        return True
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def prune(self) -> int:
+        """Drop expired entries, then LRU entries down to 90% of ``max_bytes``.
+
+        Returns the number of entries removed.
+        """
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        target = self.max_bytes * 0.9 if total > self.max_bytes else None
+        for mtime, size, path in entries:
+            # An entry is at least as old as its mtime (hits refresh it)
+            expired = self.ttl is not None and now - mtime > self.ttl
+            if not expired and (target is None or total <= target):
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+        return removed
+
+    def clear(self) -> int:
+        """Remove every entry; returns how many there were."""
+        entries = self._entries()
+        for _, _, path in entries:
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._size = 0
+        return len(entries)
+
+    def status(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {
+            "root": str(self.root),
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
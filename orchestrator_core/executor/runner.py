@@ -1,15 +1,38 @@
-import io
-import importlib
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
 import logging
+import os
+import shutil
 import subprocess
 import sys
-from contextlib import redirect_stdout, redirect_stderr
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .capture import OutputCapture, capture_output
+from .deps import DependencyConflictError, MergedRequirements, project_requirements
+from .loader import load_entrypoint
+from .pkgstore import PackageStore, default_package_store
+from .process import ExecutionError, run_in_subprocess
+from .result_cache import ResultCache, default_result_cache
+from .venv_template import VenvTemplates, default_venv_templates, interpreter_id
+from .wheelhouse import default_wheelhouse
 
 logger = logging.getLogger(__name__)
 
+# Written into the venv after a successful install; records what it was built from
+ENV_STAMP = ".pb_env.json"
+# The merged requirement set of all utilities, installed in one pass
+REQUIREMENTS_FILE = ".pb_requirements.txt"
+# Next to the venv; held while the venv is checked, built or installed into
+ENV_LOCK = ".pb_env.lock"
+EXECUTION_MODES = ("inprocess", "subprocess", "pool", "forkserver")
+
 
 @dataclass
 class ExecutionResult:
@@ -26,51 +49,531 @@ def _venv_bin(venv_dir: Path, name: str) -> Path:
     return venv_dir / subdir / name
 
 
-def create_virtualenv(venv_dir: Path) -> None:
-    """Create a virtual environment at the given path."""
+def create_virtualenv(
+    venv_dir: Path,
+    with_pip: bool = True,
+    venv_templates: Optional[VenvTemplates] = None,
+) -> None:
+    """Create a virtual environment at the given path.
+
+    With ``venv_templates`` (default: ``PB_VENV_TEMPLATES``) a venv with pip is
+    cloned from the interpreter's template instead of being built from scratch.
+    """
+    templates = venv_templates or default_venv_templates()
+    if with_pip and templates is not None:
+        method = templates.clone(venv_dir)
+        logger.info(
+            "Cloned virtual environment template into %s (%s)", venv_dir, method
+        )
+        return
     logger.info("Creating virtual environment at %s", venv_dir)
-    subprocess.run([sys.executable, "-m", "venv", str(venv_dir)], check=True)
+    args = [sys.executable, "-m", "venv", str(venv_dir)]
+    if not with_pip:
+        args.append("--without-pip")
+    subprocess.run(args, check=True)
+
 
+def install_requirements(
+    venv_dir: Path,
+    requirements: Path,
+    force_reinstall: bool = False,
+    wheelhouse: Optional[Path] = None,
+) -> None:
+    """Install requirements from a file into the provided venv.
 
-def install_requirements(venv_dir: Path, requirements: Path) -> None:
-    """Install requirements from a file into the provided venv."""
-    pip = _venv_bin(venv_dir, "pip")
+    Uses pip, which shares its wheel cache across venvs. With ``PB_INSTALLER=uv``
+    and ``uv`` on PATH, uv is used instead for parallel downloads. With a
+    ``wheelhouse``, packages are installed from it only, without any index.
+    """
     logger.info("Installing requirements from %s", requirements)
-    subprocess.run([str(pip), "install", "-r", str(requirements)], check=True)
+    if os.getenv("PB_INSTALLER") == "uv" and shutil.which("uv"):
+        args = ["uv", "pip", "install", "--python", str(_venv_bin(venv_dir, "python"))]
+        args += ["-r", str(requirements)]
+        if force_reinstall:
+            args.append("--reinstall")
+    else:
+        pip = _venv_bin(venv_dir, "pip")
+        args = [str(pip), "install", "-r", str(requirements)]
+        if force_reinstall:
+            args.append("--force-reinstall")
+    if wheelhouse is not None:
+        args += ["--no-index", "--find-links", str(wheelhouse)]
+    subprocess.run(args, check=True)
 
 
-def prepare_environment(project_dir: Path) -> Path:
-    """Ensure a virtual environment exists and install utility requirements."""
+def requirements_hash(merged: MergedRequirements) -> str:
+    """Hash the interpreter version and a project's merged requirement set."""
+    digest = hashlib.sha256(interpreter_id().encode("utf-8"))
+    digest.update(merged.text().encode("utf-8"))
+    # Included requirement/constraint files are part of the set too
+    for line in merged.passthrough:
+        option, _, arg = line.partition(" ")
+        path = Path(arg.strip())
+        if option in ("-r", "--requirement", "-c", "--constraint") and path.is_file():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def environment_version(venv_dir: Path) -> Optional[int]:
+    """Changes whenever the venv is (re)installed; for long-lived workers."""
+    try:
+        return (venv_dir / ENV_STAMP).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_stamp(venv_dir: Path) -> Optional[dict]:
+    try:
+        return json.loads((venv_dir / ENV_STAMP).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _environment_lock(project_dir: Path) -> Iterator[None]:
+    """Hold an exclusive lock on a project's venv, across threads and processes."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - not available on Windows
+        yield
+        return
+    with open(project_dir / ENV_LOCK, "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def prepare_environment(
+    project_dir: Path,
+    force_reinstall: bool = False,
+    wheelhouse: Optional[Path] = None,
+    package_store: Optional[PackageStore] = None,
+    venv_templates: Optional[VenvTemplates] = None,
+) -> Path:
+    """Ensure a virtual environment exists and install utility requirements.
+
+    The ``requirements.txt`` and contract ``deps`` of every utility are merged
+    into one requirement set (see :mod:`.deps`) and installed in a single pass;
+    conflicting requirements raise :class:`DependencyConflictError` before
+    anything is installed. The hash of the merged set and interpreter version is
+    stamped into the venv after a successful install, and the installer is skipped
+    entirely while it still matches. A venv built by a different interpreter is
+    recreated. ``force_reinstall`` ignores the stamp and reinstalls everything.
+    ``wheelhouse`` (default: ``PB_WHEELHOUSE``) installs offline from a local
+    wheel directory built by :func:`.wheelhouse.build_wheelhouse`.
+    With a ``package_store`` (default: ``PB_PACKAGE_STORE``) the venv is created
+    without pip and packages are hardlinked from the shared store instead; such
+    venvs are rebuilt rather than patched when requirements change. Otherwise a
+    new venv is cloned from a template when ``venv_templates`` (default:
+    ``PB_VENV_TEMPLATES``) is set, see :mod:`.venv_template`. Concurrent calls
+    for the same project, from any thread or process, take turns on an
+    exclusive lock (``<project>/.pb_env.lock``) until the stamp is written.
+    """
+    merged = project_requirements(project_dir)
+    if merged.conflicts:
+        raise DependencyConflictError(merged.conflicts)
+    with _environment_lock(project_dir):
+        return _prepare_environment(
+            project_dir,
+            merged,
+            force_reinstall,
+            wheelhouse,
+            package_store,
+            venv_templates,
+        )
+
+
+def _prepare_environment(
+    project_dir: Path,
+    merged: MergedRequirements,
+    force_reinstall: bool,
+    wheelhouse: Optional[Path],
+    package_store: Optional[PackageStore],
+    venv_templates: Optional[VenvTemplates],
+) -> Path:
     venv_dir = project_dir / "venv"
+    stamp = _read_stamp(venv_dir)
+    if (
+        venv_dir.exists()
+        and stamp is not None
+        and stamp.get("interpreter") != interpreter_id()
+    ):
+        logger.info("Interpreter changed; recreating virtual environment")
+        shutil.rmtree(venv_dir)
+        stamp = None
+    store = package_store or default_package_store()
+    store_root = str(store.root) if store is not None else None
+    fingerprint = requirements_hash(merged)
+    if (
+        not force_reinstall
+        and stamp
+        and stamp.get("requirements_hash") == fingerprint
+        and stamp.get("package_store") == store_root
+    ):
+        logger.info("Requirements unchanged; skipping install")
+        return venv_dir
+    if store is not None and venv_dir.exists():
+        shutil.rmtree(venv_dir)
     if not venv_dir.exists():
-        create_virtualenv(venv_dir)
-    for util_dir in project_dir.iterdir():
-        if not util_dir.is_dir() or util_dir.name == "venv":
-            continue
-        req_file = util_dir / "requirements.txt"
-        if req_file.exists():
-            install_requirements(venv_dir, req_file)
+        create_virtualenv(
+            venv_dir, with_pip=store is None, venv_templates=venv_templates
+        )
+    # Drop the stamp first so an interrupted install is retried next time
+    (venv_dir / ENV_STAMP).unlink(missing_ok=True)
+    venv_dir.mkdir(parents=True, exist_ok=True)
+    if merged.requirements or merged.passthrough:
+        req_file = venv_dir / REQUIREMENTS_FILE
+        req_file.write_text(merged.text())
+        wheelhouse = wheelhouse or default_wheelhouse()
+        if store is not None:
+            store.install(venv_dir, req_file, wheelhouse=wheelhouse)
+        else:
+            install_requirements(
+                venv_dir,
+                req_file,
+                force_reinstall=force_reinstall,
+                wheelhouse=wheelhouse,
+            )
+    (venv_dir / ENV_STAMP).write_text(
+        json.dumps(
+            {
+                "interpreter": interpreter_id(),
+                "requirements_hash": fingerprint,
+                "utilities": sorted(merged.by_utility),
+                "package_store": store_root,
+            },
+            indent=2,
+        )
+    )
     return venv_dir
 
 
 def execute_utility(
-    project_dir: Path, utility: str, entrypoint: str, params: Dict[str, Any]
+    project_dir: Path,
+    utility: str,
+    entrypoint: str,
+    params: Dict[str, Any],
+    force_reinstall: bool = False,
+    wheelhouse: Optional[Path] = None,
+    mode: Optional[str] = None,
+    timeout: Optional[float] = None,
+    memory_limit: Optional[int] = None,
+    cancel: Optional[threading.Event] = None,
+    result_cache: Optional[ResultCache] = None,
+    use_cache: bool = True,
+    capture: Optional[OutputCapture] = None,
+) -> ExecutionResult:
+    """Execute an entrypoint for a single utility within a project.
+
+    ``mode`` (default: ``PB_EXECUTION_MODE`` or ``"inprocess"``) selects where
+    the entrypoint runs. ``"inprocess"`` imports the utility into this
+    interpreter, as part of a per-project package rather than through
+    ``sys.path`` (see :mod:`.loader`), so concurrent calls from several threads
+    neither see each other's modules nor output. An ``async def`` entrypoint
+    is run to completion on an event loop of its own; use
+    :func:`execute_utility_async` to await it on a running loop.
+    ``"subprocess"`` runs it in a fresh worker on the project venv's
+    interpreter (see :mod:`.process`), which honours ``timeout`` (seconds),
+    ``memory_limit`` (bytes) and ``cancel``; failures there raise
+    :class:`.process.ExecutionError`. ``"pool"`` reuses warm workers (see
+    :mod:`.pool`): those of the project's pool server when one is running,
+    otherwise a pool owned by this process. Pool workers get their memory limit
+    when the pool is created, and ``cancel`` needs the process-local pool.
+    ``"forkserver"`` forks each call from a parent with the utility (and
+    ``PB_FORKSERVER_PRELOAD``) already imported (see :mod:`.forkserver`).
+
+    With a ``result_cache`` (default: ``PB_RESULT_CACHE``), calls to utilities
+    whose contract sets ``cache_safe`` are memoized (see :mod:`.result_cache`).
+    A hit returns without preparing the venv or importing anything.
+    ``force_reinstall`` skips the lookup but still stores the new result, and
+    ``use_cache=False`` bypasses the cache altogether. Calls whose output
+    overflowed ``capture`` are not stored.
+
+    Output goes to ``capture`` (default: a fresh :class:`.capture.OutputCapture`)
+    as it is written, which bounds what is kept and lets other threads follow
+    it live. The capture is closed when the call returns; the result's
+    ``stdout``/``stderr`` (and those of an :class:`.process.ExecutionError`)
+    are what it kept.
+    """
+    mode = _check_mode(mode, timeout, memory_limit, cancel)
+    capture = capture if capture is not None else OutputCapture()
+    try:
+        cache, key, hit = _lookup(
+            result_cache,
+            use_cache,
+            force_reinstall,
+            project_dir,
+            utility,
+            entrypoint,
+            params,
+        )
+        if hit is not None:
+            value = _replay(hit, capture)
+        else:
+            value = _execute_utility(
+                project_dir,
+                utility,
+                entrypoint,
+                params,
+                mode=mode,
+                force_reinstall=force_reinstall,
+                wheelhouse=wheelhouse,
+                timeout=timeout,
+                memory_limit=memory_limit,
+                cancel=cancel,
+                capture=capture,
+            )
+    except ExecutionError as exc:
+        exc.stdout, exc.stderr = capture.stdout, capture.stderr
+        raise
+    finally:
+        capture.close()
+    result = ExecutionResult(
+        return_value=value, stdout=capture.stdout, stderr=capture.stderr
+    )
+    # Truncated output would be replayed as if it were complete
+    if key is not None and hit is None and not any(capture.dropped.values()):
+        cache.put(key, result.return_value, result.stdout, result.stderr)
+    return result
+
+
+async def execute_utility_async(
+    project_dir: Path,
+    utility: str,
+    entrypoint: str,
+    params: Dict[str, Any],
+    force_reinstall: bool = False,
+    wheelhouse: Optional[Path] = None,
+    mode: Optional[str] = None,
+    timeout: Optional[float] = None,
+    memory_limit: Optional[int] = None,
+    cancel: Optional[threading.Event] = None,
+    result_cache: Optional[ResultCache] = None,
+    use_cache: bool = True,
+    capture: Optional[OutputCapture] = None,
 ) -> ExecutionResult:
-    """Execute an entrypoint for a single utility within a project."""
-    prepare_environment(project_dir)
-    if str(project_dir) not in sys.path:
-        sys.path.insert(0, str(project_dir))
+    """Awaitable :func:`execute_utility`, taking the same arguments.
+
+    In process, an ``async def`` entrypoint is awaited on the running event
+    loop, so many I/O-bound calls can be in flight without a thread each (see
+    :func:`call_entrypoint_async`). Preparing the venv, cache access and
+    synchronous entrypoints run in worker threads. Out-of-process modes run
+    :func:`execute_utility` in a worker thread; cancelling the awaiting task
+    does not stop such a call, so pass ``cancel`` for that.
+    """
+    mode = _check_mode(mode, timeout, memory_limit, cancel)
+    if mode != "inprocess":
+        return await asyncio.to_thread(
+            functools.partial(
+                execute_utility,
+                project_dir,
+                utility,
+                entrypoint,
+                params,
+                force_reinstall=force_reinstall,
+                wheelhouse=wheelhouse,
+                mode=mode,
+                timeout=timeout,
+                memory_limit=memory_limit,
+                cancel=cancel,
+                result_cache=result_cache,
+                use_cache=use_cache,
+                capture=capture,
+            )
+        )
+    capture = capture if capture is not None else OutputCapture()
     try:
-        module = importlib.import_module(utility)
-        func = getattr(module, entrypoint)
+        cache, key, hit = await asyncio.to_thread(
+            _lookup,
+            result_cache,
+            use_cache,
+            force_reinstall,
+            project_dir,
+            utility,
+            entrypoint,
+            params,
+        )
+        if hit is not None:
+            value = _replay(hit, capture)
+        else:
+            await asyncio.to_thread(
+                prepare_environment,
+                project_dir,
+                force_reinstall=force_reinstall,
+                wheelhouse=wheelhouse,
+            )
+            value = await call_entrypoint_async(
+                project_dir, utility, entrypoint, params, capture
+            )
+    finally:
+        capture.close()
+    result = ExecutionResult(
+        return_value=value, stdout=capture.stdout, stderr=capture.stderr
+    )
+    if key is not None and hit is None and not any(capture.dropped.values()):
+        await asyncio.to_thread(
+            cache.put, key, result.return_value, result.stdout, result.stderr
+        )
+    return result
+
+
+async def call_entrypoint_async(
+    project_dir: Path,
+    utility: str,
+    entrypoint: str,
+    params: Dict[str, Any],
+    capture: OutputCapture,
+) -> Any:
+    """Run an entrypoint in process without blocking the running event loop.
+
+    A coroutine function is awaited on the loop, with its output going to
+    ``capture``; anything else is called in a worker thread. The project venv
+    is assumed to be prepared already.
+    """
+    func = await asyncio.to_thread(_load, project_dir, utility, entrypoint)
+    if inspect.iscoroutinefunction(func):
+        with capture_output(capture):
+            return await func(**params)
+    return await asyncio.to_thread(_call, func, params, capture)
+
+
+def _check_mode(
+    mode: Optional[str],
+    timeout: Optional[float],
+    memory_limit: Optional[int],
+    cancel: Optional[threading.Event],
+) -> str:
+    """Resolve the execution mode and reject options it cannot honour."""
+    mode = mode or os.getenv("PB_EXECUTION_MODE") or "inprocess"
+    if mode not in EXECUTION_MODES:
+        raise ValueError(
+            f"Unknown execution mode {mode!r}; use one of {EXECUTION_MODES}"
+        )
+    if mode == "inprocess" and (timeout or memory_limit or cancel):
+        raise ValueError("timeout, memory_limit and cancel need an out-of-process mode")
+    if mode == "pool" and memory_limit:
+        raise ValueError("pool workers take their memory limit from the pool")
+    return mode
+
+
+def _lookup(
+    result_cache: Optional[ResultCache],
+    use_cache: bool,
+    force_reinstall: bool,
+    project_dir: Path,
+    utility: str,
+    entrypoint: str,
+    params: Dict[str, Any],
+) -> Tuple[Optional[ResultCache], Optional[str], Optional[Dict[str, Any]]]:
+    """Return the cache, the call's key (None if not cached) and any hit."""
+    cache = (result_cache or default_result_cache()) if use_cache else None
+    key = cache.key(project_dir, utility, entrypoint, params) if cache else None
+    hit = cache.get(key) if key is not None and not force_reinstall else None
+    return cache, key, hit
+
+
+def _replay(hit: Dict[str, Any], capture: OutputCapture) -> Any:
+    """Write a cached call's output to ``capture``; return its value."""
+    capture.write("stdout", hit["stdout"] or "")
+    capture.write("stderr", hit["stderr"] or "")
+    return hit["return"]
+
+
+def _load(project_dir: Path, utility: str, entrypoint: str) -> Callable:
+    try:
+        return load_entrypoint(project_dir, utility, entrypoint)
     except Exception as exc:  # pragma: no cover - import errors handled
         raise RuntimeError(
             f"Failed to load entrypoint '{entrypoint}' from utility '{utility}': {exc}"
         ) from exc
-    stdout_buf = io.StringIO()
-    stderr_buf = io.StringIO()
-    with redirect_stdout(stdout_buf), redirect_stderr(stderr_buf):
+
+
+def _call(func: Callable, params: Dict[str, Any], capture: OutputCapture) -> Any:
+    """Call an entrypoint in this thread; async ones run on a new event loop."""
+    with capture_output(capture):
         result = func(**params)
-    return ExecutionResult(
-        return_value=result, stdout=stdout_buf.getvalue(), stderr=stderr_buf.getvalue()
+        if inspect.isawaitable(result):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(_wait(result))
+            if inspect.iscoroutine(result):
+                result.close()
+            raise RuntimeError(
+                f"{func.__name__} is async and this thread runs an event loop;"
+                " use execute_utility_async"
+            )
+    return result
+
+
+async def _wait(awaitable) -> Any:
+    return await awaitable
+
+
+def _execute_utility(
+    project_dir: Path,
+    utility: str,
+    entrypoint: str,
+    params: Dict[str, Any],
+    mode: str,
+    force_reinstall: bool,
+    wheelhouse: Optional[Path],
+    timeout: Optional[float],
+    memory_limit: Optional[int],
+    cancel: Optional[threading.Event],
+    capture: OutputCapture,
+) -> Any:
+    """Prepare the venv and run the entrypoint in the given (validated) mode.
+
+    Returns the entrypoint's return value; its output goes to ``capture``.
+    """
+    venv_dir = prepare_environment(
+        project_dir, force_reinstall=force_reinstall, wheelhouse=wheelhouse
     )
+    if mode == "subprocess":
+        value, _, _ = run_in_subprocess(
+            project_dir,
+            venv_dir,
+            utility,
+            entrypoint,
+            params,
+            timeout=timeout,
+            memory_limit=memory_limit,
+            cancel=cancel,
+            on_output=capture.write,
+        )
+        return value
+    if mode == "pool":
+        from .pool import get_pool, running_pool
+
+        client = running_pool(project_dir) if cancel is None else None
+        if client is not None:
+            value, _, _ = client.call(
+                utility, entrypoint, params, timeout=timeout, on_output=capture.write
+            )
+        else:
+            value, _, _ = get_pool(project_dir, venv_dir).call(
+                utility,
+                entrypoint,
+                params,
+                timeout=timeout,
+                cancel=cancel,
+                on_output=capture.write,
+            )
+        return value
+    if mode == "forkserver":
+        from .forkserver import get_forkserver
+
+        value, _, _ = get_forkserver(project_dir, venv_dir, preload=[utility]).call(
+            utility,
+            entrypoint,
+            params,
+            timeout=timeout,
+            memory_limit=memory_limit,
+            cancel=cancel,
+            on_output=capture.write,
+        )
+        return value
+    return _call(_load(project_dir, utility, entrypoint), params, capture)
@@ -0,0 +1,238 @@
+"""Prepared base venvs that project environments are cloned from.
+
+``python -m venv`` plus bootstrapping pip takes seconds per project. Instead, a
+template venv is built once per interpreter under ``<root>/<interpreter id>/``,
+optionally pre-seeded with dependencies common across the catalog, and every new
+project venv is cloned from it: regular files are reflinked where the filesystem
+supports it (copy-on-write) and hardlinked otherwise. Only the files that embed
+the venv's own path - ``pyvenv.cfg``, the activate scripts and console-script
+shebangs in ``bin/`` - are copied and rewritten for the new location. Bytecode
+caches are left behind so tracebacks never point into the template.
+
+Hardlinked files are shared with the template: like the package store, they must
+be replaced rather than edited in place, which is what pip does. Packages seeded
+into the template are present in every clone, whether or not a project asks for
+them.
+
+Enable with ``PB_VENV_TEMPLATES=<dir>`` (or the ``venv_templates`` argument of
+``prepare_environment``); the template is built on first use.
+"""
+
+import datetime
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+
+from .deps import merge_requirements
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_MANIFEST = ".pb_template.json"
+# Linux ioctl that shares a file's extents copy-on-write (btrfs, xfs, ...)
+_FICLONE = 0x40049409
+
+
+def interpreter_id() -> str:
+    """Identify the interpreter venvs are created from."""
+    return f"{sys.implementation.name}-{'.'.join(map(str, sys.version_info[:3]))}"
+
+
+def default_venv_templates() -> Optional["VenvTemplates"]:
+    """Return the templates configured with ``PB_VENV_TEMPLATES``, if any."""
+    root = os.getenv("PB_VENV_TEMPLATES")
+    return VenvTemplates(Path(root).expanduser()) if root else None
+
+
+def common_catalog_requirements(
+    per_utility: Dict[str, List[str]], min_utilities: int = 2
+) -> List[str]:
+    """Merge the requirements on packages used by at least ``min_utilities``.
+
+    Packages whose utilities want incompatible versions are left out; projects
+    install the version they need themselves.
+    """
+    users: Dict[str, set] = {}
+    for utility, lines in per_utility.items():
+        for line in lines:
+            users.setdefault(canonicalize_name(Requirement(line).name), set()).add(
+                utility
+            )
+    common = {name for name, utils in users.items() if len(utils) >= min_utilities}
+    subset = {
+        utility: [
+            line
+            for line in lines
+            if canonicalize_name(Requirement(line).name) in common
+        ]
+        for utility, lines in per_utility.items()
+    }
+    return merge_requirements({u: ls for u, ls in subset.items() if ls}).requirements
+
+
+def _reflink(source: Path, out: Path) -> None:
+    import fcntl
+
+    with open(source, "rb") as src, open(out, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    shutil.copystat(source, out)
+
+
+class VenvTemplates:
+    """A directory of template venvs, one per interpreter."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # First of "reflink", "hardlink", "copy" that works; found on first clone
+        self._method: Optional[str] = None
+
+    @property
+    def path(self) -> Path:
+        """The template for the running interpreter."""
+        return self.root / interpreter_id()
+
+    def manifest(self) -> Optional[dict]:
+        try:
+            return json.loads((self.path / TEMPLATE_MANIFEST).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def ensure(self, seed: Optional[List[str]] = None, rebuild: bool = False) -> Path:
+        """Build the template unless it exists; ``seed`` is pre-installed into it.
+
+        The template is built in a staging directory and renamed into place, so
+        a concurrent or interrupted build never leaves a half-made template.
+        """
+        if not rebuild and self.manifest() is not None:
+            return self.path
+        staging = Path(tempfile.mkdtemp(prefix=".build-", dir=self.root))
+        try:
+            logger.info("Building venv template for %s", interpreter_id())
+            subprocess.run([sys.executable, "-m", "venv", str(staging)], check=True)
+            if seed:
+                req_file = staging / "seed-requirements.txt"
+                req_file.write_text("".join(f"{line}\n" for line in seed))
+                pip = staging / ("Scripts" if os.name == "nt" else "bin") / "pip"
+                subprocess.run([str(pip), "install", "-r", str(req_file)], check=True)
+            manifest = {
+                "interpreter": interpreter_id(),
+                # Path baked into the template's scripts, rewritten on clone
+                "prefix": str(staging),
+                "seed": list(seed or []),
+                "built_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            (staging / TEMPLATE_MANIFEST).write_text(json.dumps(manifest, indent=2))
+            old = None
+            if rebuild and self.path.exists():
+                old = Path(tempfile.mkdtemp(prefix=".old-", dir=self.root))
+                self.path.rename(old / "template")
+            try:
+                staging.rename(self.path)
+            except OSError:
+                # Another process installed a template first
+                if self.manifest() is None:
+                    raise
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return self.path
+
+    def _clone_file(self, source: Path, out: Path) -> None:
+        # Start from the last method that worked; if it stops working (e.g. a
+        # hardlink across filesystems), fall back through the rest down to copy
+        methods = ["reflink", "hardlink", "copy"]
+        if self._method:
+            start = methods.index(self._method)
+            methods = methods[start:]
+        for method in methods:
+            try:
+                if method == "reflink":
+                    _reflink(source, out)
+                elif method == "hardlink":
+                    os.link(source, out)
+                else:
+                    shutil.copy2(source, out)
+            except (OSError, ImportError):
+                if method == "copy":
+                    raise
+                out.unlink(missing_ok=True)
+                continue
+            self._method = method
+            return
+
+    def clone(self, venv_dir: Path) -> str:
+        """Clone the template into ``venv_dir``; return how files were cloned.
+
+        The clone is assembled next to ``venv_dir`` and renamed into place, so
+        concurrent callers never see or build on a partial venv.
+        """
+        template = self.ensure()
+        prefix = self.manifest()["prefix"].encode()
+        venv_dir = Path(venv_dir).absolute()
+        target = str(venv_dir).encode()
+        venv_dir.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".venv-", dir=venv_dir.parent))
+        try:
+            self._copy_tree(template, staging, prefix, target)
+            try:
+                staging.rename(venv_dir)
+            except OSError:
+                # Another process cloned it first
+                if not (venv_dir / "pyvenv.cfg").exists():
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return self._method or "copy"
+
+    def _copy_tree(
+        self, template: Path, dest: Path, prefix: bytes, target: bytes
+    ) -> None:
+        for current, dirs, files in os.walk(template):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            rel = Path(current).relative_to(template)
+            out_dir = dest / rel
+            out_dir.mkdir(parents=True, exist_ok=True)
+            for name in dirs + files:
+                source = Path(current) / name
+                out = out_dir / name
+                if source.is_symlink():
+                    link = os.readlink(source).encode()
+                    out.symlink_to(os.fsdecode(link.replace(prefix, target)))
+                    dirs[:] = [d for d in dirs if d != name]
+                elif name in dirs:
+                    continue
+                elif name == TEMPLATE_MANIFEST:
+                    continue
+                elif rel.parts[:1] in (("bin",), ("Scripts",)) or (
+                    name == "pyvenv.cfg" and not rel.parts
+                ):
+                    out.write_bytes(source.read_bytes().replace(prefix, target))
+                    shutil.copymode(source, out)
+                else:
+                    self._clone_file(source, out)
+
+    def status(self) -> Dict[str, object]:
+        """Describe the templates under the root."""
+        templates = {}
+        for path in sorted(self.root.iterdir()):
+            if path.name.startswith("."):
+                continue
+            try:
+                manifest = json.loads((path / TEMPLATE_MANIFEST).read_text())
+            except (OSError, ValueError):
+                continue
+            templates[path.name] = {
+                "seed": manifest.get("seed", []),
+                "built_at": manifest.get("built_at"),
+            }
+        return {"root": str(self.root), "templates": templates}
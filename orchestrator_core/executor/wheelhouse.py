@@ -0,0 +1,99 @@
+"""Local wheelhouse for offline, index-free installs.
+
+``build_wheelhouse`` collects the ``deps`` of every catalog utility and the
+``requirements.txt`` of any given project utilities, and builds or downloads
+wheels for all of them into one directory with ``pip wheel``. The executor then
+installs with ``--no-index --find-links <wheelhouse>``, so environment setup never
+touches a package index. The wheelhouse to use comes from ``PB_WHEELHOUSE`` or
+the ``wheelhouse`` argument of ``prepare_environment``.
+"""
+
+import datetime
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .deps import contract_requirement, merge_requirements, utility_requirements
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "wheelhouse.json"
+
+
+def default_wheelhouse() -> Optional[Path]:
+    """Return the wheelhouse configured with ``PB_WHEELHOUSE``, if any."""
+    path = os.getenv("PB_WHEELHOUSE")
+    return Path(path).expanduser() if path else None
+
+
+def catalog_requirements(specs: Dict[str, dict]) -> Dict[str, List[str]]:
+    """Return the contract ``deps`` of each catalog utility as requirement lines."""
+    per_utility: Dict[str, List[str]] = {}
+    for name, spec in specs.items():
+        deps = spec.get("deps") or []
+        reqs = [contract_requirement(d) for d in deps if isinstance(d, dict)]
+        lines = [req for req in reqs if req]
+        if lines:
+            per_utility[name] = lines
+    return per_utility
+
+
+def project_utility_requirements(project_dirs: Iterable[Path]) -> Dict[str, List[str]]:
+    """Return the requirement lines of every utility in the given projects."""
+    per_utility: Dict[str, List[str]] = {}
+    for project_dir in project_dirs:
+        for util_dir in sorted(Path(project_dir).iterdir()):
+            if not util_dir.is_dir() or util_dir.name == "venv":
+                continue
+            lines = utility_requirements(util_dir)
+            if lines:
+                per_utility[f"{project_dir.name}/{util_dir.name}"] = lines
+    return per_utility
+
+
+def _pip_wheel(dest: Path, requirements: List[str]) -> None:
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("".join(f"{line}\n" for line in requirements))
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "pip", "wheel", "--wheel-dir", str(dest)]
+            + ["--find-links", str(dest), "-r", f.name],
+            check=True,
+        )
+    finally:
+        os.unlink(f.name)
+
+
+def build_wheelhouse(
+    dest: Path, per_utility: Dict[str, List[str]]
+) -> Dict[str, object]:
+    """Build or download wheels for every requirement into ``dest``.
+
+    Requirements that agree across utilities are resolved together in one
+    ``pip wheel`` run. A package whose utilities want incompatible versions is
+    fetched once per distinct requirement, so the wheelhouse holds every version
+    some utility needs. Wheels already in ``dest`` are reused. Writes and returns
+    a manifest of what was requested.
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    merged = merge_requirements(per_utility)
+    if merged.requirements or merged.passthrough:
+        _pip_wheel(dest, merged.passthrough + merged.requirements)
+    separate = sorted({req for c in merged.conflicts for _, req in c.sources})
+    for req in separate:
+        logger.info("Building %s separately (conflicting versions)", req)
+        _pip_wheel(dest, [req])
+    manifest = {
+        "built_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": ".".join(map(str, sys.version_info[:3])),
+        "utilities": {name: per_utility[name] for name in sorted(per_utility)},
+        "requirements": merged.passthrough + merged.requirements + separate,
+        "wheels": sorted(p.name for p in dest.glob("*.whl")),
+    }
+    (dest / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
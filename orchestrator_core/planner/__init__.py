@@ -1,4 +1,14 @@
 from .parser import prompt_to_plan, prompt_to_capabilities
 from .maker import make_plan
+from .batch import plan_batch
+from .dag import PlanGraph, PlanCycleError, resolve_step_references
 
-__all__ = ["prompt_to_plan", "prompt_to_capabilities", "make_plan"]
+__all__ = [
+    "prompt_to_plan",
+    "prompt_to_capabilities",
+    "make_plan",
+    "plan_batch",
+    "PlanGraph",
+    "PlanCycleError",
+    "resolve_step_references",
+]
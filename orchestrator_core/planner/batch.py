@@ -0,0 +1,133 @@
+"""Batch planner: plan many prompts concurrently against one shared catalog context.
+
+The catalog is loaded and the planner instructions are built once per batch; each
+prompt then gets its own LLM call through an async OpenAI client, bounded by a
+concurrency limit and a per-prompt timeout. Results are yielded in completion
+order and tagged with the index of the prompt in the input.
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator, Iterable, Optional
+
+from orchestrator_core.telemetry import call_with_retries_async, track_llm_call
+
+from . import parser
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 60.0
+
+
+async def _llm_plan(client, instructions: str, prompt: str):
+    """Request a plan for a single prompt; raise on any failure."""
+    with track_llm_call(
+        "planner.batch", parser.PLANNER_MODEL, instructions + prompt
+    ) as call:
+        resp = await call_with_retries_async(
+            call,
+            lambda: client.responses.create(
+                model=parser.PLANNER_MODEL,
+                instructions=instructions,
+                input=prompt,
+            ),
+        )
+        call.record_response(resp)
+    return parser._parse_plan_content(parser._extract_output_text(resp))
+
+
+async def plan_batch(
+    prompts: Iterable[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    mode: Optional[str] = None,
+    reuse: Optional[bool] = None,
+    specs: Optional[dict] = None,
+) -> AsyncIterator[dict]:
+    """Plan ``prompts`` concurrently and yield results as they complete.
+
+    Each result is a dict ``{"index", "prompt", "plan", "error", "reused"}``. When
+    the LLM call fails or exceeds ``timeout`` seconds, ``plan`` holds the keyword
+    fallback plan and ``error`` describes what went wrong; otherwise ``error`` is
+    ``None``. ``reused`` is True when a near-duplicate past prompt's plan was used
+    (see :mod:`orchestrator_core.planner.reuse`). In ``"local"`` mode all prompts
+    are ranked in a single vectorized pass. ``specs`` is the catalog to plan
+    against; it is loaded once when not given.
+    """
+    prompts = list(prompts)
+    if not prompts:
+        return
+    if specs is None:
+        specs = parser.load_catalog()
+    if parser._planner_mode(mode) == "local":
+        from .ranker import local_plans
+
+        for index, plan in enumerate(local_plans(prompts, specs=specs)):
+            yield {
+                "index": index,
+                "prompt": prompts[index],
+                "plan": plan,
+                "error": None,
+                "reused": False,
+            }
+        return
+    from orchestrator_core.catalog.index import catalog_fingerprint
+
+    from .reuse import get_reuse_index, reuse_enabled
+
+    reuse_index = get_reuse_index() if reuse_enabled(reuse) else None
+    # Shared work: done once for the whole batch
+    catalog = catalog_fingerprint(specs)
+    instructions = parser._build_instructions(list(specs.values()))
+    client = None
+    client_error: Optional[str] = None
+    try:
+        from openai import AsyncOpenAI
+
+        # Retries are done (and counted) by call_with_retries_async, not the SDK
+        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    except Exception as e:
+        client_error = f"LLM client unavailable: {e}"
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _plan_one(index: int, prompt: str) -> dict:
+        result = {"index": index, "prompt": prompt, "error": None, "reused": False}
+        self_improvement = parser._is_self_improvement(prompt)
+        if reuse_index is not None and not self_improvement:
+            reused = reuse_index.reuse(prompt, catalog)
+            if reused is not None:
+                return {**result, "plan": reused, "reused": True}
+        async with semaphore:
+            error: Optional[str] = None
+            try:
+                if self_improvement:
+                    work = asyncio.to_thread(parser.plan_self_modification, prompt)
+                elif client is None:
+                    raise RuntimeError(client_error)
+                else:
+                    work = _llm_plan(client, instructions, prompt)
+                plan = await asyncio.wait_for(work, timeout)
+                if reuse_index is not None and not self_improvement:
+                    reuse_index.add(prompt, plan, catalog)
+            except asyncio.TimeoutError:
+                error = f"Planning timed out after {timeout}s"
+                plan = parser._keyword_plan(prompt)
+            except Exception as e:
+                error = str(e)
+                plan = parser._keyword_plan(prompt)
+        return {**result, "plan": plan, "error": error}
+
+    tasks = [
+        asyncio.ensure_future(_plan_one(idx, prompt))
+        for idx, prompt in enumerate(prompts)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        if client is not None and hasattr(client, "close"):
+            try:
+                await client.close()
+            except Exception:
+                pass
@@ -0,0 +1,199 @@
+"""Compact, deterministic encoding of the catalog for the planner's LLM context.
+
+The planner used to send ``json.dumps({"utilities": [...]})`` of the raw specs:
+private discovery fields, size budgets, test lists and full JSON schemas, with
+every key repeated for every utility. This module renders each utility as a few
+signature lines instead::
+
+    statement_parser@0.2.0: Parse bank statements
+      parse(currency?: str, path: str) -> {rows: list[#S1], total: float}
+    #S1 = {amount: float, date: str, memo?: str}
+
+Utilities, entrypoints and fields are sorted by name, and object schemas used
+more than once are emitted once as shared ``#S<n>`` fragments, so the same
+catalog always yields the same bytes and provider-side prompt prefix caching
+applies across requests.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+CONTEXT_FORMATS = ("compact", "json")
+
+# Spec fields that do not help the planner choose or call a utility
+_OMIT_FIELDS = frozenset({"size_budget", "tests", "deps", "language"})
+_SCALARS = {
+    "string": "str",
+    "integer": "int",
+    "number": "float",
+    "boolean": "bool",
+    "null": "null",
+    "object": "dict",
+    "array": "list",
+}
+# Shared fragments shorter than this are cheaper inline than as a reference
+_MIN_SHARED_LEN = 24
+
+LEGEND = (
+    "Each utility is `name@version: description`, followed by its entrypoints as "
+    "`entrypoint(param: type, optional?: type) -> return type`; `#S<n>` refers to "
+    "a shared object schema defined at the end."
+)
+
+
+def public_spec(spec: dict) -> dict:
+    """Drop private (``_``-prefixed) and planning-irrelevant fields from a spec."""
+    return {
+        k: v
+        for k, v in spec.items()
+        if not k.startswith("_") and k not in _OMIT_FIELDS and v not in (None, "")
+    }
+
+
+def _canonical(schema: Any) -> str:
+    return json.dumps(schema, sort_keys=True, separators=(",", ":"))
+
+
+def _is_record(schema: Any) -> bool:
+    return isinstance(schema, dict) and isinstance(schema.get("properties"), dict)
+
+
+class _SchemaRenderer:
+    """Renders JSON schemas as short type expressions, sharing repeated records."""
+
+    def __init__(self, shared: Optional[Dict[str, str]] = None) -> None:
+        # canonical schema -> "#S<n>"
+        self.shared = shared or {}
+
+    def fields(self, schema: dict) -> List[str]:
+        required = set(schema.get("required") or [])
+        out = []
+        for name in sorted(schema["properties"]):
+            mark = "" if name in required else "?"
+            out.append(f"{name}{mark}: {self.type(schema['properties'][name])}")
+        return out
+
+    def record(self, schema: dict) -> str:
+        return "{" + ", ".join(self.fields(schema)) + "}"
+
+    def type(self, schema: Any) -> str:
+        if not isinstance(schema, dict) or not schema:
+            return "any"
+        if _is_record(schema):
+            ref = self.shared.get(_canonical(schema))
+            return ref or self.record(schema)
+        if "$ref" in schema:
+            return str(schema["$ref"]).rsplit("/", 1)[-1]
+        if "enum" in schema:
+            return "|".join(json.dumps(v) for v in schema["enum"])
+        for key in ("anyOf", "oneOf"):
+            if isinstance(schema.get(key), list):
+                return "|".join(self.type(s) for s in schema[key])
+        kind = schema.get("type")
+        if isinstance(kind, list):
+            return "|".join(_SCALARS.get(k, str(k)) for k in kind)
+        if kind == "array":
+            return f"list[{self.type(schema.get('items'))}]"
+        if kind == "object" and isinstance(schema.get("additionalProperties"), dict):
+            return f"dict[str, {self.type(schema['additionalProperties'])}]"
+        return _SCALARS.get(kind, "any")
+
+
+def _entrypoints(spec: dict) -> List[dict]:
+    eps = [ep for ep in spec.get("entrypoints") or [] if isinstance(ep, dict)]
+    return sorted(eps, key=lambda ep: str(ep.get("name", "")))
+
+
+def _shared_fragments(specs: List[dict]) -> Dict[str, str]:
+    """Number the object schemas that occur more than once, in first-seen order."""
+    counts: Dict[str, int] = {}
+
+    def _walk(schema: Any, is_params: bool = False) -> None:
+        if isinstance(schema, list):
+            for value in schema:
+                _walk(value)
+            return
+        if not isinstance(schema, dict):
+            return
+        # A parameter list is rendered as a signature, never shared
+        if _is_record(schema) and not is_params:
+            canonical = _canonical(schema)
+            counts[canonical] = counts.get(canonical, 0) + 1
+            if counts[canonical] > 1:
+                # Its nested records were already counted on first sight
+                return
+        for value in schema.values():
+            _walk(value)
+
+    for spec in specs:
+        for ep in _entrypoints(spec):
+            _walk(ep.get("parameters_schema"), is_params=True)
+            _walk(ep.get("return_schema"))
+    # Render without sharing to decide whether a fragment is worth a reference
+    plain = _SchemaRenderer()
+    worth = [
+        c
+        for c, n in counts.items()
+        if n > 1 and len(plain.record(json.loads(c))) >= _MIN_SHARED_LEN
+    ]
+    return {c: f"#S{i}" for i, c in enumerate(worth, start=1)}
+
+
+def _signature(ep: dict, renderer: _SchemaRenderer) -> str:
+    params = ep.get("parameters_schema")
+    if _is_record(params):
+        args = ", ".join(renderer.fields(params))
+    elif isinstance(params, dict) and params:
+        args = f"*: {renderer.type(params)}"
+    else:
+        args = ""
+    line = f"{ep.get('name', '')}({args})"
+    returns = ep.get("return_schema")
+    if isinstance(returns, dict) and returns:
+        line += f" -> {renderer.type(returns)}"
+    if ep.get("description"):
+        line += f": {' '.join(str(ep['description']).split())}"
+    return line
+
+
+def encode_catalog(utilities: List[dict]) -> str:
+    """Render catalog specs as compact, stable-ordered signature lines."""
+    specs = sorted(
+        (public_spec(u) for u in utilities if isinstance(u, dict)),
+        key=lambda s: (str(s.get("name", "")), str(s.get("version", ""))),
+    )
+    shared = _shared_fragments(specs)
+    renderer = _SchemaRenderer(shared)
+    lines: List[str] = []
+    for spec in specs:
+        head = str(spec.get("name", ""))
+        if spec.get("version"):
+            head += f"@{spec['version']}"
+        if spec.get("description"):
+            head += f": {' '.join(str(spec['description']).split())}"
+        lines.append(head)
+        if spec.get("aliases"):
+            lines.append(f"  aliases: {', '.join(sorted(map(str, spec['aliases'])))}")
+        for ep in _entrypoints(spec):
+            lines.append(f"  {_signature(ep, renderer)}")
+    # A fragment may itself contain other shared fragments
+    for canonical, ref in shared.items():
+        fragment = _SchemaRenderer({k: v for k, v in shared.items() if v != ref})
+        lines.append(f"{ref} = {fragment.record(json.loads(canonical))}")
+    return "\n".join(lines)
+
+
+def encode_catalog_json(utilities: List[dict]) -> str:
+    """The previous verbatim JSON encoding, kept for comparison and fallback."""
+    return json.dumps({"utilities": utilities})
+
+
+def catalog_context(utilities: List[dict], fmt: str = "compact") -> str:
+    """Return the utilities context block in format ``fmt``."""
+    if fmt == "json":
+        return encode_catalog_json(utilities)
+    if fmt != "compact":
+        raise ValueError(
+            f"Unknown context format {fmt!r}; use one of {CONTEXT_FORMATS}"
+        )
+    return f"{LEGEND}\n{encode_catalog(utilities)}"
@@ -0,0 +1,244 @@
+"""Plan DAG: execution plan steps with explicit or inferred dependencies.
+
+A step depends on the steps listed in its ``depends_on`` field and on every step
+whose output it references from ``inputs``. An output reference is a string of the
+form ``"$steps.<step_id>"`` (the whole output) or ``"$steps.<step_id>.<key>..."``
+(a field of it), anywhere inside the inputs.
+
+Serialization is backward compatible with today's ``plan.json``: plans without
+dependencies round-trip unchanged, and ``depends_on`` is only written when declared.
+"""
+
+import copy
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ConfigDict
+
+STEP_REF_RE = re.compile(r"^\$steps\.(\d+)((?:\.[^.]+)*)$")
+
+
+class PlanCycleError(ValueError):
+    """Raised when step dependencies form a cycle."""
+
+    def __init__(self, step_ids: Iterable[int]) -> None:
+        self.step_ids = sorted(step_ids)
+        super().__init__(f"Plan steps form a dependency cycle: {self.step_ids}")
+
+
+class DagStep(BaseModel):
+    """A plan step that may declare the steps it depends on."""
+
+    step_id: int
+    action: str
+    inputs: dict = {}
+    description: str = ""
+    depends_on: List[int] = []
+
+    # Keep planner extras such as "confidence" or "rationale" on round-trip
+    model_config = ConfigDict(extra="allow")
+
+
+def parse_step_reference(value: Any) -> Optional[Tuple[int, List[str]]]:
+    """Return ``(step_id, path)`` if ``value`` is an output reference, else None."""
+    if not isinstance(value, str):
+        return None
+    match = STEP_REF_RE.match(value)
+    if not match:
+        return None
+    path = [part for part in match.group(2).split(".") if part]
+    return int(match.group(1)), path
+
+
+def iter_step_references(value: Any) -> Iterator[Tuple[int, List[str]]]:
+    """Yield every output reference found in a (nested) inputs value."""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from iter_step_references(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_step_references(item)
+    else:
+        ref = parse_step_reference(value)
+        if ref is not None:
+            yield ref
+
+
+def resolve_step_references(value: Any, outputs: Dict[int, Any]) -> Any:
+    """Return a copy of ``value`` with output references replaced by the outputs.
+
+    ``outputs`` maps step ids to their return values. A path part selects a key
+    of a dict or, when numeric, an item of a list. Raises ``ValueError`` when a
+    referenced output or field is missing.
+    """
+    if isinstance(value, dict):
+        return {k: resolve_step_references(v, outputs) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [resolve_step_references(item, outputs) for item in value]
+    ref = parse_step_reference(value)
+    if ref is None:
+        return value
+    step_id, path = ref
+    if step_id not in outputs:
+        raise ValueError(f"No output from step {step_id} for {value!r}")
+    resolved = outputs[step_id]
+    for part in path:
+        try:
+            if isinstance(resolved, list):
+                resolved = resolved[int(part)]
+            else:
+                resolved = resolved[part]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError(
+                f"Output of step {step_id} has no {part!r} for {value!r}"
+            ) from None
+    return resolved
+
+
+class PlanGraph:
+    """Dependency graph over the steps of an execution plan."""
+
+    def __init__(self, steps: Iterable[DagStep]) -> None:
+        self.steps: Dict[int, DagStep] = {}
+        for step in steps:
+            if step.step_id in self.steps:
+                raise ValueError(f"Duplicate step_id {step.step_id}")
+            self.steps[step.step_id] = step
+        self.dependencies: Dict[int, Set[int]] = {}
+        for step_id, step in self.steps.items():
+            deps = set(step.depends_on)
+            deps.update(ref for ref, _ in iter_step_references(step.inputs))
+            unknown = deps - set(self.steps)
+            if unknown:
+                raise ValueError(
+                    f"Step {step_id} depends on unknown steps {sorted(unknown)}"
+                )
+            if step_id in deps:
+                raise PlanCycleError([step_id])
+            self.dependencies[step_id] = deps
+        self.dependents: Dict[int, Set[int]] = {sid: set() for sid in self.steps}
+        for step_id, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents[dep].add(step_id)
+        self._levels = self._compute_levels()
+        self._envelope: Optional[dict] = None
+        self._steps_key: Optional[str] = None
+
+    @classmethod
+    def from_plan(cls, raw_plan: Any) -> "PlanGraph":
+        """Build a graph from a list of step dicts or a dict holding one.
+
+        Dict plans are accepted when their steps live under ``"steps"`` or
+        ``"plan"``; the remaining keys are kept and restored by :meth:`to_plan`.
+        """
+        envelope = None
+        steps_key = None
+        items = raw_plan
+        if isinstance(raw_plan, dict):
+            for key in ("steps", "plan"):
+                if isinstance(raw_plan.get(key), list):
+                    steps_key = key
+                    items = raw_plan[key]
+                    break
+            else:
+                raise ValueError("Plan dict has no list of steps")
+            envelope = {k: v for k, v in raw_plan.items() if k != steps_key}
+        if not isinstance(items, list):
+            raise ValueError("Plan must be a list of steps or a dict containing one")
+        graph = cls(DagStep.model_validate(item) for item in items)
+        graph._envelope = envelope
+        graph._steps_key = steps_key
+        return graph
+
+    def _compute_levels(self) -> List[List[int]]:
+        """Kahn's algorithm grouped into levels; raises on cycles."""
+        remaining = {sid: len(deps) for sid, deps in self.dependencies.items()}
+        level = sorted(sid for sid, count in remaining.items() if count == 0)
+        levels: List[List[int]] = []
+        seen = 0
+        while level:
+            levels.append(level)
+            seen += len(level)
+            nxt: List[int] = []
+            for sid in level:
+                for child in self.dependents[sid]:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        nxt.append(child)
+            level = sorted(nxt)
+        if seen != len(self.steps):
+            placed = {sid for lvl in levels for sid in lvl}
+            raise PlanCycleError(sid for sid in self.steps if sid not in placed)
+        return levels
+
+    def topological_levels(self) -> List[List[int]]:
+        """Return step ids grouped so each level only depends on earlier levels."""
+        return [list(level) for level in self._levels]
+
+    def topological_order(self) -> List[int]:
+        """Return step ids in a dependency-respecting order."""
+        return [sid for level in self._levels for sid in level]
+
+    def ancestors(self, step_id: int) -> Set[int]:
+        """Return every step that ``step_id`` transitively depends on."""
+        found: Set[int] = set()
+        stack = list(self.dependencies[step_id])
+        while stack:
+            sid = stack.pop()
+            if sid not in found:
+                found.add(sid)
+                stack.extend(self.dependencies[sid])
+        return found
+
+    def descendants(self, step_ids: Iterable[int]) -> Set[int]:
+        """Return every step that transitively depends on any of ``step_ids``."""
+        found: Set[int] = set()
+        stack = [child for sid in step_ids for child in self.dependents[sid]]
+        while stack:
+            sid = stack.pop()
+            if sid not in found:
+                found.add(sid)
+                stack.extend(self.dependents[sid])
+        return found
+
+    def critical_path(
+        self, durations: Optional[Dict[int, float]] = None
+    ) -> Tuple[List[int], float]:
+        """Return the longest dependency chain and its total duration.
+
+        ``durations`` maps step ids to costs; missing steps count as 1.0, so
+        without durations the result is the longest chain by step count.
+        """
+        durations = durations or {}
+        finish: Dict[int, float] = {}
+        parent: Dict[int, Optional[int]] = {}
+        for sid in self.topological_order():
+            best, best_dep = 0.0, None
+            for dep in sorted(self.dependencies[sid]):
+                if finish[dep] > best:
+                    best, best_dep = finish[dep], dep
+            finish[sid] = best + float(durations.get(sid, 1.0))
+            parent[sid] = best_dep
+        if not finish:
+            return [], 0.0
+        end = max(finish, key=lambda sid: (finish[sid], -sid))
+        path: List[int] = []
+        node: Optional[int] = end
+        while node is not None:
+            path.append(node)
+            node = parent[node]
+        return list(reversed(path)), finish[end]
+
+    def to_plan(self) -> Any:
+        """Serialize back to the plan format the graph was built from."""
+        steps = []
+        for sid in sorted(self.steps):
+            data = self.steps[sid].model_dump()
+            if not data.get("depends_on"):
+                data.pop("depends_on", None)
+            steps.append(data)
+        if self._envelope is None:
+            return steps
+        plan = copy.deepcopy(self._envelope)
+        plan[self._steps_key] = steps
+        return plan
@@ -0,0 +1,149 @@
+"""Hedged planning: race the LLM planner against the local planner.
+
+The LLM call runs on a background thread with a deadline while the keyword/local
+plan is computed on the calling thread. The LLM plan wins if it arrives within the
+latency budget; otherwise — or as soon as the LLM call fails — the local plan is
+returned, provided it has any steps. The result records which path won and how
+long each one took.
+
+A lost LLM call cannot be interrupted, so it keeps its worker until it answers or
+``llm_timeout`` expires. At most ``MAX_LLM_CALLS`` calls run at once; when every
+worker is still busy with abandoned calls the race is skipped rather than queued
+behind them.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+from . import parser
+
+# Upper bound on how long an abandoned LLM call may keep its worker thread busy
+DEFAULT_LLM_TIMEOUT = 60.0
+
+MAX_LLM_CALLS = 8
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_LLM_CALLS, thread_name_prefix="pb-hedge")
+_SLOTS = threading.BoundedSemaphore(MAX_LLM_CALLS)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _submit(func: Callable[[], Any]) -> Optional[Future]:
+    """Run ``func`` on a free LLM worker, or return ``None`` if none is free."""
+    if not _SLOTS.acquire(blocking=False):
+        return None
+
+    def _run() -> Any:
+        try:
+            return func()
+        finally:
+            _SLOTS.release()
+
+    try:
+        # Run in a copy of the caller's context so LLM metrics reach its collector
+        return _EXECUTOR.submit(contextvars.copy_context().run, _run)
+    except BaseException:
+        _SLOTS.release()
+        raise
+
+
+def _completed(func: Callable[[], Any]) -> Future:
+    future: Future = Future()
+    try:
+        future.set_result(func())
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def hedged_prompt_to_plan(
+    prompt: str,
+    latency_budget: float,
+    llm_timeout: Optional[float] = DEFAULT_LLM_TIMEOUT,
+    specs: Optional[dict] = None,
+) -> Dict[str, Any]:
+    """Plan ``prompt`` within ``latency_budget`` seconds.
+
+    Returns ``{"plan": ..., "planner": {...}}`` where ``planner`` holds the
+    ``winner`` (``"llm"`` or ``"local"``), the budget, each path's duration in
+    milliseconds (``llm_ms`` is ``None`` if the LLM had not answered yet) and the
+    LLM error, if any. An empty local plan never wins: the LLM is then waited
+    for up to ``llm_timeout``. ``specs`` is the catalog the LLM plans against.
+    Self-improvement prompts are not raced.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    def _timed(name: str, func: Callable[[], Any]) -> Any:
+        t0 = time.perf_counter()
+        try:
+            return func()
+        finally:
+            timings[name] = _ms(time.perf_counter() - t0)
+
+    if parser._is_self_improvement(prompt):
+        plan = _timed("llm", lambda: parser.plan_self_modification(prompt))
+        return {
+            "plan": plan,
+            "planner": {
+                "winner": "llm",
+                "latency_budget_ms": _ms(latency_budget),
+                "llm_ms": timings["llm"],
+                "local_ms": None,
+                "total_ms": _ms(time.perf_counter() - started),
+                "llm_error": None,
+            },
+        }
+
+    def _llm() -> Any:
+        return _timed(
+            "llm",
+            lambda: parser._llm_prompt_to_plan(
+                prompt, timeout=llm_timeout, specs=specs
+            ),
+        )
+
+    llm_future = _submit(_llm)
+    local_plan = _timed("local", lambda: parser._keyword_plan(prompt))
+    llm_error: Optional[str] = None
+    if llm_future is None:
+        llm_error = f"all {MAX_LLM_CALLS} LLM workers are busy"
+        if not local_plan:
+            # Nothing to fall back on, so ask the LLM on this thread
+            llm_future = _completed(_llm)
+    if llm_future is None:
+        plan, winner = local_plan, "local"
+    else:
+        if local_plan:
+            wait = max(latency_budget - (time.perf_counter() - started), 0.0)
+        else:
+            wait = llm_timeout
+        try:
+            plan = llm_future.result(timeout=wait)
+            winner, llm_error = "llm", None
+        except FutureTimeout:
+            if local_plan:
+                llm_error = f"LLM did not answer within {latency_budget}s budget"
+            else:
+                llm_error = f"LLM did not answer within {llm_timeout}s"
+            plan, winner = local_plan, "local"
+        except Exception as e:
+            llm_error = str(e)
+            plan, winner = local_plan, "local"
+    return {
+        "plan": plan,
+        "planner": {
+            "winner": winner,
+            "latency_budget_ms": _ms(latency_budget),
+            "llm_ms": timings.get("llm"),
+            "local_ms": timings.get("local"),
+            "total_ms": _ms(time.perf_counter() - started),
+            "llm_error": llm_error,
+        },
+    }
@@ -1,22 +1,23 @@
 """Legacy fallback planner: keyword-based plan maker.
 Superseded by LLM-based planning via parser.prompt_to_plan."""
 
-import json
-import datetime
 import yaml
 from pathlib import Path
 
 from .parser import prompt_to_capabilities
+from .store import record_plan
 from orchestrator_core.catalog.index import load_specs
+from orchestrator_core.catalog.resolver import get_resolver
 
 
 def make_plan(prompt: str) -> dict:
     """
     Build a plan dict with:
       - prompt: original prompt
-      - resolved: list of core capabilities that exist
+      - resolved: list of core capabilities that exist (catalog names are matched
+        with the fuzzy name resolver and reported under their catalog name)
       - missing: list of domain-specific capabilities that are not yet implemented
-    Writes the plan to ~/plans/<timestamp>-plan.json.
+    Records the plan in the plan history store (~/.pb_plans/plans.db).
     """
     # Extract capabilities from prompt
     capabilities = prompt_to_capabilities(prompt)
@@ -38,22 +39,19 @@ def make_plan(prompt: str) -> dict:
     except Exception:
         specs = {}
     # Classify capabilities
+    resolver = get_resolver(specs)
     resolved: list[str] = []
     missing: list[str] = []
     for cap in capabilities:
-        if cap in specs or cap in core_caps:
+        if cap in core_caps:
             resolved.append(cap)
+            continue
+        match = resolver.resolve(cap)
+        if match is not None:
+            resolved.append(match.name)
         else:
             missing.append(cap)
     plan = {"prompt": prompt, "resolved": resolved, "missing": missing}
-    # Write plan to ~/plans/<timestamp>-plan.json
-    plans_dir = Path.home() / "plans"
-    # Attempt to write plan file under user's home; skip on permission errors
-    try:
-        plans_dir.mkdir(parents=True, exist_ok=True)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        plan_file = plans_dir / f"{timestamp}-plan.json"
-        plan_file.write_text(json.dumps(plan, indent=2))
-    except Exception:
-        pass
+    # Record plan in the plan history store; failures are logged and skipped
+    record_plan(prompt, plan, source="make_plan", specs=specs)
     return plan
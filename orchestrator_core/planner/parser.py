@@ -3,7 +3,11 @@ import json
 from pathlib import Path
 import yaml
 from pydantic import BaseModel, ValidationError
-from typing import List
+from typing import List, Optional
+
+from orchestrator_core.telemetry import call_with_retries, track_llm_call
+
+from .context import catalog_context
 
 
 # Pydantic model for a single execution plan step
@@ -14,6 +18,7 @@ class PlanStep(BaseModel):
     action: str
     inputs: dict
     description: str
+    depends_on: Optional[List[int]] = None
 
 
 # Legacy Plan class removed; using PlanStep for per-item validation
@@ -21,15 +26,8 @@ class PlanStep(BaseModel):
 # flake8: noqa: W293  # allow blank-line whitespace inside this file (e.g., in system_prompt docstring)
 
 
-def prompt_to_capabilities(prompt: str, use_llm: bool = False) -> list[str]:
-    """
-    1) Load core keywords.yml and any *.yml in planner/packs
-    2) Case-insensitive keyword match; return unique capability list.
-    3) If use_llm is True OR env USE_LLM_PARSER=1:
-         • Call OpenAI chat completion (gpt-4o-mini) with system prompt:
-           "You are a capability extractor. Return a JSON array of capability IDs."
-         • Merge LLM result with keyword result.
-    """
+def _load_keyword_mapping() -> dict[str, list[str]]:
+    """Load core keywords.yml and any *.yml in planner/packs into one mapping."""
     mapping: dict[str, list[str]] = {}
     base_dir = Path(__file__).parent
     # Load core keywords
@@ -54,6 +52,19 @@ def prompt_to_capabilities(prompt: str, use_llm: bool = False) -> list[str]:
                             mapping[k.strip().lower()] = v
             except Exception:
                 pass
+    return mapping
+
+
+def prompt_to_capabilities(prompt: str, use_llm: bool = False) -> list[str]:
+    """
+    1) Load core keywords.yml and any *.yml in planner/packs
+    2) Case-insensitive keyword match; return unique capability list.
+    3) If use_llm is True OR env USE_LLM_PARSER=1:
+         • Call OpenAI chat completion (gpt-4o-mini) with system prompt:
+           "You are a capability extractor. Return a JSON array of capability IDs."
+         • Merge LLM result with keyword result.
+    """
+    mapping = _load_keyword_mapping()
     lower_prompt = prompt.lower()
     caps: list[str] = []
     caps_set: set[str] = set()
@@ -75,13 +86,20 @@ def prompt_to_capabilities(prompt: str, use_llm: bool = False) -> list[str]:
             system_prompt = (
                 "You are a capability extractor. Return a JSON array of capability IDs."
             )
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-            )
+            with track_llm_call(
+                "capability_extractor", "gpt-4o-mini", system_prompt + prompt
+            ) as call:
+                response = call_with_retries(
+                    call,
+                    lambda: openai.ChatCompletion.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                    ),
+                )
+                call.record_response(response)
             llm_content = response.choices[0].message.content
             llm_caps = json.loads(llm_content)
             if isinstance(llm_caps, list):
@@ -94,17 +112,22 @@ def prompt_to_capabilities(prompt: str, use_llm: bool = False) -> list[str]:
     return caps
 
 
-def _existing_prompt_to_plan(prompt: str) -> list[dict]:
-    """Original planning logic for regular tasks."""
-    # Load available utilities
+PLANNER_MODEL = "gpt-4.1-2025-04-14"
+PLANNER_MODES = ("llm", "local")
+
+
+def load_catalog() -> dict[str, dict]:
+    """Return the catalog specs (name to spec) used as planning context."""
     try:
         from orchestrator_core.catalog.index import load_specs
 
-        specs = load_specs()
-        utilities = list(specs.values())
+        return load_specs()
     except Exception:
-        utilities = []
-    # Build system messages
+        return {}
+
+
+def _build_instructions(utilities: list[dict]) -> str:
+    """Build the planner instructions: system prompt plus utilities context."""
     system_prompt = (
         "You are a planning agent for PrometheusBlocks, a modular AI system composed of small, composable utility blocks."
         "Each block must conform to a schema called a utility contract."
@@ -149,89 +172,170 @@ def _existing_prompt_to_plan(prompt: str) -> list[dict]:
         "Given a user prompt and a list of available utilities, identify utilities that can be used to fulfill the request."
         "If the existing utilities are not sufficient, suggest additional utility contracts that would be needed."
         "Output a JSON array of used capabilities, missing capabilities, and proposed utilities, along with a written plan."""
+        'Steps may list the step_ids they need in "depends_on" and reference an earlier step\'s output in their inputs as "$steps.<step_id>.<key>".'
     )
-    # Context with utilities
+    # Context with utilities, compact unless PLANNER_CONTEXT_FORMAT=json
     try:
-        utilities_json = json.dumps({"utilities": utilities})
+        utilities_context = catalog_context(
+            utilities, os.getenv("PLANNER_CONTEXT_FORMAT", "compact")
+        )
     except Exception:
-        utilities_json = "{}\n"
-    # Call OpenAI Responses API for structured planning
+        utilities_context = "{}\n"
+    # Combine instructions: system prompt + utilities context
+    return system_prompt + "\nAvailable utilities: " + utilities_context
+
+
+def _extract_output_text(resp) -> str:
+    """Return the aggregated text of a Responses API result."""
+    if hasattr(resp, "output_text") and resp.output_text is not None:
+        return resp.output_text
+    parts: list[str] = []
+    for item in getattr(resp, "output", []):
+        for chunk in item.get("content", []):
+            if chunk.get("type") == "output_text":
+                parts.append(chunk.get("text", ""))
+    return "".join(parts)
+
+
+def _parse_plan_content(content: str):
+    """Parse and validate the LLM plan text; raise ``ValueError`` when invalid."""
+    # Attempt to parse JSON plan directly
     try:
-        import os
-        from openai import OpenAI
-
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        # Combine instructions: system prompt + utilities context
-        instructions = system_prompt + "\nAvailable utilities: " + utilities_json
-        resp = client.responses.create(
-            model="gpt-4.1-2025-04-14",
-            instructions=instructions,
-            input=prompt,
-        )
-        # Extract text output
-        if hasattr(resp, "output_text") and resp.output_text is not None:
-            content = resp.output_text
-            print(f"LLM response: {content}")
+        plan_data = json.loads(content)
+    except json.JSONDecodeError:
+        # Attempt to extract JSON array from within the response text
+        import re
+
+        match = re.search(r"\[[\s\S]*?\]", content)
+        if match:
+            try:
+                plan_data = json.loads(match.group(0))
+            except json.JSONDecodeError:
+                raise ValueError("Failed to parse JSON plan from LLM response")
         else:
-            parts: list[str] = []
-            for item in getattr(resp, "output", []):
-                for chunk in item.get("content", []):
-                    if chunk.get("type") == "output_text":
-                        parts.append(chunk.get("text", ""))
-            content = "".join(parts)
-        # Attempt to parse JSON plan directly
+            raise ValueError("No JSON array found in LLM response")
+    # If response is a dict (rich JSON), return it directly
+    if isinstance(plan_data, dict):
+        return plan_data
+    # Otherwise, expect a list of step dicts; validate with Pydantic
+    if not isinstance(plan_data, list):
+        raise ValueError("Plan is not a list or dict")
+    # Validate each step with Pydantic
+    validated_steps = []
+    for idx, item in enumerate(plan_data, start=1):
         try:
-            plan_data = json.loads(content)
-        except json.JSONDecodeError:
-            # Attempt to extract JSON array from within the response text
-            import re
-
-            match = re.search(r"\[[\s\S]*?\]", content)
-            if match:
-                try:
-                    plan_data = json.loads(match.group(0))
-                except json.JSONDecodeError:
-                    raise ValueError("Failed to parse JSON plan from LLM response")
-            else:
-                raise ValueError("No JSON array found in LLM response")
-        # If response is a dict (rich JSON), return it directly
-        if isinstance(plan_data, dict):
-            return plan_data
-        # Otherwise, expect a list of step dicts; validate with Pydantic
-        if not isinstance(plan_data, list):
-            raise ValueError("Plan is not a list or dict")
-        # Validate each step with Pydantic
-        validated_steps = []
-        for idx, item in enumerate(plan_data, start=1):
-            try:
-                step = PlanStep.model_validate(item)
-            except ValidationError as ve:
-                raise ValueError(f"Plan step validation error (step {idx}): {ve}")
-            if step.step_id != idx:
-                raise ValueError(f"Expected step_id {idx}, got {step.step_id}")
-            validated_steps.append(step)
-        # Return validated plan as list of dicts
-        return [
-            step.model_dump() if hasattr(step, "model_dump") else step.dict()
-            for step in validated_steps
-        ]
+            step = PlanStep.model_validate(item)
+        except ValidationError as ve:
+            raise ValueError(f"Plan step validation error (step {idx}): {ve}")
+        if step.step_id != idx:
+            raise ValueError(f"Expected step_id {idx}, got {step.step_id}")
+        validated_steps.append(step)
+    # Declared or inferred dependencies must form a DAG over known steps
+    from .dag import DagStep, PlanGraph
+
+    PlanGraph(
+        DagStep.model_validate(step.model_dump(exclude_none=True))
+        for step in validated_steps
+    )
+    # Return validated plan as list of dicts; depends_on only when the LLM declared it
+    return [step.model_dump(exclude_unset=True) for step in validated_steps]
+
+
+def _keyword_plan(prompt: str) -> list[dict]:
+    """Simple keyword-based plan used when the LLM is unavailable.
+
+    When no keyword matches, the local BM25 ranker supplies a ranked plan instead.
+    """
+    caps = prompt_to_capabilities(prompt)
+    if not caps:
+        try:
+            from .ranker import local_plan
+
+            return local_plan(prompt)
+        except Exception:
+            return []
+    steps: list[dict] = []
+    for idx, cap in enumerate(caps, start=1):
+        steps.append(
+            {
+                "step_id": idx,
+                "action": cap,
+                "inputs": {},  # Defaulting to empty inputs for fallback
+                "description": "",  # No description in fallback
+            }
+        )
+    return steps
+
+
+def _llm_prompt_to_plan(
+    prompt: str, timeout: Optional[float] = None, specs: Optional[dict] = None
+):
+    """Plan with the LLM only; raise on any failure instead of falling back.
+
+    ``specs`` is the catalog to plan against; it is loaded when not given.
+    """
+    if specs is None:
+        specs = load_catalog()
+    instructions = _build_instructions(list(specs.values()))
+    # Call OpenAI Responses API for structured planning
+    from openai import OpenAI
+
+    # Retries are done (and counted) by call_with_retries, not the SDK
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    request: dict = {}
+    retries = None
+    if timeout is not None:
+        request["timeout"] = timeout
+        # A timed call must not outlive its timeout by retrying
+        retries = 0
+    with track_llm_call("planner", PLANNER_MODEL, instructions + prompt) as call:
+        resp = call_with_retries(
+            call,
+            lambda: client.responses.create(
+                model=PLANNER_MODEL,
+                instructions=instructions,
+                input=prompt,
+                **request,
+            ),
+            retries,
+        )
+        call.record_response(resp)
+    # Extract text output
+    content = _extract_output_text(resp)
+    if getattr(resp, "output_text", None) is not None:
+        print(f"LLM response: {content}")
+    return _parse_plan_content(content)
+
+
+def _existing_prompt_to_plan(
+    prompt: str, reuse_index=None, specs: Optional[dict] = None
+) -> list[dict]:
+    """Original planning logic for regular tasks.
+
+    With a ``reuse_index``, a near-duplicate past prompt's plan for the same catalog
+    is returned without calling the model, and newly validated LLM plans are added
+    to the index.
+    """
+    if reuse_index is not None:
+        from orchestrator_core.catalog.index import catalog_fingerprint
+
+        if specs is None:
+            specs = load_catalog()
+        catalog = catalog_fingerprint(specs)
+        reused = reuse_index.reuse(prompt, catalog)
+        if reused is not None:
+            return reused
+    try:
+        plan = _llm_prompt_to_plan(prompt, specs=specs)
     # Capture the exception as 'e'
     except Exception as e:
         # Print the exception before falling back
         print(f"LLM planning failed, falling back to keyword plan. Error: {e}")
         # Fallback: simple keyword-based plan
-        caps = prompt_to_capabilities(prompt)
-        steps: list[dict] = []
-        for idx, cap in enumerate(caps, start=1):
-            steps.append(
-                {
-                    "step_id": idx,
-                    "action": cap,
-                    "inputs": {},  # Defaulting to empty inputs for fallback
-                    "description": "",  # No description in fallback
-                }
-            )
-        return steps
+        return _keyword_plan(prompt)
+    if reuse_index is not None:
+        reuse_index.add(prompt, plan, catalog)
+    return plan
 
 
 def plan_self_modification(prompt: str) -> list[dict]:
@@ -253,25 +357,58 @@ def plan_self_modification(prompt: str) -> list[dict]:
         ]
 
 
-def prompt_to_plan(prompt: str) -> list[dict]:
-    """Enhanced planner that recognizes self-modification requests."""
-    self_improvement_keywords = [
-        "improve yourself",
-        "add capability",
-        "modify orchestrator",
-        "enhance your",
-        "learn to",
-        "become better at",
-        "add skill",
-        "improve",
-        "enhance",
-        "modify",
-        "add",
-        "create skill",
-    ]
-
-    is_self_improvement = any(keyword in prompt.lower() for keyword in self_improvement_keywords)
-
-    if is_self_improvement:
+SELF_IMPROVEMENT_KEYWORDS = [
+    "improve yourself",
+    "add capability",
+    "modify orchestrator",
+    "enhance your",
+    "learn to",
+    "become better at",
+    "add skill",
+    "improve",
+    "enhance",
+    "modify",
+    "add",
+    "create skill",
+]
+
+
+def _is_self_improvement(prompt: str) -> bool:
+    """Return True when the prompt asks the orchestrator to modify itself."""
+    return any(keyword in prompt.lower() for keyword in SELF_IMPROVEMENT_KEYWORDS)
+
+
+def _planner_mode(mode: Optional[str] = None) -> str:
+    """Resolve the planning mode: explicit argument, then env PLANNER_MODE, then "llm"."""
+    mode = (mode or os.getenv("PLANNER_MODE") or "llm").strip().lower()
+    if mode not in PLANNER_MODES:
+        raise ValueError(
+            f"Unknown planner mode '{mode}'; expected one of {PLANNER_MODES}"
+        )
+    return mode
+
+
+def prompt_to_plan(
+    prompt: str,
+    mode: Optional[str] = None,
+    reuse: Optional[bool] = None,
+    specs: Optional[dict] = None,
+) -> list[dict]:
+    """Enhanced planner that recognizes self-modification requests.
+
+    ``mode="local"`` (or env ``PLANNER_MODE=local``) skips the LLM entirely and
+    returns a ranked plan from the local BM25 ranker. ``reuse=True`` (or env
+    ``PLAN_REUSE=1``) reuses plans of near-duplicate past prompts. ``specs`` is
+    the catalog to plan against (see :func:`load_catalog`); it is loaded when not
+    given.
+    """
+    if _planner_mode(mode) == "local":
+        from .ranker import local_plan
+
+        return local_plan(prompt, specs=specs)
+    if _is_self_improvement(prompt):
         return plan_self_modification(prompt)
-    return _existing_prompt_to_plan(prompt)
+    from .reuse import get_reuse_index, reuse_enabled
+
+    reuse_index = get_reuse_index() if reuse_enabled(reuse) else None
+    return _existing_prompt_to_plan(prompt, reuse_index=reuse_index, specs=specs)
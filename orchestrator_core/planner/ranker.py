@@ -0,0 +1,244 @@
+"""Local capability ranker: BM25 over catalog descriptions and keyword packs.
+
+Every capability (catalog utility or keyword-pack capability) becomes one document.
+The documents are turned into a sparse BM25-weighted term matrix once, so scoring a
+prompt — or a whole batch of prompts — is a single sparse matrix product. Used as a
+no-LLM planning mode and as the planner fallback when keyword matching finds nothing.
+"""
+
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# camelCase / PascalCase words, acronyms and digit runs
+_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from i in into is it me my of on or our "
+    "please the their this to we with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, breaking on case changes and separators."""
+    terms = []
+    for raw in _TOKEN_RE.findall(text or ""):
+        term = raw.lower()
+        if term in _STOPWORDS:
+            continue
+        # Light plural stemming so "statements" matches "statement"
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def _spec_text(spec: dict) -> str:
+    """Concatenate the searchable text of a catalog spec."""
+    parts = [str(spec.get("name", "")), str(spec.get("description", ""))]
+    for ep in spec.get("entrypoints", []) or []:
+        if isinstance(ep, dict):
+            parts.append(str(ep.get("name", "")))
+            parts.append(str(ep.get("description", "")))
+    return " ".join(parts)
+
+
+class CapabilityRanker:
+    """BM25 ranker over a fixed set of capability documents."""
+
+    def __init__(
+        self,
+        documents: Dict[str, str],
+        k1: float = 1.5,
+        b: float = 0.75,
+        descriptions: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.capabilities: List[str] = sorted(documents)
+        self.descriptions = descriptions or {}
+        self.vocabulary: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, cap in enumerate(self.capabilities):
+            for term in tokenize(documents[cap]):
+                col = self.vocabulary.setdefault(term, len(self.vocabulary))
+                rows.append(row)
+                cols.append(col)
+        shape = (len(self.capabilities), max(len(self.vocabulary), 1))
+        tf = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=shape
+        )
+        tf.sum_duplicates()
+        n_docs = max(shape[0], 1)
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_len = doc_len.mean() if doc_len.size and doc_len.mean() > 0 else 1.0
+        df = np.bincount(tf.indices, minlength=shape[1]).astype(np.float64)
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        # Terms absent from the catalog are as informative as the rarest term
+        self._oov_idf = math.log1p((n_docs + 0.5) / 0.5)
+        # BM25 term weights, precomputed once per catalog
+        norm = k1 * (1 - b + b * doc_len / avg_len)
+        coo = tf.tocoo()
+        weights = self.idf[coo.col] * coo.data * (k1 + 1) / (coo.data + norm[coo.row])
+        self.weights = sparse.csr_matrix((weights, (coo.row, coo.col)), shape=shape)
+        self.presence = (tf > 0).astype(np.float64).tocsr()
+
+    @classmethod
+    def from_catalog(
+        cls, specs: Dict[str, dict], keyword_mapping: Dict[str, List[str]]
+    ) -> "CapabilityRanker":
+        """Build a ranker from catalog specs and a keyword → capabilities mapping."""
+        documents: Dict[str, List[str]] = {}
+        descriptions: Dict[str, str] = {}
+        for name, spec in specs.items():
+            documents.setdefault(name, []).append(_spec_text(spec))
+            descriptions[name] = str(spec.get("description", ""))
+        for keyword, caps in keyword_mapping.items():
+            for cap in caps:
+                if isinstance(cap, str):
+                    documents.setdefault(cap, [cap]).append(keyword)
+        return cls(
+            {cap: " ".join(parts) for cap, parts in documents.items()},
+            descriptions=descriptions,
+        )
+
+    def _query_matrix(
+        self, prompts: Sequence[str]
+    ) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Return the binary query-term matrix and each prompt's total IDF mass."""
+        rows: List[int] = []
+        cols: List[int] = []
+        total_idf = np.zeros(len(prompts))
+        for row, prompt in enumerate(prompts):
+            for term in set(tokenize(prompt)):
+                col = self.vocabulary.get(term)
+                if col is None:
+                    total_idf[row] += self._oov_idf
+                    continue
+                total_idf[row] += self.idf[col]
+                rows.append(row)
+                cols.append(col)
+        shape = (len(prompts), self.weights.shape[1])
+        query = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=shape
+        )
+        return query, total_idf
+
+    def score_many(self, prompts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score every prompt against every capability in one sparse product.
+
+        Returns ``(scores, confidence)``, both of shape ``(len(prompts), n_caps)``.
+        Confidence is the share of each prompt's IDF mass that the capability's
+        document covers, so it lies in ``[0, 1]`` and is comparable across prompts.
+        """
+        query, total_idf = self._query_matrix(prompts)
+        scores = (query @ self.weights.T).toarray()
+        covered = (query.multiply(self.idf) @ self.presence.T).toarray()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidence = np.where(
+                total_idf[:, None] > 0, covered / total_idf[:, None], 0.0
+            )
+        return scores, confidence
+
+    def rank_many(
+        self, prompts: Sequence[str], top_k: int = 5, min_score: float = 0.0
+    ) -> List[List[Tuple[str, float, float]]]:
+        """Return ``(capability, score, confidence)`` lists, best first, per prompt."""
+        if not self.capabilities:
+            return [[] for _ in prompts]
+        scores, confidence = self.score_many(prompts)
+        ranked: List[List[Tuple[str, float, float]]] = []
+        for row in range(len(prompts)):
+            order = np.argsort(-scores[row], kind="stable")[:top_k]
+            ranked.append(
+                [
+                    (
+                        self.capabilities[i],
+                        float(scores[row, i]),
+                        round(float(confidence[row, i]), 4),
+                    )
+                    for i in order
+                    if scores[row, i] > min_score
+                ]
+            )
+        return ranked
+
+    def rank(
+        self, prompt: str, top_k: int = 5, min_score: float = 0.0
+    ) -> List[Tuple[str, float, float]]:
+        """Rank capabilities for a single prompt."""
+        return self.rank_many([prompt], top_k=top_k, min_score=min_score)[0]
+
+    def plans(self, prompts: Sequence[str], top_k: int = 5) -> List[List[dict]]:
+        """Build one ranked plan per prompt, each step carrying a confidence score."""
+        return [
+            [
+                {
+                    "step_id": idx,
+                    "action": cap,
+                    "inputs": {},
+                    "description": self.descriptions.get(cap, ""),
+                    "confidence": conf,
+                }
+                for idx, (cap, _score, conf) in enumerate(ranked, start=1)
+            ]
+            for ranked in self.rank_many(prompts, top_k=top_k)
+        ]
+
+
+_KEYWORD_MAPPING: Optional[Dict[str, List[str]]] = None
+# (catalog specs, their fingerprint, ranker) for the latest catalog
+_LATEST: Optional[Tuple[Dict[str, dict], str, CapabilityRanker]] = None
+
+
+def _keyword_mapping() -> Dict[str, List[str]]:
+    """The keyword packs, read once per process."""
+    global _KEYWORD_MAPPING
+    if _KEYWORD_MAPPING is None:
+        from .parser import _load_keyword_mapping
+
+        _KEYWORD_MAPPING = _load_keyword_mapping()
+    return _KEYWORD_MAPPING
+
+
+def get_ranker(specs: Optional[Dict[str, dict]] = None) -> CapabilityRanker:
+    """Return a ranker for the current catalog, rebuilding it only when it changes.
+
+    Passing the same ``specs`` object again returns the cached ranker without
+    hashing the catalog; a different object is compared by its fingerprint.
+    """
+    global _LATEST
+    if specs is None:
+        try:
+            from orchestrator_core.catalog.index import load_specs
+
+            specs = load_specs()
+        except Exception:
+            specs = {}
+    latest = _LATEST
+    if latest is not None and latest[0] is specs:
+        return latest[2]
+    from orchestrator_core.catalog.index import catalog_fingerprint
+
+    fingerprint = catalog_fingerprint(specs)
+    if latest is not None and latest[1] == fingerprint:
+        ranker = latest[2]
+    else:
+        ranker = CapabilityRanker.from_catalog(specs, _keyword_mapping())
+    _LATEST = (specs, fingerprint, ranker)
+    return ranker
+
+
+def local_plan(
+    prompt: str, top_k: int = 5, specs: Optional[Dict[str, dict]] = None
+) -> List[dict]:
+    """Plan a prompt without the LLM using the BM25 ranker."""
+    return get_ranker(specs).plans([prompt], top_k=top_k)[0]
+
+
+def local_plans(
+    prompts: Iterable[str], top_k: int = 5, specs: Optional[Dict[str, dict]] = None
+) -> List[List[dict]]:
+    """Plan many prompts without the LLM in one vectorized pass."""
+    return get_ranker(specs).plans(list(prompts), top_k=top_k)
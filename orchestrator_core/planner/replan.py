@@ -0,0 +1,260 @@
+"""Incremental replanning of stored plans after a catalog change.
+
+Given a plan and a :class:`~orchestrator_core.catalog.index.CatalogDiff`, only the
+capabilities the diff touches are re-resolved: missing capabilities that were
+added become resolved, resolved ones that were removed become missing, and pinned
+versions are bumped. A step whose action was removed is re-resolved on its own
+against the new catalog, by name (aliases, near-identical names) and then by its
+description; the LLM replans the whole prompt only when some step cannot be
+re-resolved that way.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from orchestrator_core.catalog.index import (
+    CatalogDiff,
+    catalog_fingerprint,
+    catalog_versions,
+    diff_catalogs,
+    load_specs,
+)
+from orchestrator_core.catalog.resolver import get_resolver
+
+from . import parser
+from .store import PlanStore
+
+logger = logging.getLogger(__name__)
+
+REPLAN_SOURCE = "replan:"
+# Share of a step description a utility must cover to take over the step
+MIN_REPLACEMENT_CONFIDENCE = 0.5
+
+
+@dataclass
+class ReplanResult:
+    """A replanned plan and what changed in it."""
+
+    plan: Any
+    # Capabilities that were missing and are now in the catalog
+    resolved: List[str] = field(default_factory=list)
+    # Resolved capabilities that left the catalog
+    unresolved: List[str] = field(default_factory=list)
+    # name -> [old version, new version]
+    bumped: Dict[str, List[str]] = field(default_factory=dict)
+    # Step actions that no longer exist in the catalog
+    structural: List[str] = field(default_factory=list)
+    # removed action -> utility that took over its steps
+    replaced: Dict[str, str] = field(default_factory=dict)
+    llm: bool = False
+    error: Optional[str] = None
+
+    @property
+    def changed(self) -> bool:
+        return bool(
+            self.resolved or self.unresolved or self.bumped or self.replaced or self.llm
+        )
+
+
+def _core_capabilities() -> set:
+    caps: set = set()
+    for values in parser._load_keyword_mapping().values():
+        caps.update(values)
+    return caps
+
+
+def _bump(versions: Dict[str, str], diff: CatalogDiff) -> Dict[str, str]:
+    """Return ``versions`` (name -> version) with changed utilities bumped."""
+    return {
+        name: diff.changed[name][1] if name in diff.changed else version
+        for name, version in versions.items()
+    }
+
+
+def _replan_classified(plan: dict, diff: CatalogDiff, result: ReplanResult) -> dict:
+    """Reclassify a ``{"resolved": [...], "missing": [...]}`` plan."""
+    core = _core_capabilities()
+    resolved = list(plan.get("resolved", []))
+    missing = list(plan.get("missing", []))
+    result.resolved = [c for c in missing if c in diff.added or c in diff.changed]
+    result.unresolved = [c for c in resolved if c in diff.removed and c not in core]
+    new = dict(plan)
+    new["resolved"] = [c for c in resolved if c not in result.unresolved]
+    new["resolved"] += result.resolved
+    new["missing"] = [c for c in missing if c not in result.resolved]
+    new["missing"] += result.unresolved
+    for name in resolved:
+        if name in diff.changed:
+            result.bumped[name] = list(diff.changed[name])
+    if isinstance(plan.get("versions"), dict):
+        new["versions"] = _bump(plan["versions"], diff)
+        for name in result.resolved:
+            new["versions"][name] = diff.added.get(name) or diff.changed[name][1]
+    return new
+
+
+def _replacement(step: dict, specs: Dict[str, dict]) -> Optional[str]:
+    """Find the catalog utility to take over a step whose action was removed."""
+    match = get_resolver(specs).resolve(step.get("action"))
+    if match is not None:
+        return match.name
+    from .ranker import get_ranker
+
+    query = step.get("description") or step.get("action") or ""
+    for name, _score, confidence in get_ranker(specs).rank(query, top_k=10):
+        # The ranker also knows keyword capabilities; only utilities qualify
+        if name in specs and confidence >= MIN_REPLACEMENT_CONFIDENCE:
+            return name
+    return None
+
+
+def _replan_steps(
+    steps: List[dict],
+    diff: CatalogDiff,
+    result: ReplanResult,
+    prompt: Optional[str],
+    use_llm: bool,
+    specs: Optional[Dict[str, dict]],
+) -> Optional[List[dict]]:
+    """Update a step plan; return None if it needs a structural replan."""
+    new_steps = []
+    unresolved = []
+    for step in steps:
+        action = step.get("action")
+        if action in diff.removed:
+            if action not in result.structural:
+                result.structural.append(action)
+            if specs is None:
+                specs = load_specs()
+            if action not in result.replaced:
+                replacement = _replacement(step, specs)
+                if replacement is None:
+                    unresolved.append(action)
+                    new_steps.append(step)
+                    continue
+                result.replaced[action] = replacement
+            name = result.replaced[action]
+            step = {**step, "action": name}
+            if "version" in step:
+                step["version"] = str(specs[name].get("version", ""))
+        elif action in diff.added:
+            result.resolved.append(action)
+        elif action in diff.changed:
+            result.bumped[action] = list(diff.changed[action])
+            if "version" in step:
+                step = {**step, "version": diff.changed[action][1]}
+        new_steps.append(step)
+    if not unresolved:
+        return new_steps
+    if not use_llm or not prompt:
+        result.replaced.clear()
+        result.error = "plan uses removed capabilities; replanning needs the LLM"
+        return None
+    try:
+        plan = parser._llm_prompt_to_plan(prompt, specs=specs)
+    except Exception as e:
+        result.replaced.clear()
+        result.error = f"LLM replanning failed: {e}"
+        return None
+    result.replaced.clear()
+    result.llm = True
+    return plan
+
+
+def replan(
+    plan: Any,
+    diff: CatalogDiff,
+    prompt: Optional[str] = None,
+    use_llm: bool = True,
+    specs: Optional[Dict[str, dict]] = None,
+) -> ReplanResult:
+    """Re-resolve the parts of ``plan`` affected by ``diff``.
+
+    Plans in the ``make_plan`` format are reclassified without the LLM. Step plans
+    (a list, or a dict with a ``steps``/``plan`` list) get their versions bumped,
+    and steps whose action was removed are re-resolved against ``specs`` (the new
+    catalog, loaded when needed and not given). If some step cannot be, ``prompt``
+    is replanned by the LLM unless ``use_llm`` is False, in which case the plan is
+    kept and ``error`` is set.
+    """
+    result = ReplanResult(plan=plan)
+    if not diff:
+        return result
+    if isinstance(plan, list):
+        new_steps = _replan_steps(plan, diff, result, prompt, use_llm, specs)
+        if new_steps is not None:
+            result.plan = new_steps
+        return result
+    if isinstance(plan, dict):
+        for key in ("steps", "plan"):
+            if isinstance(plan.get(key), list):
+                new_steps = _replan_steps(
+                    plan[key], diff, result, prompt, use_llm, specs
+                )
+                if new_steps is not None:
+                    result.plan = {**plan, key: new_steps}
+                return result
+        if "resolved" in plan or "missing" in plan:
+            result.plan = _replan_classified(plan, diff, result)
+    return result
+
+
+def replan_stored(
+    store: PlanStore,
+    specs: Optional[Dict[str, dict]] = None,
+    use_llm: bool = True,
+    plan_ids: Optional[List[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Replan stored plans made against older catalogs.
+
+    For each older catalog fingerprint with a snapshot, the diff to the current
+    catalog is computed once and only plans mentioning a touched capability are
+    loaded. Changed plans are recorded against the current catalog with source
+    ``replan:<old id>``. A plan that already has such a successor is skipped, so
+    only the newest plan of each replan chain is followed. Returns one report per
+    affected plan.
+    """
+    specs = load_specs() if specs is None else specs
+    new_fp = catalog_fingerprint(specs)
+    new_versions = catalog_versions(specs)
+    superseded = {s.split(":", 1)[1] for s in store.sources(REPLAN_SOURCE)}
+    reports: List[Dict[str, Any]] = []
+    for fp in store.catalog_fingerprints():
+        if fp == new_fp:
+            continue
+        old_versions = store.catalog_versions(fp)
+        if old_versions is None:
+            logger.info("No catalog snapshot for %s; skipping its plans", fp)
+            continue
+        diff = diff_catalogs(old_versions, new_versions)
+        for plan_id in store.plan_ids(fp, diff.names):
+            if str(plan_id) in superseded or (plan_ids and plan_id not in plan_ids):
+                continue
+            item = store.get(plan_id)
+            result = replan(
+                item["plan"], diff, prompt=item["prompt"], use_llm=use_llm, specs=specs
+            )
+            new_id = None
+            if result.changed:
+                new_id = store.record(
+                    item["prompt"],
+                    result.plan,
+                    catalog_fingerprint=new_fp,
+                    source=f"{REPLAN_SOURCE}{plan_id}",
+                    catalog_versions=new_versions,
+                )
+            reports.append(
+                {
+                    "plan_id": plan_id,
+                    "new_plan_id": new_id,
+                    "resolved": result.resolved,
+                    "unresolved": result.unresolved,
+                    "bumped": result.bumped,
+                    "structural": result.structural,
+                    "replaced": result.replaced,
+                    "llm": result.llm,
+                    "error": result.error,
+                }
+            )
+    return reports
@@ -0,0 +1,241 @@
+"""Near-duplicate prompt detection and plan reuse.
+
+Past prompts with their validated LLM plans are indexed by MinHash signatures over
+word shingles, bucketed with LSH bands. A new prompt whose shingle Jaccard
+similarity to an indexed prompt reaches the threshold reuses that prompt's plan
+instead of calling the model, and the reuse is appended to an audit log. Entries
+are keyed by the catalog fingerprint they were planned against, so a plan is only
+reused for the same catalog.
+
+Enable with ``PLAN_REUSE=1`` (or ``reuse=True``); tune with
+``PLAN_REUSE_THRESHOLD`` (default 0.8).
+"""
+
+import copy
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+import numpy as np
+
+from .ranker import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+# Mersenne prime for universal hashing; a * x stays below 2**63 for 32-bit x
+_PRIME = (1 << 31) - 1
+
+
+def shingles(prompt: str) -> FrozenSet[str]:
+    """Return the word unigram and bigram shingles of a normalized prompt."""
+    terms = tokenize(prompt)
+    grams: Set[str] = set(terms)
+    grams.update(f"{a} {b}" for a, b in zip(terms, terms[1:]))
+    return frozenset(grams)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two shingle sets; empty sets are similar to nothing."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class ReuseMatch:
+    """An indexed prompt similar enough to reuse its plan."""
+
+    entry_id: str
+    prompt: str
+    plan: Any
+    similarity: float
+
+
+class PlanReuseIndex:
+    """MinHash/LSH index over past prompts and their validated plans."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        audit_path: Optional[Path] = None,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.audit_path = audit_path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._entries: Dict[str, dict] = {}
+        self._shingles: Dict[str, FrozenSet[str]] = {}
+        self._buckets: Dict[tuple, List[str]] = {}
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            self._load()
+
+    def signature(self, grams: FrozenSet[str]) -> np.ndarray:
+        """MinHash signature of a shingle set."""
+        if not grams:
+            return np.full(len(self._a), _PRIME, dtype=np.uint64)
+        x = np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(g.encode(), digest_size=4).digest(), "big"
+                )
+                for g in sorted(grams)
+            ],
+            dtype=np.uint64,
+        )
+        hashed = (np.outer(self._a, x) + self._b[:, None]) % _PRIME
+        return hashed.min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray) -> List[tuple]:
+        rows = sig.reshape(self.bands, self.rows)
+        return [(band, rows[band].tobytes()) for band in range(self.bands)]
+
+    def _insert(self, entry: dict) -> None:
+        entry_id = entry["id"]
+        # A later entry for the same prompt and catalog replaces the earlier one
+        known = entry_id in self._entries
+        self._entries[entry_id] = entry
+        if known:
+            return
+        grams = shingles(entry["prompt"])
+        self._shingles[entry_id] = grams
+        if not grams:
+            # Nothing to compare, so the entry can never be matched
+            return
+        for key in self._band_keys(self.signature(grams)):
+            self._buckets.setdefault(key, []).append(entry_id)
+
+    def _load(self) -> None:
+        for line in self.path.read_text().splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and "id" in entry and "prompt" in entry:
+                self._insert(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def entry_id(prompt: str, catalog: str = "") -> str:
+        """Id of the entry for ``prompt`` planned against catalog ``catalog``."""
+        key = f"{catalog}\0{prompt}" if catalog else prompt
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+    def add(self, prompt: str, plan: Any, catalog: str = "") -> str:
+        """Index a validated plan for ``prompt`` and return its entry id.
+
+        ``catalog`` is the fingerprint of the catalog the plan was made against.
+        Adding the same plan again for the same prompt and catalog is a no-op.
+        """
+        entry = {
+            "id": self.entry_id(prompt, catalog),
+            "prompt": prompt,
+            "catalog": catalog,
+            "plan": plan,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            known = self._entries.get(entry["id"])
+            if known is not None and known["plan"] == plan:
+                return entry["id"]
+            self._insert(entry)
+            if self.path is not None:
+                try:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    with self.path.open("a") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except Exception as e:
+                    logger.warning("Could not persist plan reuse index: %s", e)
+        return entry["id"]
+
+    def lookup(self, prompt: str, catalog: str = "") -> Optional[ReuseMatch]:
+        """Return the most similar prompt for ``catalog`` at or above the threshold."""
+        grams = shingles(prompt)
+        if not grams:
+            return None
+        with self._lock:
+            candidates: Set[str] = set()
+            for key in self._band_keys(self.signature(grams)):
+                candidates.update(self._buckets.get(key, ()))
+            best: Optional[ReuseMatch] = None
+            for entry_id in candidates:
+                if self._entries[entry_id].get("catalog", "") != catalog:
+                    continue
+                similarity = jaccard(grams, self._shingles[entry_id])
+                if similarity >= self.threshold and (
+                    best is None or similarity > best.similarity
+                ):
+                    entry = self._entries[entry_id]
+                    best = ReuseMatch(
+                        entry_id, entry["prompt"], entry["plan"], similarity
+                    )
+        return best
+
+    def reuse(self, prompt: str, catalog: str = "") -> Optional[Any]:
+        """Return a copy of a reusable plan for ``prompt`` and audit it, or None."""
+        match = self.lookup(prompt, catalog)
+        if match is None:
+            return None
+        record = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "prompt": prompt,
+            "reused_entry": match.entry_id,
+            "matched_prompt": match.prompt,
+            "catalog": catalog,
+            "similarity": round(match.similarity, 4),
+            "threshold": self.threshold,
+        }
+        logger.info("Reusing plan %s for prompt %r", match.entry_id, prompt)
+        if self.audit_path is not None:
+            try:
+                self.audit_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.audit_path.open("a") as f:
+                    f.write(json.dumps(record) + "\n")
+            except Exception as e:
+                logger.warning("Could not write plan reuse audit log: %s", e)
+        return copy.deepcopy(match.plan)
+
+
+def reuse_enabled(reuse: Optional[bool] = None) -> bool:
+    """Resolve whether plan reuse is on: explicit flag, then env PLAN_REUSE."""
+    if reuse is not None:
+        return reuse
+    return os.getenv("PLAN_REUSE", "") in ("1", "true", "True")
+
+
+_INDEX: Optional[PlanReuseIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_reuse_index() -> PlanReuseIndex:
+    """Return the process-wide index persisted under ``~/.pb_plans``."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            plans_dir = Path.home() / ".pb_plans"
+            _INDEX = PlanReuseIndex(
+                path=plans_dir / "reuse_index.jsonl",
+                audit_path=plans_dir / "reuse_audit.jsonl",
+                threshold=float(os.getenv("PLAN_REUSE_THRESHOLD", DEFAULT_THRESHOLD)),
+            )
+        return _INDEX
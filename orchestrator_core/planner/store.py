@@ -0,0 +1,319 @@
+"""Plan history store backed by SQLite.
+
+Every plan is recorded once with its prompt, a hash of the prompt, a timestamp, the
+capabilities it mentions and the fingerprint of the catalog it was planned against.
+Listing, lookup and search go through indexed queries instead of directory scans.
+The utility versions behind each catalog fingerprint are kept as snapshots so
+stored plans can later be diffed against a newer catalog and replanned.
+The default database lives at ``~/.pb_plans/plans.db``.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    catalog_fingerprint TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    plan TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS plan_capabilities (
+    plan_id INTEGER NOT NULL REFERENCES plans(id) ON DELETE CASCADE,
+    capability TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_snapshots (
+    fingerprint TEXT PRIMARY KEY,
+    versions TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plans_prompt_hash ON plans(prompt_hash);
+CREATE INDEX IF NOT EXISTS idx_plans_created_at ON plans(created_at);
+CREATE INDEX IF NOT EXISTS idx_plans_catalog ON plans(catalog_fingerprint);
+CREATE INDEX IF NOT EXISTS idx_plan_caps ON plan_capabilities(capability, plan_id);
+CREATE INDEX IF NOT EXISTS idx_plan_caps_plan ON plan_capabilities(plan_id);
+"""
+
+
+def prompt_hash(prompt: str) -> str:
+    """Hash of the whitespace- and case-normalized prompt."""
+    normalized = " ".join(prompt.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+# Bound parameters per IN (...) list; SQLite allows 999 in older builds
+_MAX_PARAMS = 500
+
+
+def _escape_like(text: str) -> str:
+    """Escape ``text`` for a ``LIKE ... ESCAPE '\\'`` pattern."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _names(items: Any) -> List[str]:
+    names = []
+    for item in items or []:
+        name = item.get("name") if isinstance(item, dict) else item
+        if isinstance(name, str) and name:
+            names.append(name)
+    return names
+
+
+def plan_capabilities(plan: Any) -> List[str]:
+    """Return the capabilities a plan refers to, in any of the known plan formats."""
+    caps: List[str] = []
+    if isinstance(plan, list):
+        caps = [
+            s.get("action") for s in plan if isinstance(s, dict) and s.get("action")
+        ]
+    elif isinstance(plan, dict):
+        for key in ("resolved", "missing", "used_capabilities"):
+            caps.extend(_names(plan.get(key)))
+        caps.extend(_names(plan.get("proposed_utilities")))
+        for key in ("steps", "plan"):
+            if isinstance(plan.get(key), list):
+                caps.extend(plan_capabilities(plan[key]))
+    return list(dict.fromkeys(caps))
+
+
+class PlanStore:
+    """SQLite-backed, indexed history of generated plans."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or Path.home() / ".pb_plans" / "plans.db"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def record(
+        self,
+        prompt: str,
+        plan: Any,
+        catalog_fingerprint: str = "",
+        source: str = "",
+        catalog_versions: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """Store a plan and return its id.
+
+        ``catalog_versions`` (name -> version) is kept as the snapshot for
+        ``catalog_fingerprint`` the first time that fingerprint is seen.
+        """
+        created = datetime.datetime.now().isoformat(timespec="microseconds")
+        with closing(self._connect()) as conn, conn:
+            if catalog_fingerprint and catalog_versions is not None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO catalog_snapshots (fingerprint, versions)"
+                    " VALUES (?, ?)",
+                    (catalog_fingerprint, json.dumps(catalog_versions)),
+                )
+            cur = conn.execute(
+                "INSERT INTO plans (prompt, prompt_hash, created_at, catalog_fingerprint,"
+                " source, plan) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    prompt,
+                    prompt_hash(prompt),
+                    created,
+                    catalog_fingerprint,
+                    source,
+                    json.dumps(plan),
+                ),
+            )
+            plan_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO plan_capabilities (plan_id, capability) VALUES (?, ?)",
+                [(plan_id, cap) for cap in plan_capabilities(plan)],
+            )
+        return plan_id
+
+    def _row_to_dict(self, row: sqlite3.Row, caps: List[str], with_plan: bool) -> dict:
+        item = {
+            "id": row["id"],
+            "prompt": row["prompt"],
+            "prompt_hash": row["prompt_hash"],
+            "created_at": row["created_at"],
+            "catalog_fingerprint": row["catalog_fingerprint"],
+            "source": row["source"],
+            "capabilities": caps,
+        }
+        if with_plan:
+            item["plan"] = json.loads(row["plan"])
+        return item
+
+    def _capabilities_for(self, conn, ids: List[int]) -> Dict[int, List[str]]:
+        caps: Dict[int, List[str]] = {i: [] for i in ids}
+        if ids:
+            marks = ",".join("?" * len(ids))
+            for row in conn.execute(
+                f"SELECT plan_id, capability FROM plan_capabilities"
+                f" WHERE plan_id IN ({marks}) ORDER BY rowid",
+                ids,
+            ):
+                caps[row["plan_id"]].append(row["capability"])
+        return caps
+
+    def get(self, plan_id: int) -> Optional[dict]:
+        """Return a stored plan with its metadata, or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM plans WHERE id = ?", (plan_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            caps = self._capabilities_for(conn, [plan_id])[plan_id]
+        return self._row_to_dict(row, caps, with_plan=True)
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        capability: Optional[str] = None,
+        prompt: Optional[str] = None,
+        catalog_fingerprint: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+        with_plan: bool = False,
+    ) -> Dict[str, Any]:
+        """Return a page of plans, newest first, with the total match count.
+
+        ``query`` is a substring match on the prompt, ``prompt`` an exact match on
+        the normalized prompt hash, and ``capability`` matches plans mentioning it.
+        """
+        clauses: List[str] = []
+        args: List[Any] = []
+        if query:
+            clauses.append("p.prompt LIKE ? ESCAPE '\\'")
+            args.append(f"%{_escape_like(query)}%")
+        if prompt:
+            clauses.append("p.prompt_hash = ?")
+            args.append(prompt_hash(prompt))
+        if catalog_fingerprint:
+            clauses.append("p.catalog_fingerprint = ?")
+            args.append(catalog_fingerprint)
+        if capability:
+            clauses.append(
+                "p.id IN (SELECT plan_id FROM plan_capabilities WHERE capability = ?)"
+            )
+            args.append(capability)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM plans p {where}", args
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT p.* FROM plans p {where} ORDER BY p.id DESC LIMIT ? OFFSET ?",
+                args + [max(limit, 0), max(offset, 0)],
+            ).fetchall()
+            caps = self._capabilities_for(conn, [row["id"] for row in rows])
+        items = [self._row_to_dict(row, caps[row["id"]], with_plan) for row in rows]
+        return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+    def list(self, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """Return a page of the most recent plans."""
+        return self.search(offset=offset, limit=limit)
+
+    def catalog_versions(self, fingerprint: str) -> Optional[Dict[str, str]]:
+        """Return the catalog snapshot recorded for ``fingerprint``, or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT versions FROM catalog_snapshots WHERE fingerprint = ?",
+                (fingerprint,),
+            ).fetchone()
+        return json.loads(row["versions"]) if row else None
+
+    def catalog_fingerprints(self) -> List[str]:
+        """Return every non-empty catalog fingerprint that has recorded plans."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT catalog_fingerprint FROM plans"
+                " WHERE catalog_fingerprint != ''"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def plan_ids(self, catalog_fingerprint: str, capabilities: List[str]) -> List[int]:
+        """Ids of plans for ``catalog_fingerprint`` mentioning any of ``capabilities``."""
+        ids = set()
+        with closing(self._connect()) as conn:
+            # Stay well below SQLite's limit on bound parameters per statement
+            for start in range(0, len(capabilities), _MAX_PARAMS):
+                end = start + _MAX_PARAMS
+                chunk = capabilities[start:end]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT DISTINCT p.id FROM plans p JOIN plan_capabilities c"
+                    f" ON c.plan_id = p.id WHERE p.catalog_fingerprint = ?"
+                    f" AND c.capability IN ({marks})",
+                    [catalog_fingerprint, *chunk],
+                ).fetchall()
+                ids.update(row[0] for row in rows)
+        return sorted(ids)
+
+    def sources(self, prefix: str) -> List[str]:
+        """Return every recorded source starting with ``prefix``."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT source FROM plans WHERE source LIKE ? ESCAPE '\\'",
+                (_escape_like(prefix) + "%",),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+_STORE: Optional[PlanStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_plan_store() -> PlanStore:
+    """Return the process-wide plan store under ``~/.pb_plans``."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = PlanStore()
+        return _STORE
+
+
+def record_plan(
+    prompt: str,
+    plan: Any,
+    source: str = "",
+    specs: Optional[Dict[str, dict]] = None,
+) -> Optional[int]:
+    """Record a plan in the default store; log and return None on failure.
+
+    ``specs`` is the catalog the plan was made against; without it the plan is
+    stored with no catalog fingerprint.
+    """
+    try:
+        fingerprint, versions = "", None
+        if specs is not None:
+            from orchestrator_core.catalog.index import (
+                catalog_fingerprint,
+                catalog_versions,
+            )
+
+            fingerprint = catalog_fingerprint(specs)
+            versions = catalog_versions(specs)
+        return get_plan_store().record(
+            prompt,
+            plan,
+            catalog_fingerprint=fingerprint,
+            source=source,
+            catalog_versions=versions,
+        )
+    except Exception as e:
+        logger.warning("Could not record plan in plan store: %s", e)
+        return None
@@ -3,6 +3,8 @@ from pathlib import Path
 from typing import Dict, Any
 import json
 
+from orchestrator_core.telemetry import call_with_retries, track_llm_call
+
 
 class CodeGenerationSkill:
     """Generate Python code using LLM."""
@@ -26,7 +28,7 @@ class CodeGenerationSkill:
         try:
             from openai import OpenAI
 
-            client = OpenAI(api_key=self.api_key)
+            client = OpenAI(api_key=self.api_key, max_retries=0)
 
             developer_instructions = """You are an expert Python developer. Generate complete, working Python functions.
 
@@ -54,11 +56,20 @@ Parameters:
 
 The function should be complete, tested, and ready for production use."""
 
-            response = client.responses.create(
-                model="o4-mini-2025-04-16",
-                instructions=developer_instructions,
-                input=user_input,
-            )
+            with track_llm_call(
+                "skills.generate_function",
+                "o4-mini-2025-04-16",
+                developer_instructions + user_input,
+            ) as call:
+                response = call_with_retries(
+                    call,
+                    lambda: client.responses.create(
+                        model="o4-mini-2025-04-16",
+                        instructions=developer_instructions,
+                        input=user_input,
+                    ),
+                )
+                call.record_response(response)
 
             if hasattr(response, "output_text") and response.output_text:
                 return response.output_text.strip()
@@ -126,7 +137,7 @@ The function should be complete, tested, and ready for production use."""
         try:
             from openai import OpenAI
 
-            client = OpenAI(api_key=self.api_key)
+            client = OpenAI(api_key=self.api_key, max_retries=0)
 
             entrypoints = contract.get("entrypoints", [])
             entrypoint_specs = []
@@ -171,11 +182,20 @@ Required Functions:
 
 Generate a fully functional Python module that implements these requirements. The code should be ready to use immediately without any modifications."""
 
-            response = client.responses.create(
-                model="o4-mini-2025-04-16",
-                instructions=developer_instructions,
-                input=user_input,
-            )
+            with track_llm_call(
+                "skills.generate_utility",
+                "o4-mini-2025-04-16",
+                developer_instructions + user_input,
+            ) as call:
+                response = call_with_retries(
+                    call,
+                    lambda: client.responses.create(
+                        model="o4-mini-2025-04-16",
+                        instructions=developer_instructions,
+                        input=user_input,
+                    ),
+                )
+                call.record_response(response)
 
             if hasattr(response, "output_text") and response.output_text:
                 generated_code = response.output_text.strip()
@@ -338,7 +358,7 @@ class PlanningSkill:
 
         try:
             from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
+            client = OpenAI(api_key=self.api_key, max_retries=0)
 
             developer_instructions = """You are an expert software architect specializing in self-improving AI systems.
 
@@ -379,11 +399,20 @@ Create a detailed implementation plan to achieve this goal. The plan should resu
 
 Limit the plan to 3-5 high-impact steps."""
 
-            response = client.responses.create(
-                model="o4-mini-2025-04-16",
-                instructions=developer_instructions,
-                input=user_input,
-            )
+            with track_llm_call(
+                "skills.plan_self_improvement",
+                "o4-mini-2025-04-16",
+                developer_instructions + user_input,
+            ) as call:
+                response = call_with_retries(
+                    call,
+                    lambda: client.responses.create(
+                        model="o4-mini-2025-04-16",
+                        instructions=developer_instructions,
+                        input=user_input,
+                    ),
+                )
+                call.record_response(response)
 
             if hasattr(response, "output_text") and response.output_text:
                 content = response.output_text.strip()
@@ -0,0 +1,244 @@
+"""Token and latency accounting for LLM calls.
+
+Every model call is wrapped in :func:`track_llm_call`, which records the endpoint,
+model, prompt size, input/output tokens, wall time, outcome and retries as an
+:class:`LLMCall`. Transient failures (connection errors, timeouts, 429 and 5xx
+responses) are retried by :func:`call_with_retries`, which counts them on the
+record; clients are created with the SDK's own retries turned off so every retry
+is counted. Records go to the registered metrics sinks (an in-memory ring by
+default, plus a JSON-lines file when ``PB_LLM_METRICS_FILE`` is set) and to any
+per-request collector opened with :func:`collect_llm_calls`.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Retries of a transient LLM failure before giving up, and the first backoff
+LLM_RETRIES = int(os.getenv("PB_LLM_RETRIES", "2"))
+RETRY_BACKOFF = 0.5
+
+
+@dataclass
+class LLMCall:
+    """One model call and what it cost."""
+
+    endpoint: str
+    model: str
+    prompt_chars: int = 0
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    wall_ms: float = 0.0
+    outcome: str = "ok"
+    error: Optional[str] = None
+    # Retries performed by the caller around this call
+    retries: int = 0
+    timestamp: str = field(
+        default_factory=lambda: datetime.datetime.now().isoformat(timespec="seconds")
+    )
+
+    def record_response(self, resp: Any) -> None:
+        """Read token usage from a Responses or Chat Completions result."""
+        usage = getattr(resp, "usage", None)
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            get = usage.get
+        else:
+
+            def get(key):
+                return getattr(usage, key, None)
+
+        self.input_tokens = get("input_tokens") or get("prompt_tokens")
+        self.output_tokens = get("output_tokens") or get("completion_tokens")
+
+
+class InMemorySink:
+    """Keeps the most recent calls in a bounded ring buffer."""
+
+    def __init__(self, maxlen: int = 10_000) -> None:
+        self.calls: Deque[LLMCall] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def emit(self, call: LLMCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def snapshot(self) -> List[LLMCall]:
+        with self._lock:
+            return list(self.calls)
+
+
+class JsonlSink:
+    """Appends each call as one JSON line to a file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def emit(self, call: LLMCall) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as f:
+                f.write(json.dumps(asdict(call)) + "\n")
+
+
+memory_sink = InMemorySink()
+_sinks: List[Any] = [memory_sink]
+if os.getenv("PB_LLM_METRICS_FILE"):
+    _sinks.append(JsonlSink(Path(os.environ["PB_LLM_METRICS_FILE"])))
+
+_collector: ContextVar[Optional[List[LLMCall]]] = ContextVar(
+    "pb_llm_collector", default=None
+)
+
+
+def add_sink(sink: Any) -> None:
+    """Register a sink; it must provide ``emit(call)``."""
+    _sinks.append(sink)
+
+
+def remove_sink(sink: Any) -> None:
+    """Unregister a previously added sink."""
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def _emit(call: LLMCall) -> None:
+    collected = _collector.get()
+    if collected is not None:
+        collected.append(call)
+    for sink in list(_sinks):
+        try:
+            sink.emit(call)
+        except Exception as e:
+            logger.warning("LLM metrics sink %r failed: %s", sink, e)
+
+
+@contextmanager
+def track_llm_call(endpoint: str, model: str, prompt: str = "") -> Iterator[LLMCall]:
+    """Time a model call; call ``record_response`` on the yielded record."""
+    call = LLMCall(endpoint=endpoint, model=model, prompt_chars=len(prompt))
+    started = time.perf_counter()
+    try:
+        yield call
+    except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+        call.outcome = "cancelled"
+        call.error = str(e) or type(e).__name__
+        raise
+    except BaseException as e:
+        call.outcome = "error"
+        call.error = str(e) or type(e).__name__
+        raise
+    finally:
+        call.wall_ms = round((time.perf_counter() - started) * 1000, 1)
+        _emit(call)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """True for failures worth retrying: connection errors, timeouts, 429, 5xx."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _should_retry(call: LLMCall, exc: Exception, retries: Optional[int]) -> bool:
+    """Decide whether to retry after ``exc``; count the retry on ``call`` if so."""
+    limit = LLM_RETRIES if retries is None else retries
+    if call.retries >= limit or not _is_transient(exc):
+        return False
+    call.retries += 1
+    logger.info("Retrying %s after %s (retry %d)", call.endpoint, exc, call.retries)
+    return True
+
+
+def call_with_retries(
+    call: LLMCall, func: Callable[[], T], retries: Optional[int] = None
+) -> T:
+    """Run ``func``, retrying transient failures and counting them on ``call``."""
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if not _should_retry(call, e, retries):
+                raise
+        time.sleep(RETRY_BACKOFF * 2 ** (call.retries - 1))
+
+
+async def call_with_retries_async(
+    call: LLMCall, func: Callable[[], Awaitable[T]], retries: Optional[int] = None
+) -> T:
+    """Async :func:`call_with_retries`; ``func`` returns a new awaitable per try."""
+    while True:
+        try:
+            return await func()
+        except Exception as e:
+            if not _should_retry(call, e, retries):
+                raise
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** (call.retries - 1))
+
+
+@contextmanager
+def collect_llm_calls() -> Iterator[List[LLMCall]]:
+    """Collect the calls made inside the block (and tasks/threads it spawns)."""
+    calls: List[LLMCall] = []
+    token = _collector.set(calls)
+    try:
+        yield calls
+    finally:
+        _collector.reset(token)
+
+
+def summarize(calls: Iterable[LLMCall]) -> Dict[str, Any]:
+    """Aggregate calls into totals overall and per endpoint."""
+
+    def _empty() -> Dict[str, Any]:
+        return {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "prompt_chars": 0,
+            "wall_ms": 0.0,
+        }
+
+    total = _empty()
+    by_endpoint: Dict[str, Dict[str, Any]] = {}
+    for call in calls:
+        for bucket in (total, by_endpoint.setdefault(call.endpoint, _empty())):
+            bucket["calls"] += 1
+            bucket["errors"] += call.outcome != "ok"
+            bucket["retries"] += call.retries
+            bucket["input_tokens"] += call.input_tokens or 0
+            bucket["output_tokens"] += call.output_tokens or 0
+            bucket["prompt_chars"] += call.prompt_chars
+            bucket["wall_ms"] = round(bucket["wall_ms"] + call.wall_ms, 1)
+    total["by_endpoint"] = by_endpoint
+    return total
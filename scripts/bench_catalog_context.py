@@ -0,0 +1,130 @@
+"""Benchmark: tokens per utility in the planner's catalog context, before and after.
+
+Compares the verbatim JSON context (``PLANNER_CONTEXT_FORMAT=json``) with the
+compact encoder on the local registry, or on a synthetic catalog when the registry
+is empty or ``--synthetic N`` is given. Tokens are counted with tiktoken when it is
+installed, otherwise approximated by counting words and punctuation.
+
+    python scripts/bench_catalog_context.py
+    python scripts/bench_catalog_context.py --synthetic 200
+"""
+
+import argparse
+import pathlib
+import re
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from orchestrator_core.planner.context import (  # noqa: E402
+    encode_catalog,
+    encode_catalog_json,
+)
+
+
+def _counter():
+    try:
+        import tiktoken
+
+        enc = tiktoken.get_encoding("o200k_base")
+        return "tiktoken/o200k_base", lambda text: len(enc.encode(text))
+    except Exception:
+        return "approx (words+punctuation)", lambda text: len(
+            re.findall(r"\w+|[^\w\s]", text)
+        )
+
+
+def synthetic_catalog(n: int) -> list:
+    """Build ``n`` specs shaped like GitHub-discovered utility contracts."""
+    money = {
+        "type": "object",
+        "properties": {"amount": {"type": "number"}, "currency": {"type": "string"}},
+        "required": ["amount", "currency"],
+    }
+    transaction = {
+        "type": "object",
+        "properties": {
+            "date": {"type": "string", "format": "date"},
+            "value": money,
+            "memo": {"type": "string"},
+        },
+        "required": ["date", "value"],
+    }
+    specs = []
+    for i in range(n):
+        specs.append(
+            {
+                "name": f"utility_{i:04d}",
+                "version": f"1.{i % 7}.0",
+                "language": "python",
+                "description": f"Processes financial records, variant {i}.",
+                "size_budget": 200000,
+                "entrypoints": [
+                    {
+                        "name": "run",
+                        "description": "Process a batch of transactions.",
+                        "parameters_schema": {
+                            "type": "object",
+                            "properties": {
+                                "transactions": {"type": "array", "items": transaction},
+                                "strict": {"type": "boolean"},
+                            },
+                            "required": ["transactions"],
+                        },
+                        "return_schema": {
+                            "type": "object",
+                            "properties": {
+                                "total": money,
+                                "rows": {"type": "array", "items": transaction},
+                            },
+                        },
+                    }
+                ],
+                "deps": [{"package": "pandas", "version": ">=2"}],
+                "tests": [f"tests/test_utility_{i:04d}.py"],
+                "_source_repository_url_discovered": (
+                    f"https://github.com/PrometheusBlocks/utility_{i:04d}"
+                ),
+            }
+        )
+    return specs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--synthetic", type=int, help="Use N synthetic utilities")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        utilities, source = synthetic_catalog(args.synthetic), "synthetic"
+    else:
+        from orchestrator_core.catalog.index import load_specs
+
+        utilities, source = list(load_specs().values()), "registry"
+        if not utilities:
+            utilities, source = synthetic_catalog(100), "synthetic (empty registry)"
+
+    name, count = _counter()
+    print(f"catalog: {source}, {len(utilities)} utilities; tokenizer: {name}")
+    print(f"{'format':<8} {'tokens':>8} {'per utility':>12} {'chars':>9} {'ms':>7}")
+    baseline = None
+    for label, encode in (("json", encode_catalog_json), ("compact", encode_catalog)):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            text = encode(utilities)
+        ms = (time.perf_counter() - started) * 1000 / args.repeat
+        tokens = count(text)
+        baseline = baseline or tokens
+        print(
+            f"{label:<8} {tokens:>8} {tokens / len(utilities):>12.1f}"
+            f" {len(text):>9} {ms:>7.2f}"
+        )
+    print(f"reduction: {1 - tokens / baseline:.1%}")
+    # Same catalog in a different order must encode to identical bytes
+    assert encode_catalog(utilities) == encode_catalog(list(reversed(utilities)))
+
+
+if __name__ == "__main__":
+    main()
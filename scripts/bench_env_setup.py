@@ -0,0 +1,74 @@
+"""Benchmark: environment setup time for a multi-utility project.
+
+Builds a synthetic project of N utilities whose requirements overlap, then times
+setting up a fresh venv two ways: one ``pip install -r`` per utility (the old
+behaviour) and the merged single-pass install of ``prepare_environment``. Finally
+it times a repeated ``prepare_environment`` on the unchanged project. A warm-up
+run fills the pip cache first so both variants download nothing.
+
+    python scripts/bench_env_setup.py --utilities 20
+"""
+
+import argparse
+import pathlib
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from orchestrator_core.executor import runner  # noqa: E402
+
+PACKAGES = ["six", "idna", "attrs", "packaging", "certifi", "pyparsing", "wrapt"]
+
+
+def make_project(root: pathlib.Path, n: int) -> pathlib.Path:
+    project = root / "project"
+    for i in range(n):
+        util = project / f"utility_{i:02d}"
+        util.mkdir(parents=True)
+        (util / "__init__.py").write_text("def run():\n    return 'ok'\n")
+        picks = {PACKAGES[i % len(PACKAGES)], PACKAGES[(i * 3 + 1) % len(PACKAGES)]}
+        (util / "requirements.txt").write_text("\n".join(sorted(picks)) + "\n")
+    return project
+
+
+def per_utility_setup(project: pathlib.Path) -> None:
+    venv_dir = project / "venv"
+    runner.create_virtualenv(venv_dir)
+    for util_dir in sorted(project.iterdir()):
+        req = util_dir / "requirements.txt"
+        if req.exists():
+            runner.install_requirements(venv_dir, req)
+
+
+def _timed(label: str, func) -> float:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.2f}s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utilities", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = make_project(pathlib.Path(tmp), args.utilities)
+        print(f"{args.utilities} utilities, {len(PACKAGES)} distinct packages")
+        runner.prepare_environment(project)  # warm the pip cache
+        shutil.rmtree(project / "venv")
+        before = _timed("per-utility pip installs", lambda: per_utility_setup(project))
+        shutil.rmtree(project / "venv")
+        after = _timed(
+            "merged single install", lambda: runner.prepare_environment(project)
+        )
+        _timed("unchanged project", lambda: runner.prepare_environment(project))
+        print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
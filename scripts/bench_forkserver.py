@@ -0,0 +1,93 @@
+"""Benchmark: fanning out parallel jobs from fresh workers versus the fork server.
+
+The utility allocates ``--heavy-mb`` of module-level data and sleeps for
+``--import-cost`` seconds at import, standing in for pandas-sized dependencies.
+``--jobs`` jobs run at once, first each in a fresh worker process, then forked
+from a fork server that preloaded the utility. Reports wall time and the summed
+proportional set size (PSS, shared pages split between sharers) of the job
+processes, read from ``/proc`` on Linux.
+
+    python scripts/bench_forkserver.py --jobs 24
+"""
+
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from orchestrator_core.executor.forkserver import ForkServer  # noqa: E402
+from orchestrator_core.executor.process import run_in_subprocess  # noqa: E402
+
+UTILITY = """\
+import time
+
+time.sleep({import_cost})
+DATA = bytearray({heavy_mb} << 20)
+
+
+def run(hold):
+    time.sleep(hold)
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+    except OSError:
+        return 0
+"""
+
+
+def make_project(root: pathlib.Path, import_cost: float, heavy_mb: int):
+    project = root / "project"
+    (project / "heavy").mkdir(parents=True)
+    (project / "heavy" / "__init__.py").write_text(
+        UTILITY.format(import_cost=import_cost, heavy_mb=heavy_mb)
+    )
+    (project / "venv" / "bin").mkdir(parents=True)
+    (project / "venv" / "bin" / "python").symlink_to(sys.executable)
+    return project
+
+
+def _fan_out(label: str, jobs: int, func) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(jobs) as pool:
+        pss = list(pool.map(func, range(jobs)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<18} {elapsed:8.2f}s {sum(pss) / 1024:10.0f} MB PSS")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--import-cost", type=float, default=1.0)
+    parser.add_argument("--heavy-mb", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = make_project(pathlib.Path(tmp), args.import_cost, args.heavy_mb)
+        venv = project / "venv"
+        # Jobs hold for a moment so all of them are alive when PSS is read
+        hold = {"hold": 0.5}
+        print(f"{args.jobs} parallel jobs, {args.heavy_mb} MB preloaded data")
+        before = _fan_out(
+            "fresh workers",
+            args.jobs,
+            lambda _: run_in_subprocess(project, venv, "heavy", "run", hold)[0],
+        )
+        server = ForkServer(project, venv, preload=["heavy"])
+        try:
+            after = _fan_out(
+                "fork server",
+                args.jobs,
+                lambda _: server.call("heavy", "run", hold)[0],
+            )
+        finally:
+            server.close()
+        print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
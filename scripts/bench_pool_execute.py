@@ -0,0 +1,78 @@
+"""Benchmark: per-call overhead of subprocess execution versus a warm worker pool.
+
+Creates a project whose utility takes ``--import-cost`` seconds to import (a
+stand-in for pandas and friends) and runs its entrypoint N times in a fresh
+worker each time, then through a pool server over its Unix socket. The stand-in
+venv uses this interpreter, so venv setup is not part of the numbers.
+
+    python scripts/bench_pool_execute.py --calls 50
+"""
+
+import argparse
+import pathlib
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from orchestrator_core.executor.pool import running_pool, serve_pool  # noqa: E402
+from orchestrator_core.executor.process import run_in_subprocess  # noqa: E402
+
+
+def make_project(root: pathlib.Path, import_cost: float) -> pathlib.Path:
+    project = root / "project"
+    (project / "heavy").mkdir(parents=True)
+    (project / "heavy" / "__init__.py").write_text(
+        f"import time\ntime.sleep({import_cost})\n\ndef run(x):\n    return x * 2\n"
+    )
+    (project / "venv" / "bin").mkdir(parents=True)
+    (project / "venv" / "bin" / "python").symlink_to(sys.executable)
+    return project
+
+
+def _median_ms(label: str, calls: int, func) -> float:
+    times = []
+    for i in range(calls):
+        started = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - started)
+    median = statistics.median(times) * 1000
+    print(f"{label:<22} {median:9.2f} ms/call")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--import-cost", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = make_project(pathlib.Path(tmp), args.import_cost)
+        venv = project / "venv"
+        before = _median_ms(
+            "fresh subprocess",
+            max(1, args.calls // 10),
+            lambda i: run_in_subprocess(project, venv, "heavy", "run", {"x": i}),
+        )
+        server = serve_pool(project, venv, min_workers=1)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = running_pool(project)
+            client.call("heavy", "run", {"x": 0})  # first call imports
+            after = _median_ms(
+                "warm pool (socket)",
+                args.calls,
+                lambda i: client.call("heavy", "run", {"x": i}),
+            )
+            client.shutdown()
+        finally:
+            server.server_close()
+        print(f"speedup: {before / after:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
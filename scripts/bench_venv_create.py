@@ -0,0 +1,67 @@
+"""Benchmark: project venv creation, ``python -m venv`` versus template cloning.
+
+Builds the template for the running interpreter once (not timed), then creates N
+venvs each way and reports the median. The clone method (reflink, hardlink or
+copy) depends on the filesystem of the temporary directory.
+
+    python scripts/bench_venv_create.py --runs 5
+"""
+
+import argparse
+import pathlib
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from orchestrator_core.executor.venv_template import VenvTemplates  # noqa: E402
+
+
+def _median(label: str, runs: int, func) -> float:
+    times = []
+    for i in range(runs):
+        started = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - started)
+    median = statistics.median(times)
+    print(f"{label:<24} {median * 1000:10.1f} ms")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        templates = VenvTemplates(root / "templates")
+        templates.ensure()
+
+        def fresh(i: int) -> None:
+            subprocess.run(
+                [sys.executable, "-m", "venv", str(root / f"venv{i}")], check=True
+            )
+
+        def clone(i: int) -> None:
+            templates.clone(root / f"clone{i}")
+
+        before = _median("python -m venv", args.runs, fresh)
+        after = _median("template clone", args.runs, clone)
+        print(f"clone method: {templates.clone(root / 'probe')}")
+        print(f"speedup: {before / after:.0f}x")
+        # Cloned venvs must work like fresh ones
+        python = root / "clone0" / "bin" / "python"
+        out = subprocess.run(
+            [str(python), "-m", "pip", "--version"], capture_output=True, text=True
+        )
+        assert str(root / "clone0") in out.stdout, out
+        shutil.rmtree(root / "probe")
+
+
+if __name__ == "__main__":
+    main()
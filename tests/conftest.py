@@ -0,0 +1,58 @@
+import json
+import sys
+
+import pytest
+
+import orchestrator_core.planner.reuse as reuse
+import orchestrator_core.planner.store as store
+from orchestrator_core.executor.runner import ENV_STAMP
+
+
+@pytest.fixture(autouse=True)
+def private_home(tmp_path_factory, monkeypatch):
+    """Keep the plan store, reuse index and other ``~`` state out of the real home."""
+    home = tmp_path_factory.mktemp("home")
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setattr(store, "_STORE", None)
+    monkeypatch.setattr(reuse, "_INDEX", None)
+    return home
+
+
+@pytest.fixture
+def prepared():
+    """Arguments of each call to a ``prepare_environment`` stubbed by make_project."""
+    return []
+
+
+@pytest.fixture
+def make_project(tmp_path, monkeypatch, prepared):
+    """Factory for a project holding one utility, with this interpreter as its venv.
+
+    ``make_project(name, source)`` writes ``source`` to ``<name>/__init__.py``.
+    ``contract`` is written as the utility's ``utility_contract.json``, ``stamp``
+    marks the venv as prepared, and ``prepare`` is a module whose
+    ``prepare_environment`` is replaced by a stub that records its arguments in
+    ``prepared`` and returns the venv.
+    """
+
+    def make(name, source, contract=None, stamp=False, prepare=None):
+        project = tmp_path / "proj"
+        (project / name).mkdir(parents=True)
+        (project / name / "__init__.py").write_text(source)
+        if contract is not None:
+            (project / name / "utility_contract.json").write_text(json.dumps(contract))
+        # Stand-in venv: its python is this interpreter
+        venv = project / "venv"
+        (venv / "bin").mkdir(parents=True)
+        (venv / "bin" / "python").symlink_to(sys.executable)
+        if stamp:
+            (venv / ENV_STAMP).write_text("{}")
+        if prepare is not None:
+            monkeypatch.setattr(
+                prepare,
+                "prepare_environment",
+                lambda *a, **k: prepared.append(a) or venv,
+            )
+        return project
+
+    return make
@@ -59,3 +59,19 @@ def test_normalize_plan_caps(monkeypatch):
     }
     norm = normalize_plan_for_scaffolding(raw)
     assert norm == {"resolved": ["cap_a"], "missing": ["cap_b"]}
+
+
+def test_normalize_plan_resolves_near_miss_names(monkeypatch):
+    monkeypatch.setattr(
+        "orchestrator_core.api.main.load_specs",
+        lambda: {"FinancialDocumentParser": {}},
+    )
+    raw = [
+        {"step_id": 1, "action": "financial-document-parser"},
+        {"step_id": 2, "action": "retirement_simulator"},
+    ]
+    norm = normalize_plan_for_scaffolding(raw)
+    assert norm == {
+        "resolved": ["FinancialDocumentParser"],
+        "missing": ["retirement_simulator"],
+    }
@@ -0,0 +1,65 @@
+from orchestrator_core.catalog.resolver import (
+    BKTree,
+    NameResolver,
+    levenshtein,
+    normalize_name,
+)
+from orchestrator_core.planner import maker
+
+SPECS = {
+    "FinancialDocumentParser": {"version": "1.0.0"},
+    "statement_parser": {"version": "0.2.0", "aliases": ["bank-statement-reader"]},
+    "foo": {},
+    "bar": {},
+}
+
+
+def test_normalize_and_distance():
+    assert normalize_name("financial-document-parser") == "financialdocumentparser"
+    assert normalize_name("FinancialDocumentParser") == "financialdocumentparser"
+    assert normalize_name("PDF_Reader v2") == "pdfreaderv2"
+    assert levenshtein("kitten", "sitting") == 3
+    assert levenshtein("kitten", "sitting", max_distance=1) == 2
+
+
+def test_bk_tree_search_matches_brute_force():
+    words = ["book", "books", "cake", "boo", "cape", "cart", "boon", "cook"]
+    tree = BKTree(words + ["book"])
+    assert len(tree) == len(words)
+    for query in ("bool", "cae", "xyz"):
+        expected = sorted(
+            (levenshtein(query, w), w) for w in words if levenshtein(query, w) <= 1
+        )
+        assert tree.search(query, 1) == expected
+
+
+def test_resolve_methods_and_confidence():
+    resolver = NameResolver(SPECS)
+    exact = resolver.resolve("foo")
+    assert (exact.name, exact.method, exact.confidence) == ("foo", "exact", 1.0)
+    match = resolver.resolve("financial-document-parser")
+    assert (match.name, match.method) == ("FinancialDocumentParser", "normalized")
+    assert resolver.resolve("Bank Statement Reader").method == "alias"
+    fuzzy = resolver.resolve("financial_documnt_parser")
+    assert fuzzy.name == "FinancialDocumentParser" and fuzzy.method == "fuzzy"
+    assert resolver.resolve("financial_document_parser").confidence > fuzzy.confidence
+    # Short names need an exact normalized match
+    assert resolver.resolve("baz") is None
+    assert resolver.resolve("simulation_engine") is None
+
+
+def test_ambiguous_fuzzy_match_is_not_resolved():
+    resolver = NameResolver({"report_builder_a": {}, "report_builder_b": {}})
+    assert resolver.resolve("report_builder_c") is None
+    assert resolver.resolve("ReportBuilderA").name == "report_builder_a"
+
+
+def test_make_plan_uses_catalog_names(monkeypatch):
+    monkeypatch.setattr(maker, "load_specs", lambda: SPECS)
+    monkeypatch.setattr(
+        maker, "prompt_to_capabilities", lambda p: ["financial-document-parser", "x"]
+    )
+    monkeypatch.setattr(maker, "record_plan", lambda *a, **k: None)
+    plan = maker.make_plan("parse my documents")
+    assert plan["resolved"] == ["FinancialDocumentParser"]
+    assert plan["missing"] == ["x"]
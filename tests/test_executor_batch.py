@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+import orchestrator_core.executor.batch as batch
+from orchestrator_core import cli
+from orchestrator_core.executor.batch import execute_many
+
+UTILITY = """\
+import time
+
+
+def square(x, delay=0):
+    time.sleep(delay)
+    if x < 0:
+        raise ValueError(f"negative: {x}")
+    print(x)
+    return x * x
+"""
+
+
+@pytest.fixture
+def project(make_project):
+    return make_project("batchutil", UTILITY, prepare=batch)
+
+
+def test_results_in_input_order_with_errors(project, prepared):
+    params = [{"x": i} for i in range(50)] + [{"x": -1}]
+    items = list(
+        execute_many(project, "batchutil", "square", params, workers=3, chunk_size=4)
+    )
+    assert [item.index for item in items] == list(range(51))
+    assert [item.return_value for item in items[:50]] == [i * i for i in range(50)]
+    assert items[3].stdout == "3\n"
+    assert not items[50].ok and items[50].error == "ValueError"
+    assert items[50].to_dict()["message"] == "negative: -1"
+    # The venv is prepared once for the whole batch
+    assert len(prepared) == 1
+
+
+def test_unordered_yields_every_item(project):
+    # The first chunk is slow, so later chunks finish first
+    params = [{"x": 0, "delay": 0.5}] + [{"x": i} for i in range(1, 20)]
+    items = list(
+        execute_many(
+            project,
+            "batchutil",
+            "square",
+            params,
+            workers=2,
+            chunk_size=1,
+            ordered=False,
+        )
+    )
+    assert sorted(item.index for item in items) == list(range(20))
+    assert items[0].index != 0
+
+
+def test_input_is_read_lazily(project):
+    consumed = []
+
+    def params():
+        for i in range(10_000):
+            consumed.append(i)
+            yield {"x": i}
+
+    results = execute_many(
+        project, "batchutil", "square", params(), workers=2, chunk_size=5
+    )
+    first = next(results)
+    assert first.return_value == 0
+    # At most 2 * workers chunks were read ahead
+    assert len(consumed) <= 2 * 2 * 5 + 5
+    results.close()
+
+
+def test_chunk_timeout_fails_its_items(project):
+    params = [{"x": 1, "delay": 30}, {"x": 2}]
+    items = list(
+        execute_many(
+            project, "batchutil", "square", params, workers=1, chunk_size=2, timeout=0.2
+        )
+    )
+    assert [item.error for item in items] == ["ExecutionTimeout"] * 2
+
+
+def test_cli_params_jsonl(project, tmp_path, capsys):
+    source = tmp_path / "params.jsonl"
+    source.write_text("".join(json.dumps({"x": i}) + "\n" for i in range(5)))
+    out = tmp_path / "out.jsonl"
+    argv = ["execute", str(project), "--utility", "batchutil", "--entrypoint"]
+    argv += ["square", "--params-jsonl", str(source), "--output", str(out)]
+    cli.main(argv + ["--workers", "2", "--chunk-size", "2"])
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["return"] for r in records] == [0, 1, 4, 9, 16]
+    assert "5 succeeded, 0 failed" in capsys.readouterr().err
+
+
+def test_cli_params_jsonl_honours_mode_and_memory_limit(project, tmp_path, monkeypatch):
+    source = tmp_path / "params.jsonl"
+    source.write_text(json.dumps({"x": 3}) + "\n")
+    out = tmp_path / "out.jsonl"
+    argv = ["execute", str(project), "--utility", "batchutil", "--entrypoint"]
+    argv += ["square", "--params-jsonl", str(source), "--output", str(out)]
+    limits = []
+    pool_class = batch.WorkerPool
+
+    def worker_pool(*args, **kwargs):
+        limits.append(kwargs.get("memory_limit"))
+        return pool_class(*args, **kwargs)
+
+    monkeypatch.setattr(batch, "WorkerPool", worker_pool)
+    cli.main(argv + ["--mode", "pool", "--memory-limit", "1024"])
+    assert limits == [1024 * 2**20]
+    assert json.loads(out.read_text())["return"] == 9
+    with pytest.raises(SystemExit, match="--mode inprocess is not supported"):
+        cli.main(argv + ["--mode", "inprocess"])
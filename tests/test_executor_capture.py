@@ -0,0 +1,212 @@
+import json
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.api.main import app
+from orchestrator_core.executor.batch import execute_many
+from orchestrator_core.executor.capture import OutputCapture, capture_output
+from orchestrator_core.executor.pool import running_pool, serve_pool
+from orchestrator_core.executor.process import ExecutionError
+
+UTILITY = """\
+import sys
+import time
+
+
+def chatty(lines, delay=0.0):
+    for i in range(lines):
+        print(f"line {i}", flush=True)
+        time.sleep(delay)
+    return lines
+
+
+def flood(size):
+    sys.stdout.write("x" * size)
+    print("tail", file=sys.stderr)
+    return size
+
+
+def fail():
+    print("about to fail")
+    raise RuntimeError("nope")
+
+
+def tag(name, count):
+    for _ in range(count):
+        print(name)
+        time.sleep(0.001)
+    return name
+"""
+
+
+@pytest.fixture
+def project(make_project):
+    return make_project("caputil", UTILITY, prepare=runner)
+
+
+def test_capture_keeps_the_most_recent_output(tmp_path):
+    capture = OutputCapture(limit=10, spill=tmp_path / "spill")
+    capture.write("stdout", "0123456789")
+    capture.write("stderr", "err")
+    capture.write("stdout", "abcd")
+    capture.close()
+    assert capture.dropped == {"stdout": 7, "stderr": 0}
+    assert capture.stdout.endswith("]\n789abcd")
+    assert capture.stdout.startswith("[7 characters dropped; full output in ")
+    assert capture.stderr == "err"
+    assert (tmp_path / "spill" / "stdout.log").read_text() == "0123456789abcd"
+    assert (tmp_path / "spill" / "stderr.log").read_text() == "err"
+
+
+def test_follow_yields_output_as_it_arrives():
+    capture = OutputCapture()
+    capture.write("stdout", "early")
+    seen = []
+    follower = threading.Thread(target=lambda: seen.extend(capture.follow()))
+    follower.start()
+    time.sleep(0.05)
+    capture.write("stderr", "late")
+    capture.close()
+    follower.join(5)
+    assert seen == [("stdout", "early"), ("stderr", "late")]
+
+
+def test_concurrent_inprocess_executions_are_isolated(project):
+    names = [f"t{i}" for i in range(8)]
+    results = {}
+
+    def run(name):
+        results[name] = runner.execute_utility(
+            project, "caputil", "tag", {"name": name, "count": 20}
+        )
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    for name in names:
+        assert results[name].stdout == f"{name}\n" * 20
+    # The redirect is gone once no execution is running
+    assert type(sys.stdout).__name__ != "_Router"
+
+
+def test_capture_output_leaves_other_threads_alone(capsys):
+    capture = OutputCapture()
+    with capture_output(capture):
+        print("captured")
+        other = threading.Thread(target=print, args=("not captured",))
+        other.start()
+        other.join()
+    assert capture.stdout == "captured\n"
+    assert capsys.readouterr().out == "not captured\n"
+
+
+def test_subprocess_output_streams_before_the_call_returns(project):
+    capture = OutputCapture()
+    first_line = []
+
+    def follow():
+        for _, text in capture.follow():
+            first_line.append(time.monotonic())
+            return
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    result = runner.execute_utility(
+        project,
+        "caputil",
+        "chatty",
+        {"lines": 3, "delay": 0.3},
+        mode="subprocess",
+        capture=capture,
+    )
+    finished = time.monotonic()
+    follower.join(5)
+    assert result.stdout == "line 0\nline 1\nline 2\n"
+    assert first_line and finished - first_line[0] > 0.4
+
+
+def test_large_subprocess_output_is_bounded(project, tmp_path):
+    size = 5 * 2**20
+    capture = OutputCapture(limit=1000, spill=tmp_path / "spill")
+    result = runner.execute_utility(
+        project,
+        "caputil",
+        "flood",
+        {"size": size},
+        mode="subprocess",
+        capture=capture,
+    )
+    assert result.return_value == size
+    assert len(result.stdout) < 1200
+    assert result.stdout.endswith("x" * 100)
+    assert result.stderr == "tail\n"
+    assert (tmp_path / "spill" / "stdout.log").stat().st_size == size
+
+
+def test_unstreamed_worker_output_is_bounded(project, monkeypatch):
+    monkeypatch.setenv("PB_OUTPUT_LIMIT", "1000")
+    size = 5 * 2**20
+    [item] = execute_many(project, "caputil", "flood", [{"size": size}], workers=1)
+    assert item.return_value == size
+    assert item.stdout.startswith(f"[{size - 1000} characters dropped]\n")
+    assert item.stdout.endswith("\n" + "x" * 1000)
+    assert item.stderr == "tail\n"
+
+
+def test_failed_call_keeps_its_output(project):
+    with pytest.raises(ExecutionError) as err:
+        runner.execute_utility(project, "caputil", "fail", {}, mode="subprocess")
+    assert err.value.stdout == "about to fail\n"
+
+
+def test_pool_server_relays_output(project):
+    server = serve_pool(project, project / "venv", min_workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        chunks = []
+        value, stdout, _ = running_pool(project).call(
+            "caputil",
+            "chatty",
+            {"lines": 2},
+            on_output=lambda stream, text: chunks.append((stream, text)),
+        )
+        assert value == 2
+        assert stdout == ""
+        assert "".join(text for _, text in chunks) == "line 0\nline 1\n"
+        running_pool(project).shutdown()
+        thread.join(5)
+    finally:
+        server.server_close()
+
+
+def test_api_execute_follow_streams_events(project):
+    client = TestClient(app)
+    payload = {
+        "project_dir": str(project),
+        "utility": "caputil",
+        "entrypoint": "chatty",
+        "params": {"lines": 2},
+        "mode": "subprocess",
+    }
+    response = client.post("/execute", json=payload)
+    assert response.json() == {
+        "ok": True,
+        "return": 2,
+        "stdout": "line 0\nline 1\n",
+        "stderr": "",
+    }
+    response = client.post("/execute", json=dict(payload, follow=True))
+    events = [line for line in response.iter_lines() if line]
+    *output, result = [json.loads(line) for line in events]
+    assert "".join(event["data"] for event in output) == "line 0\nline 1\n"
+    assert result == {"ok": True, "return": 2}
+    response = client.post("/execute", json=dict(payload, mode="nope"))
+    assert response.status_code == 400
@@ -0,0 +1,100 @@
+import json
+import subprocess
+
+import pytest
+
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.deps import (
+    DependencyConflictError,
+    contract_requirement,
+    merge_requirements,
+    project_requirements,
+)
+
+
+def _utility(project, name, requirements="", deps=None):
+    util = project / name
+    util.mkdir(parents=True)
+    if requirements:
+        (util / "requirements.txt").write_text(requirements)
+    if deps is not None:
+        (util / "utility_contract.json").write_text(json.dumps({"deps": deps}))
+    return util
+
+
+def test_contract_requirement_forms():
+    assert contract_requirement({"package": "requests", "version": ">=2"}) == (
+        "requests>=2"
+    )
+    assert contract_requirement({"package": "six", "version": "1.16"}) == "six==1.16"
+    assert contract_requirement({"package": "attrs", "version": "*"}) == "attrs"
+
+
+def test_merge_intersects_specifiers_and_keeps_options(tmp_path):
+    project = tmp_path / "proj"
+    _utility(project, "a", "Requests>=2.0  # http\n# comment\n-r extra.txt\n")
+    _utility(project, "b", "requests<3\npandas[excel]==2.1\n", deps=[])
+    _utility(project, "c", deps=[{"package": "requests", "version": "2.31.0"}])
+    merged = project_requirements(project)
+    assert merged.conflicts == []
+    assert merged.requirements == ["pandas[excel]==2.1", "Requests<3,==2.31.0,>=2.0"]
+    assert merged.passthrough == [f"-r {project / 'a' / 'extra.txt'}"]
+    assert sorted(merged.by_utility) == ["a", "b", "c"]
+
+
+def test_conflicts_are_reported_per_utility():
+    merged = merge_requirements(
+        {
+            "parser": ["numpy==1.26.4", "six"],
+            "engine": ["numpy>=2"],
+            "plots": ["numpy<1.20", "six>=1"],
+        }
+    )
+    assert merged.requirements == ["six>=1"]
+    [conflict] = merged.conflicts
+    assert conflict.package == "numpy"
+    assert dict(conflict.sources) == {
+        "parser": "numpy==1.26.4",
+        "engine": "numpy>=2",
+        "plots": "numpy<1.20",
+    }
+    assert "engine wants numpy>=2" in str(DependencyConflictError(merged.conflicts))
+    assert merge_requirements({"a": ["x>1"], "b": ["x<2"]}).conflicts == []
+
+
+def test_upper_bounds_alone_are_satisfiable():
+    assert merge_requirements({"a": ["numpy<2"]}).conflicts == []
+    assert merge_requirements({"a": ["x<=1.0"]}).conflicts == []
+    merged = merge_requirements({"a": ["x<1.5"], "b": ["x<1.0"]})
+    assert merged.conflicts == []
+    assert merged.requirements == ["x<1.0,<1.5"]
+    assert merge_requirements({"a": ["x<1.0"], "b": ["x>=1.5"]}).conflicts != []
+
+
+def test_prepare_environment_installs_once(monkeypatch, tmp_path):
+    project = tmp_path / "proj"
+    for i in range(3):
+        _utility(project, f"u{i}", f"pkg{i}==1.0\nshared>=1\n")
+    calls = []
+    monkeypatch.setattr(subprocess, "run", lambda args, check: calls.append(args))
+    venv = runner.prepare_environment(project)
+    installs = [c for c in calls if "install" in c]
+    assert len(installs) == 1
+    assert (venv / runner.REQUIREMENTS_FILE).read_text().splitlines() == [
+        "pkg0==1.0",
+        "pkg1==1.0",
+        "pkg2==1.0",
+        "shared>=1",
+    ]
+
+
+def test_prepare_environment_refuses_conflicts(monkeypatch, tmp_path):
+    project = tmp_path / "proj"
+    _utility(project, "a", "six==1.15")
+    _utility(project, "b", deps=[{"package": "six", "version": "1.16"}])
+    calls = []
+    monkeypatch.setattr(subprocess, "run", lambda args, check: calls.append(args))
+    with pytest.raises(DependencyConflictError) as info:
+        runner.prepare_environment(project)
+    assert [c.package for c in info.value.conflicts] == ["six"]
+    assert calls == []
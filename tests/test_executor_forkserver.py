@@ -0,0 +1,149 @@
+import os
+import stat
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import orchestrator_core.executor.forkserver as forkserver
+import orchestrator_core.executor.pool as pool
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.process import (
+    ExecutionCancelled,
+    ExecutionError,
+    ExecutionTimeout,
+    WorkerCrashed,
+)
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+UTILITY = """\
+import os
+import random
+import time
+
+LOADED_IN = os.getpid()
+
+
+def run(x):
+    return {"x": x, "pid": os.getpid(), "loaded_in": LOADED_IN,
+            "draw": random.random()}
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+
+
+def hog():
+    return len(bytearray(1 << 30))
+
+
+def die():
+    os._exit(1)
+"""
+
+
+@pytest.fixture
+def project(make_project):
+    return make_project("forkutil", UTILITY, stamp=True)
+
+
+@pytest.fixture
+def server(project):
+    server = forkserver.ForkServer(
+        project, project / "venv", preload=["forkutil", "no_such_module"]
+    )
+    yield server
+    server.close()
+
+
+def test_jobs_fork_from_the_preloaded_parent(server):
+    assert server.preloaded == ["forkutil"]
+    assert "no_such_module" in server.failed
+    with ThreadPoolExecutor(16) as pool:
+        results = list(
+            pool.map(lambda i: server.call("forkutil", "run", {"x": i}), range(32))
+        )
+    values = [value for value, _, _ in results]
+    assert [v["x"] for v in values] == list(range(32))
+    # Imported once in the parent, one child per job
+    assert {v["loaded_in"] for v in values} == {server.proc.pid}
+    assert len({v["pid"] for v in values}) == 32
+    # Children are reseeded rather than replaying the parent's random state
+    assert len({v["draw"] for v in values}) == 32
+
+
+def test_limits_apply_to_the_job_only(server):
+    with pytest.raises(ExecutionTimeout):
+        server.call("forkutil", "sleep", {"seconds": 30}, timeout=0.3)
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    with pytest.raises(ExecutionCancelled):
+        server.call("forkutil", "sleep", {"seconds": 30}, cancel=cancel)
+    with pytest.raises(WorkerCrashed):
+        server.call("forkutil", "die", {})
+    if sys.platform.startswith("linux"):
+        with pytest.raises(ExecutionError, match="MemoryError"):
+            server.call("forkutil", "hog", {}, memory_limit=512 << 20)
+    # The parent survives all of it
+    assert server.alive
+    assert server.call("forkutil", "run", {"x": 1})[0]["x"] == 1
+
+
+def test_socket_is_private_to_the_user(project, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    (tmp_path / "run").mkdir()
+    server = forkserver.ForkServer(project, project / "venv")
+    try:
+        assert server.socket_path.parent == tmp_path / "run" / "pb-pool"
+        assert stat.S_IMODE(server.socket_path.parent.stat().st_mode) == 0o700
+        assert server.call("forkutil", "run", {"x": 1})[0]["x"] == 1
+        # A socket owned by someone else is never connected to
+        uid = os.getuid()
+        monkeypatch.setattr(pool.os, "getuid", lambda: uid + 1)
+        with pytest.raises(PermissionError):
+            server.call("forkutil", "run", {"x": 2})
+        monkeypatch.setattr(pool.os, "getuid", lambda: uid)
+    finally:
+        server.close()
+
+
+def test_execute_utility_forkserver_mode(monkeypatch, project):
+    monkeypatch.setattr(runner, "prepare_environment", lambda *a, **k: project / "venv")
+    first = runner.execute_utility(
+        project, "forkutil", "run", {"x": 1}, mode="forkserver"
+    )
+    second = runner.execute_utility(
+        project, "forkutil", "run", {"x": 2}, mode="forkserver"
+    )
+    assert first.return_value["loaded_in"] == second.return_value["loaded_in"]
+    assert first.return_value["pid"] != second.return_value["pid"]
+    # Reinstalling the venv restarts the server
+    stamp = project / "venv" / runner.ENV_STAMP
+    os.utime(stamp, ns=(0, stamp.stat().st_mtime_ns + 10**9))
+    third = runner.execute_utility(
+        project, "forkutil", "run", {"x": 3}, mode="forkserver"
+    )
+    assert third.return_value["loaded_in"] != first.return_value["loaded_in"]
+    forkserver.close_forkservers()
+
+
+def test_later_utilities_are_imported_into_the_running_server(monkeypatch, project):
+    other = project / "otherutil"
+    other.mkdir()
+    (other / "__init__.py").write_text(
+        "import os\n\nLOADED_IN = os.getpid()\n\n\ndef where():\n    return LOADED_IN\n"
+    )
+    monkeypatch.setattr(runner, "prepare_environment", lambda *a, **k: project / "venv")
+    first = runner.execute_utility(
+        project, "forkutil", "run", {"x": 1}, mode="forkserver"
+    )
+    second = runner.execute_utility(
+        project, "otherutil", "where", {}, mode="forkserver"
+    )
+    server = forkserver.get_forkserver(project, project / "venv")
+    assert server.preloaded == ["forkutil", "otherutil"]
+    # Shared from the same parent rather than imported by each child
+    assert second.return_value == first.return_value["loaded_in"] == server.proc.pid
+    forkserver.close_forkservers()
@@ -0,0 +1,79 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.pkgstore import (
+    PackageStore,
+    package_key,
+    venv_site_packages,
+)
+
+
+def _item(name, version, sha):
+    return {
+        "metadata": {"name": name, "version": version},
+        "download_info": {
+            "url": f"file:///wheels/{name}-{version}.whl",
+            "archive_info": {"hashes": {"sha256": sha}},
+        },
+    }
+
+
+def _fake_pip(calls, items):
+    def fake_run(args, check):
+        calls.append(args)
+        if "--dry-run" in args:
+            report = Path(args[args.index("--report") + 1])
+            report.write_text(json.dumps({"install": items}))
+        elif "--target" in args:
+            target = Path(args[args.index("--target") + 1])
+            name = args[-1].rsplit("/", 1)[-1].split("-")[0]
+            (target / name).mkdir()
+            (target / name / "__init__.py").write_text(f"NAME = {name!r}\n")
+            (target / "bin").mkdir()
+            (target / "bin" / name).write_text("#!/old/python\nprint('hi')\n")
+        elif "venv" in args:
+            venv_site_packages(Path(args[3])).mkdir(parents=True)
+
+    return fake_run
+
+
+def _project(root, name):
+    util = root / name / "util"
+    util.mkdir(parents=True)
+    (util / "requirements.txt").write_text("six\n")
+    return root / name
+
+
+def test_package_key():
+    assert package_key(_item("Six", "1.17.0", "ab" * 32)) == "six-1.17.0-abababababab"
+
+
+def test_projects_share_stored_packages(monkeypatch, tmp_path):
+    calls = []
+    items = [_item("six", "1.17.0", "a" * 64), _item("idna", "3.0", "b" * 64)]
+    monkeypatch.setattr(subprocess, "run", _fake_pip(calls, items))
+    store = PackageStore(tmp_path / "store")
+    first = runner.prepare_environment(_project(tmp_path, "p1"), package_store=store)
+    assert calls[0][-1] == "--without-pip"
+    installs = len(calls)
+
+    second = runner.prepare_environment(_project(tmp_path, "p2"), package_store=store)
+    # Only the venv is created; resolution and packages come from the store
+    assert len(calls) == installs + 1
+    six_a = venv_site_packages(first) / "six" / "__init__.py"
+    six_b = venv_site_packages(second) / "six" / "__init__.py"
+    assert six_a.stat().st_ino == six_b.stat().st_ino
+    script = second / ("Scripts" if sys.platform == "win32" else "bin") / "six"
+    assert script.read_text().startswith(f"#!{second}")
+    assert store.status()["packages"]["six-1.17.0-aaaaaaaaaaaa"]["refs"] == 2
+
+    assert store.gc()["removed"] == []
+    runner.shutil.rmtree(first)
+    assert store.gc()["removed"] == []
+    runner.shutil.rmtree(second)
+    assert store.gc(dry_run=True)["removed"] == sorted(store.status()["packages"])
+    assert len(store.gc()["removed"]) == 2
+    assert store.status()["packages"] == {}
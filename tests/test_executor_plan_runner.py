@@ -0,0 +1,219 @@
+import json
+
+import pytest
+
+import orchestrator_core.executor.plan_runner as plan_runner
+from orchestrator_core import cli
+from orchestrator_core.executor.plan_runner import plan_changes, run_plan
+
+STEPS = """\
+import asyncio
+import time
+
+
+def load(n, delay=0):
+    time.sleep(delay)
+    return {"n": n, "items": [n, n + 1]}
+
+
+def multiply(x, y, delay=0):
+    time.sleep(delay)
+    print(x * y)
+    return x * y
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+async def fetch(n, delay=0):
+    await asyncio.sleep(delay)
+    print("fetched", n)
+    return n
+"""
+
+
+@pytest.fixture
+def project(make_project):
+    contract = {"name": "steps", "entrypoints": [{"name": "load"}]}
+    return make_project("steps", STEPS, contract=contract, prepare=plan_runner)
+
+
+def _step(step_id, entrypoint=None, **inputs):
+    step = {"step_id": step_id, "action": "steps", "inputs": inputs}
+    if entrypoint:
+        step["entrypoint"] = entrypoint
+    return step
+
+
+def test_independent_steps_overlap_and_outputs_flow_downstream(project):
+    plan = {
+        "plan": [
+            _step(1, n=2, delay=0.5),
+            _step(2, n=3, delay=0.5),
+            _step(3, "multiply", x="$steps.1.n", y="$steps.2.items.1"),
+        ]
+    }
+    report = run_plan(project, plan, workers=2)
+    assert report.ok
+    step = report.steps[3]
+    assert (step.utility, step.entrypoint) == ("steps", "multiply")
+    assert step.return_value == 8 and step.stdout == "8\n"
+    # Steps 1 and 2 ran side by side; 3 started after both
+    assert report.steps[3].started >= max(report.steps[1].started, 0.5)
+    assert report.serial_time > 1.0 and report.saved > 0.3
+    assert report.critical_path[-1] == 3
+    text = report.format()
+    assert "steps.multiply" in text and "saved" in text
+
+
+def test_inprocess_mode_awaits_async_steps_concurrently(project):
+    plan = [_step(sid, "fetch", n=sid, delay=0.5) for sid in range(1, 9)]
+    plan.append(_step(9, "multiply", x="$steps.2", y="$steps.8"))
+    report = run_plan(project, plan, workers=8, mode="inprocess")
+    assert report.ok
+    assert report.steps[9].return_value == 16
+    assert report.steps[3].stdout == "fetched 3\n"
+    # Eight half-second steps overlapped on one event loop
+    assert report.serial_time > 4.0 and report.wall_time < 1.5
+
+
+def test_inprocess_mode_failures_and_timeouts(project):
+    report = run_plan(
+        project,
+        [_step(1, "fail"), _step(2, "fetch", n=1, delay=30)],
+        workers=2,
+        mode="inprocess",
+    )
+    assert report.steps[1].status == "failed"
+    assert report.steps[1].error == "RuntimeError"
+    assert report.steps[2].status == "cancelled"
+    report = run_plan(
+        project, [_step(1, "fetch", n=1, delay=30)], timeout=0.2, mode="inprocess"
+    )
+    assert report.steps[1].error == "ExecutionTimeout"
+    assert "timed out after 0.2s" in report.steps[1].message
+
+
+def test_fail_fast_cancels_running_steps(project):
+    plan = [
+        _step(1, "fail"),
+        _step(2, n=1, delay=30),
+        _step(3, "multiply", x="$steps.1", y=1),
+    ]
+    report = run_plan(project, plan, workers=2)
+    assert not report.ok
+    assert report.steps[1].status == "failed"
+    assert report.steps[1].error == "RuntimeError"
+    assert report.steps[2].status == "cancelled"
+    assert report.steps[3].status == "skipped"
+    assert report.wall_time < 10
+
+
+def test_continue_runs_everything_not_downstream_of_a_failure(project):
+    plan = [
+        _step(1, "fail"),
+        _step(2, n=1, delay=0.2),
+        _step(3, "multiply", x="$steps.1", y=1),
+        _step(4, "multiply", x="$steps.2.n", y=5),
+        _step(5, "multiply", x="$steps.2.missing", y=5),
+    ]
+    report = run_plan(project, plan, workers=2, fail_fast=False)
+    statuses = {sid: step.status for sid, step in report.steps.items()}
+    assert statuses == {
+        1: "failed",
+        2: "succeeded",
+        3: "skipped",
+        4: "succeeded",
+        5: "failed",
+    }
+    assert report.steps[3].message == "upstream step 1 failed"
+    assert report.steps[4].return_value == 5
+    assert "missing" in report.steps[5].message
+
+
+def test_reruns_only_steps_whose_fingerprint_changed(project, prepared, tmp_path):
+    state = tmp_path / "state"
+    plan = [
+        _step(1, n=2),
+        _step(2, n=3),
+        _step(3, "multiply", x="$steps.1.n", y="$steps.2.n"),
+    ]
+
+    def statuses(plan, **kwargs):
+        report = run_plan(project, plan, state_dir=state, **kwargs)
+        assert report.ok
+        return {sid: step.status for sid, step in report.steps.items()}
+
+    assert set(statuses(plan).values()) == {"succeeded"}
+    prepared.clear()
+    assert set(statuses(plan).values()) == {"reused"}
+    # Nothing ran, so the venv was not even prepared
+    assert not prepared
+
+    plan[1]["inputs"]["n"] = 4
+    changes = plan_changes(project, plan, state)
+    assert [(c.rerun, c.reason) for c in changes.values()] == [
+        (False, "up to date"),
+        (True, "inputs changed"),
+        (True, "upstream step 2 reruns"),
+    ]
+    result = statuses(plan)
+    assert result == {1: "reused", 2: "succeeded", 3: "succeeded"}
+
+    # Step 1 reruns but returns the same output, so step 3 is still current
+    plan[0]["inputs"]["delay"] = 0
+    assert statuses(plan) == {1: "succeeded", 2: "reused", 3: "reused"}
+
+    source = project / "steps" / "__init__.py"
+    source.write_text(source.read_text() + "\n# edited\n")
+    assert plan_changes(project, plan, state)[1].reason == "utility changed"
+    assert set(statuses(plan, rerun_all=True).values()) == {"succeeded"}
+    # Outputs no step refers to any more are dropped
+    assert len(list((state / "outputs").glob("*.json"))) == 3
+
+
+def test_outputs_pruned_after_the_prediction_are_recomputed(
+    project, prepared, tmp_path, monkeypatch
+):
+    state = tmp_path / "state"
+    plan = [_step(1, n=2), _step(2, "multiply", x="$steps.1.n", y=3)]
+    assert run_plan(project, plan, state_dir=state).ok
+    predict = plan_runner.PlanState.changes
+
+    def predict_then_prune(self, *args):
+        changes = predict(self, *args)
+        for output in (state / "outputs").glob("*.json"):
+            output.unlink()
+        return changes
+
+    monkeypatch.setattr(plan_runner.PlanState, "changes", predict_then_prune)
+    prepared.clear()
+    report = run_plan(project, plan, state_dir=state)
+    assert report.ok
+    assert [step.status for step in report.steps.values()] == ["succeeded"] * 2
+    assert report.steps[2].return_value == 6
+    assert len(prepared) == 1
+
+
+def test_unknown_utility_is_rejected_before_running(project):
+    plan = [_step(1), {"step_id": 2, "action": "nope", "inputs": {}}]
+    with pytest.raises(ValueError, match="nope"):
+        run_plan(project, plan)
+
+
+def test_cli_run_plan(project, tmp_path, capsys):
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps([_step(1, n=4), _step(2, "fail")]))
+    out = tmp_path / "results.json"
+    argv = ["run-plan", str(project), "--plan", str(plan_file), "--output", str(out)]
+    with pytest.raises(SystemExit) as exc:
+        cli.main(argv + ["--continue-on-error"])
+    assert exc.value.code == 1
+    results = json.loads(out.read_text())
+    assert results["steps"][0]["return_value"] == {"n": 4, "items": [4, 5]}
+    assert "wall" in capsys.readouterr().err
+    cli.main(["run-plan", str(project), "--plan", str(plan_file), "--dry-run"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["1", "reuse", "up", "to", "date"]
+    assert lines[1].split()[:2] == ["2", "run"]
@@ -0,0 +1,192 @@
+import argparse
+import os
+import signal
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import orchestrator_core.cli as cli
+import orchestrator_core.executor.pool as pool_module
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.pool import (
+    WorkerPool,
+    get_pool,
+    pool_socket,
+    running_pool,
+    serve_pool,
+)
+from orchestrator_core.executor.process import ExecutionError, ExecutionTimeout
+
+UTILITY = """\
+import os
+import time
+
+CALLS = 0
+
+
+def count():
+    global CALLS
+    CALLS += 1
+    return {"pid": os.getpid(), "calls": CALLS}
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def boom():
+    raise KeyError("missing")
+"""
+
+
+@pytest.fixture
+def project(make_project):
+    return make_project("poolutil", UTILITY, stamp=True)
+
+
+@pytest.fixture
+def make_pool(project):
+    pools = []
+
+    def make(**options):
+        pool = WorkerPool(project, project / "venv", **options)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_workers_stay_warm(make_pool):
+    pool = make_pool(min_workers=1, max_workers=1)
+    results = [pool.call("poolutil", "count", {})[0] for _ in range(3)]
+    assert len({r["pid"] for r in results}) == 1
+    # Imported once; module state survives between calls
+    assert [r["calls"] for r in results] == [1, 2, 3]
+    assert pool.status()["calls"] == 3
+
+
+def test_pool_grows_to_max_workers(make_pool):
+    pool = make_pool(min_workers=0, max_workers=2)
+    with ThreadPoolExecutor(4) as executor:
+        pids = list(
+            executor.map(
+                lambda _: pool.call("poolutil", "sleep", {"seconds": 0.3})[0], range(4)
+            )
+        )
+    assert len(set(pids)) == 2
+    assert pool.status()["idle"] == 2
+
+
+def test_idle_workers_are_reaped_down_to_min(make_pool):
+    pool = make_pool(min_workers=1, max_workers=3, idle_timeout=0.2)
+    with ThreadPoolExecutor(3) as executor:
+        list(
+            executor.map(
+                lambda _: pool.call("poolutil", "sleep", {"seconds": 0.2}), range(3)
+            )
+        )
+    assert _wait_for(lambda: pool.status()["idle"] == 1)
+
+
+def test_unhealthy_workers_are_replaced(make_pool):
+    pool = make_pool(min_workers=1, max_workers=1, health_interval=0.2)
+    (pid,) = pool.status()["pids"]
+    os.kill(pid, signal.SIGKILL)
+    assert _wait_for(lambda: pool.status()["pids"] not in ([], [pid]))
+    assert pool.call("poolutil", "count", {})[0]["pid"] != pid
+
+
+def test_failed_calls_discard_the_worker(make_pool, project):
+    pool = make_pool(min_workers=1, max_workers=1)
+    first = pool.call("poolutil", "count", {})[0]["pid"]
+    with pytest.raises(ExecutionError, match="KeyError"):
+        pool.call("poolutil", "boom", {})
+    # An exception in the entrypoint keeps the worker
+    assert pool.call("poolutil", "count", {})[0]["pid"] == first
+    with pytest.raises(ExecutionTimeout):
+        pool.call("poolutil", "sleep", {"seconds": 30}, timeout=0.3)
+    after_timeout = pool.call("poolutil", "count", {})[0]["pid"]
+    assert after_timeout != first
+    # Reinstalling the venv retires workers started against the old one
+    stamp = project / "venv" / runner.ENV_STAMP
+    os.utime(stamp, ns=(0, stamp.stat().st_mtime_ns + 10**9))
+    assert pool.call("poolutil", "count", {})[0]["pid"] != after_timeout
+
+
+def test_pool_server_round_trip(project):
+    server = serve_pool(project, project / "venv", min_workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = running_pool(project)
+        assert client is not None
+        value, _, _ = client.call("poolutil", "count", {})
+        assert client.call("poolutil", "count", {})[0]["pid"] == value["pid"]
+        with pytest.raises(ExecutionError) as err:
+            client.call("poolutil", "boom", {})
+        assert "raise KeyError" in err.value.traceback
+        with pytest.raises(ExecutionTimeout):
+            client.call("poolutil", "sleep", {"seconds": 30}, timeout=0.3)
+        assert client.status()["calls"] == 4
+        client.shutdown()
+        thread.join(5)
+    finally:
+        server.server_close()
+    assert not pool_socket(project).exists()
+    assert running_pool(project) is None
+
+
+def test_pool_sockets_are_private_to_the_user(project, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    (tmp_path / "run").mkdir()
+    path = pool_socket(project)
+    assert path.parent == tmp_path / "run" / "pb-pool"
+    assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+    server = serve_pool(project, project / "venv", min_workers=0)
+    try:
+        assert running_pool(project) is not None
+        # A socket owned by someone else is never connected to
+        uid = os.getuid()
+        monkeypatch.setattr(pool_module.os, "getuid", lambda: uid + 1)
+        assert running_pool(project) is None
+        monkeypatch.setattr(pool_module.os, "getuid", lambda: uid)
+        # Neither is one in a directory others can enter
+        path.parent.chmod(0o755)
+        assert running_pool(project) is None
+        with pytest.raises(PermissionError):
+            pool_socket(project)
+    finally:
+        path.parent.chmod(0o700)
+        server.server_close()
+
+
+def test_configured_mode_wins_over_a_running_pool(monkeypatch):
+    args = argparse.Namespace(project=".", mode=None, memory_limit=None, timeout=None)
+    monkeypatch.setattr(pool_module, "running_pool", lambda project: object())
+    monkeypatch.delenv("PB_EXECUTION_MODE", raising=False)
+    assert cli._execution_mode(args) == "pool"
+    monkeypatch.setenv("PB_EXECUTION_MODE", "subprocess")
+    assert cli._execution_mode(args) == "subprocess"
+
+
+def test_execute_utility_pool_mode(monkeypatch, project):
+    monkeypatch.setattr(runner, "prepare_environment", lambda *a, **k: project / "venv")
+    first = runner.execute_utility(project, "poolutil", "count", {}, mode="pool")
+    second = runner.execute_utility(project, "poolutil", "count", {}, mode="pool")
+    assert first.return_value["pid"] == second.return_value["pid"]
+    get_pool(project, project / "venv").close()
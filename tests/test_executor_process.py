@@ -0,0 +1,135 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.process import (
+    ExecutionCancelled,
+    ExecutionError,
+    ExecutionTimeout,
+    WorkerCrashed,
+    run_in_subprocess,
+)
+
+UTILITY = """\
+import os
+import sys
+import time
+
+
+def hello(name):
+    print(f"hello {name}")
+    print("warn", file=sys.stderr)
+    os.write(1, b"stray bytes on fd 1\\n")
+    return {"name": name.upper(), "prefix": sys.prefix}
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def boom():
+    raise KeyError("missing")
+
+
+def hog():
+    return len(bytearray(1 << 30))
+
+
+def die():
+    os._exit(3)
+
+
+def unserializable():
+    return object()
+
+
+async def later(value):
+    import asyncio
+
+    await asyncio.sleep(0.01)
+    print("awaited")
+    return value
+"""
+
+
+@pytest.fixture
+def project(make_project):
+    return make_project("procutil", UTILITY)
+
+
+def _run(project, entrypoint, params=None, **kwargs):
+    return run_in_subprocess(
+        project, project / "venv", "procutil", entrypoint, params or {}, **kwargs
+    )
+
+
+def test_runs_out_of_process(project):
+    path = list(sys.path)
+    value, stdout, stderr = _run(project, "hello", {"name": "bob"})
+    assert value["name"] == "BOB"
+    assert stdout == "hello bob\n"
+    assert stderr == "warn\n"
+    # Nothing leaked into this interpreter
+    assert "procutil" not in sys.modules
+    assert sys.path == path
+
+
+def test_async_entrypoints_are_awaited(project):
+    value, stdout, _ = _run(project, "later", {"value": [1, 2]})
+    assert value == [1, 2]
+    assert stdout == "awaited\n"
+
+
+def test_errors_carry_worker_traceback(project):
+    with pytest.raises(ExecutionError) as err:
+        _run(project, "boom")
+    assert err.value.error == "KeyError"
+    assert "raise KeyError" in err.value.traceback
+    with pytest.raises(ExecutionError, match="Failed to load entrypoint 'nope'"):
+        _run(project, "nope")
+    with pytest.raises(ExecutionError, match="not JSON serializable"):
+        _run(project, "unserializable")
+    with pytest.raises(WorkerCrashed, match="code 3"):
+        _run(project, "die")
+
+
+def test_timeout_and_cancel_kill_the_worker(project):
+    started = time.monotonic()
+    with pytest.raises(ExecutionTimeout):
+        _run(project, "sleep", {"seconds": 30}, timeout=0.5)
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    with pytest.raises(ExecutionCancelled):
+        _run(project, "sleep", {"seconds": 30}, cancel=cancel)
+    assert time.monotonic() - started < 10
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RLIMIT_AS")
+def test_memory_limit(project):
+    with pytest.raises(ExecutionError) as err:
+        _run(project, "hog", memory_limit=512 << 20)
+    assert err.value.error == "MemoryError"
+
+
+def test_concurrent_executions_are_isolated(project):
+    with ThreadPoolExecutor(4) as pool:
+        results = list(
+            pool.map(lambda i: _run(project, "hello", {"name": f"n{i}"}), range(8))
+        )
+    assert [value["name"] for value, _, _ in results] == [f"N{i}" for i in range(8)]
+    assert all(stdout == f"hello n{i}\n" for i, (_, stdout, _) in enumerate(results))
+
+
+def test_execute_utility_subprocess_mode(monkeypatch, project):
+    monkeypatch.setattr(runner, "prepare_environment", lambda *a, **k: project / "venv")
+    result = runner.execute_utility(
+        project, "procutil", "hello", {"name": "amy"}, mode="subprocess", timeout=30
+    )
+    assert result.return_value["name"] == "AMY"
+    with pytest.raises(ValueError):
+        runner.execute_utility(project, "procutil", "hello", {}, timeout=1)
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+
+import pytest
+
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.capture import OutputCapture
+from orchestrator_core.executor.result_cache import ResultCache
+
+UTILITY = """\
+def run(a, b):
+    with open("calls.log", "a") as f:
+        f.write("x")
+    print("adding")
+    return {"sum": a + b}
+"""
+
+
+@pytest.fixture
+def project(make_project, monkeypatch):
+    monkeypatch.delenv("PB_RESULT_CACHE", raising=False)
+    contract = {"name": "memo", "version": "1.0.0", "cache_safe": True}
+    return make_project("memo", UTILITY, contract=contract, prepare=runner)
+
+
+def _run(project, cache, params, **kwargs):
+    return runner.execute_utility(
+        project, "memo", "run", params, mode="subprocess", result_cache=cache, **kwargs
+    )
+
+
+def _calls(project):
+    return len((project / "calls.log").read_text())
+
+
+def test_hits_skip_environment_and_execution(project, prepared, tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    first = _run(project, cache, {"a": 1, "b": 2})
+    # Key order does not matter
+    second = _run(project, cache, {"b": 2, "a": 1})
+    assert first == second
+    assert second.return_value == {"sum": 3} and second.stdout == "adding\n"
+    assert len(prepared) == 1 and _calls(project) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    _run(project, cache, {"a": 1, "b": 3})
+    _run(project, cache, {"a": 1, "b": 2}, use_cache=False)
+    assert _calls(project) == 3
+
+
+def test_source_and_version_changes_miss(project, tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    _run(project, cache, {"a": 1, "b": 2})
+    source = project / "memo" / "__init__.py"
+    source.write_text(source.read_text().replace("a + b", "a + b + 100"))
+    assert _run(project, cache, {"a": 1, "b": 2}).return_value == {"sum": 103}
+    contract_file = project / "memo" / "utility_contract.json"
+    contract = json.loads(contract_file.read_text())
+    contract_file.write_text(json.dumps(dict(contract, version="1.0.1")))
+    _run(project, cache, {"a": 1, "b": 2})
+    assert _calls(project) == 3
+    # Utilities that do not declare themselves cache-safe are never cached
+    contract_file.write_text(json.dumps(dict(contract, cache_safe=False)))
+    _run(project, cache, {"a": 1, "b": 2})
+    _run(project, cache, {"a": 1, "b": 2})
+    assert _calls(project) == 5
+
+
+def test_truncated_output_is_not_cached(project, tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    result = _run(project, cache, {"a": 1, "b": 2}, capture=OutputCapture(limit=3))
+    assert "characters dropped" in result.stdout
+    assert _run(project, cache, {"a": 1, "b": 2}).stdout == "adding\n"
+    assert _calls(project) == 2
+    assert _run(project, cache, {"a": 1, "b": 2}).stdout == "adding\n"
+    assert _calls(project) == 2
+
+
+def test_default_cache_from_environment(project, tmp_path, monkeypatch):
+    monkeypatch.setenv("PB_RESULT_CACHE", str(tmp_path / "envcache"))
+    _run(project, None, {"a": 1, "b": 2})
+    _run(project, None, {"a": 1, "b": 2})
+    assert _calls(project) == 1
+    assert list((tmp_path / "envcache").glob("*/*.json"))
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    cache = ResultCache(tmp_path / "cache", ttl=60)
+    cache.put("aa01", 1)
+    assert cache.get("aa01")["return"] == 1
+    entry = tmp_path / "cache" / "aa" / "aa01.json"
+    data = json.loads(entry.read_text())
+    entry.write_text(json.dumps(dict(data, created=time.time() - 120)))
+    assert cache.get("aa01") is None and not entry.exists()
+
+    cache = ResultCache(tmp_path / "lru", max_bytes=2000)
+    for i in range(5):
+        cache.put(f"k{i:03d}", "x" * 300)
+        path = tmp_path / "lru" / "k0" / f"k{i:03d}.json"
+        os.utime(path, (i, i))
+    # Reading refreshes an entry's recency
+    assert cache.get("k000") is not None
+    for i in range(5, 7):
+        cache.put(f"k{i:03d}", "x" * 300)
+    status = cache.status()
+    assert status["bytes"] <= 2000
+    assert cache.get("k000") is not None
+    assert cache.get("k001") is None
+    assert not cache.put("bad", object())
@@ -0,0 +1,123 @@
+import errno
+import os
+import sys
+from pathlib import Path
+
+import orchestrator_core.executor.runner as runner
+import orchestrator_core.executor.venv_template as venv_template
+from orchestrator_core.executor.venv_template import (
+    VenvTemplates,
+    common_catalog_requirements,
+)
+
+
+def _fake_venv(calls):
+    def fake_run(args, check):
+        calls.append(args)
+        if "venv" in args:
+            venv = Path(args[-1])
+            (venv / "bin").mkdir(parents=True)
+            (venv / "pyvenv.cfg").write_text(f"command = python -m venv {venv}\n")
+            (venv / "bin" / "activate").write_text(f'VIRTUAL_ENV="{venv}"\n')
+            (venv / "bin" / "pip").write_text(f"#!{venv}/bin/python\nimport pip\n")
+            (venv / "bin" / "python").symlink_to(sys.executable)
+            site = venv / "lib" / "site-packages"
+            (site / "__pycache__").mkdir(parents=True)
+            (site / "mod.py").write_text("X = 1\n")
+            (site / "__pycache__" / "mod.pyc").write_bytes(b"\0")
+
+    return fake_run
+
+
+def test_clone_relocates_and_shares_files(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(venv_template.subprocess, "run", _fake_venv(calls))
+    templates = VenvTemplates(tmp_path / "templates")
+    template = templates.ensure()
+    assert template.name == venv_template.interpreter_id()
+    prefix = templates.manifest()["prefix"]
+
+    venv = tmp_path / "project" / "venv"
+    method = templates.clone(venv)
+    assert method in ("reflink", "hardlink", "copy")
+    assert (venv / "pyvenv.cfg").read_text() == f"command = python -m venv {venv}\n"
+    assert (venv / "bin" / "pip").read_text().startswith(f"#!{venv}/bin/python\n")
+    assert prefix not in (venv / "bin" / "activate").read_text()
+    assert os.readlink(venv / "bin" / "python") == sys.executable
+    assert os.access(venv / "bin" / "pip", os.X_OK) == os.access(
+        template / "bin" / "pip", os.X_OK
+    )
+    module = venv / "lib" / "site-packages" / "mod.py"
+    assert module.read_text() == "X = 1\n"
+    if method == "hardlink":
+        assert (
+            module.stat().st_ino
+            == (template / "lib/site-packages/mod.py").stat().st_ino
+        )
+    assert not (venv / "lib" / "site-packages" / "__pycache__").exists()
+    assert not (venv / venv_template.TEMPLATE_MANIFEST).exists()
+
+    # A second project reuses the template without running venv again
+    templates.clone(tmp_path / "other" / "venv")
+    assert len(calls) == 1
+
+
+def test_clone_falls_back_when_the_cached_method_fails(monkeypatch, tmp_path):
+    monkeypatch.setattr(venv_template.subprocess, "run", _fake_venv([]))
+    templates = VenvTemplates(tmp_path / "templates")
+    templates.ensure()
+    templates._method = "hardlink"
+
+    def cross_device(source, out):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(venv_template.os, "link", cross_device)
+    venv = tmp_path / "project" / "venv"
+    assert templates.clone(venv) == "copy"
+    assert (venv / "lib" / "site-packages" / "mod.py").read_text() == "X = 1\n"
+
+
+def test_ensure_seeds_and_rebuilds(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(venv_template.subprocess, "run", _fake_venv(calls))
+    templates = VenvTemplates(tmp_path)
+    templates.ensure(seed=["six>=1.16"])
+    assert calls[1][1:3] == ["install", "-r"]
+    assert templates.manifest()["seed"] == ["six>=1.16"]
+    templates.ensure(rebuild=True)
+    assert templates.manifest()["seed"] == []
+    assert [p.name for p in tmp_path.iterdir()] == [venv_template.interpreter_id()]
+    status = templates.status()
+    assert list(status["templates"]) == [venv_template.interpreter_id()]
+
+
+def test_common_catalog_requirements():
+    per_utility = {
+        "a": ["pandas>=2", "six"],
+        "b": ["pandas<3", "requests"],
+        "c": ["requests==2.31.0", "numpy"],
+        "d": ["Six==1.0"],
+        "e": ["six==2.0"],
+    }
+    # pandas and requests are shared and compatible; six clashes; numpy is unique
+    assert common_catalog_requirements(per_utility) == [
+        "pandas<3,>=2",
+        "requests==2.31.0",
+    ]
+    assert common_catalog_requirements(per_utility, min_utilities=3) == []
+
+
+def test_prepare_environment_clones_template(monkeypatch, tmp_path):
+    project = tmp_path / "project"
+    util = project / "util"
+    util.mkdir(parents=True)
+    (util / "requirements.txt").write_text("six\n")
+    monkeypatch.setenv("PB_VENV_TEMPLATES", str(tmp_path / "templates"))
+    calls = []
+    monkeypatch.setattr(runner.subprocess, "run", _fake_venv(calls))
+    runner.prepare_environment(project)
+    venv = project / "venv"
+    assert str(venv) in (venv / "pyvenv.cfg").read_text()
+    # venv ran once, for the template; then pip installed into the clone
+    assert [args[1] for args in calls] == ["-m", "install"]
+    assert calls[1][0] == str(venv / "bin" / "pip")
@@ -0,0 +1,63 @@
+import json
+import subprocess
+from pathlib import Path
+
+import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.wheelhouse import (
+    build_wheelhouse,
+    catalog_requirements,
+    project_utility_requirements,
+)
+
+
+def _fake_pip(calls):
+    def fake_run(args, check):
+        calls.append(args)
+        if "wheel" in args:
+            dest = Path(args[args.index("--wheel-dir") + 1])
+            reqs = Path(args[args.index("-r") + 1]).read_text().split()
+            for req in reqs:
+                (dest / f"{req.replace('=', '_')}-py3-none-any.whl").touch()
+
+    return fake_run
+
+
+def test_build_wheelhouse_from_catalog_and_projects(monkeypatch, tmp_path):
+    specs = {
+        "a": {"deps": [{"package": "six", "version": "1.16.0"}]},
+        "b": {"deps": [{"package": "six", "version": "1.17.0"}]},
+        "c": {"deps": []},
+    }
+    project = tmp_path / "proj"
+    (project / "util").mkdir(parents=True)
+    (project / "util" / "requirements.txt").write_text("idna\n")
+    per_utility = catalog_requirements(specs)
+    per_utility.update(project_utility_requirements([project]))
+    assert per_utility == {
+        "a": ["six==1.16.0"],
+        "b": ["six==1.17.0"],
+        "proj/util": ["idna"],
+    }
+
+    calls = []
+    monkeypatch.setattr(subprocess, "run", _fake_pip(calls))
+    dest = tmp_path / "wheels"
+    manifest = build_wheelhouse(dest, per_utility)
+    # One run for the agreeing set, one per conflicting version
+    assert len(calls) == 3
+    assert all("--find-links" in c for c in calls)
+    assert manifest["requirements"] == ["idna", "six==1.16.0", "six==1.17.0"]
+    assert len(manifest["wheels"]) == 3
+    assert json.loads((dest / "wheelhouse.json").read_text()) == manifest
+
+
+def test_install_from_wheelhouse_uses_no_index(monkeypatch, tmp_path):
+    project = tmp_path / "proj"
+    (project / "util").mkdir(parents=True)
+    (project / "util" / "requirements.txt").write_text("six\n")
+    calls = []
+    monkeypatch.setattr(subprocess, "run", lambda args, check: calls.append(args))
+    monkeypatch.setenv("PB_WHEELHOUSE", str(tmp_path / "wheels"))
+    runner.prepare_environment(project)
+    install = calls[-1]
+    assert install[-3:] == ["--no-index", "--find-links", str(tmp_path / "wheels")]
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+import orchestrator_core.planner.batch as batch
+import orchestrator_core.planner.parser as parser
+from orchestrator_core import cli
+from orchestrator_core.api.main import app
+from orchestrator_core.planner.batch import plan_batch
+
+
+class DummyAsyncResponses:
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = []
+
+    async def create(self, model, instructions, input):
+        self.calls.append(instructions)
+        await asyncio.sleep(self.delays.get(input, 0))
+        if input == "boom":
+            raise Exception("api error")
+        step = {"step_id": 1, "action": input, "inputs": {}, "description": ""}
+
+        class Resp:
+            output_text = json.dumps([step])
+
+        return Resp()
+
+
+class DummyAsyncClient:
+    def __init__(self, responses):
+        self.responses = responses
+
+    async def close(self):
+        pass
+
+
+def _collect(prompts, **kwargs):
+    async def _run():
+        return [r async for r in plan_batch(prompts, **kwargs)]
+
+    return asyncio.run(_run())
+
+
+def _patch(monkeypatch, delays=None):
+    responses = DummyAsyncResponses(delays or {})
+    monkeypatch.setattr(
+        openai, "AsyncOpenAI", lambda **kwargs: DummyAsyncClient(responses)
+    )
+    loads = []
+    monkeypatch.setattr(parser, "load_catalog", lambda: loads.append(1) or {})
+    monkeypatch.setattr(parser, "prompt_to_capabilities", lambda prompt: ["kw"])
+    return responses, loads
+
+
+def test_plan_batch_completion_order(monkeypatch):
+    responses, loads = _patch(monkeypatch, {"slow": 0.2, "fast": 0.0})
+    results = _collect(["slow", "fast"], concurrency=2)
+    assert [r["index"] for r in results] == [1, 0]
+    assert results[0]["plan"][0]["action"] == "fast"
+    assert all(r["error"] is None for r in results)
+    # Catalog and instructions are built once and shared by every call
+    assert len(loads) == 1
+    assert len(set(responses.calls)) == 1
+
+
+def test_plan_batch_timeout_and_error_fall_back(monkeypatch):
+    _patch(monkeypatch, {"hang": 5})
+    results = {r["index"]: r for r in _collect(["hang", "boom"], timeout=0.1)}
+    assert "timed out" in results[0]["error"]
+    assert results[1]["error"] == "api error"
+    for r in results.values():
+        assert r["plan"] == [
+            {"step_id": 1, "action": "kw", "inputs": {}, "description": ""}
+        ]
+
+
+def test_plan_batch_endpoint_streams_json_lines(monkeypatch):
+    _patch(monkeypatch)
+    monkeypatch.setattr("orchestrator_core.api.main.record_plan", lambda *a, **k: None)
+    client = TestClient(app)
+    response = client.post("/plan:batch", json={"prompts": ["a", "b"]})
+    assert response.status_code == 200
+    *lines, usage = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r["index"] for r in lines) == [0, 1]
+    # The calls finish after the headers are sent; their usage ends the stream
+    assert usage["llm_usage"]["calls"] == 2
+
+    response = client.post("/plan:batch", json={"prompts": []})
+    assert response.status_code == 400
+
+
+def test_cli_batch_uses_planner_defaults_and_rejects_a_prompt(monkeypatch, tmp_path):
+    seen = {}
+
+    async def fake_plan_batch(prompts, concurrency, timeout, **kwargs):
+        seen.update(concurrency=concurrency, timeout=timeout)
+        return
+        yield
+
+    monkeypatch.setattr(batch, "plan_batch", fake_plan_batch)
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text('"a"\n')
+    cli.main(["plan", "--batch", str(prompts)])
+    assert seen == {
+        "concurrency": batch.DEFAULT_CONCURRENCY,
+        "timeout": batch.DEFAULT_TIMEOUT,
+    }
+    with pytest.raises(SystemExit, match="not both"):
+        cli.main(["plan", "--batch", str(prompts), "extra", "words"])
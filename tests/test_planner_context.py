@@ -0,0 +1,65 @@
+import json
+
+import orchestrator_core.planner.parser as parser
+from orchestrator_core.planner.context import catalog_context, encode_catalog
+
+ADDRESS = {
+    "type": "object",
+    "properties": {"street": {"type": "string"}, "city": {"type": "string"}},
+    "required": ["street", "city"],
+}
+
+
+def _spec(name, version="1.0.0"):
+    return {
+        "name": name,
+        "version": version,
+        "language": "python",
+        "description": f"The {name}  utility",
+        "size_budget": 200000,
+        "tests": ["tests/test_x.py"],
+        "_source_repository_url_discovered": "https://github.com/x/y",
+        "entrypoints": [
+            {
+                "name": "run",
+                "description": "Run it",
+                "parameters_schema": {
+                    "type": "object",
+                    "properties": {
+                        "home": ADDRESS,
+                        "tags": {"type": "array", "items": {"type": "string"}},
+                        "mode": {"enum": ["fast", "slow"]},
+                    },
+                    "required": ["home"],
+                },
+                "return_schema": {"type": "array", "items": ADDRESS},
+            }
+        ],
+    }
+
+
+def test_encode_catalog_signatures_and_shared_schemas():
+    text = encode_catalog([_spec("geo"), _spec("atlas", "0.2.0")])
+    assert text.splitlines() == [
+        "atlas@0.2.0: The atlas utility",
+        '  run(home: #S1, mode?: "fast"|"slow", tags?: list[str]) -> list[#S1]: Run it',
+        "geo@1.0.0: The geo utility",
+        '  run(home: #S1, mode?: "fast"|"slow", tags?: list[str]) -> list[#S1]: Run it',
+        "#S1 = {city: str, street: str}",
+    ]
+    for private in ("_source_repository_url_discovered", "github.com", "200000"):
+        assert private not in text
+
+
+def test_encode_catalog_is_order_independent_and_smaller():
+    specs = [_spec(f"u{i}") for i in range(10)]
+    assert encode_catalog(specs) == encode_catalog(list(reversed(specs)))
+    assert len(encode_catalog(specs)) < len(json.dumps({"utilities": specs})) / 3
+
+
+def test_planner_instructions_use_compact_context(monkeypatch):
+    specs = [_spec("geo")]
+    instructions = parser._build_instructions(specs)
+    assert instructions.endswith(catalog_context(specs))
+    monkeypatch.setenv("PLANNER_CONTEXT_FORMAT", "json")
+    assert parser._build_instructions(specs).endswith(json.dumps({"utilities": specs}))
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from orchestrator_core.planner.dag import (
+    PlanCycleError,
+    PlanGraph,
+    resolve_step_references,
+)
+
+
+def _step(step_id, **extra):
+    step = {"step_id": step_id, "action": f"a{step_id}", "inputs": {}}
+    step["description"] = ""
+    step.update(extra)
+    return step
+
+
+def test_levels_from_declared_and_inferred_dependencies():
+    plan = [
+        _step(1),
+        _step(2),
+        _step(3, depends_on=[1]),
+        _step(4, inputs={"rows": "$steps.3.rows", "extra": ["$steps.2"]}),
+    ]
+    graph = PlanGraph.from_plan(plan)
+    assert graph.dependencies[4] == {2, 3}
+    assert graph.topological_levels() == [[1, 2], [3], [4]]
+    assert graph.descendants([1]) == {3, 4}
+    assert graph.ancestors(4) == {1, 2, 3}
+
+
+def test_critical_path_uses_durations():
+    plan = [_step(1), _step(2), _step(3, depends_on=[1, 2])]
+    graph = PlanGraph.from_plan(plan)
+    assert graph.critical_path() == ([1, 3], 2.0)
+    assert graph.critical_path({1: 1.0, 2: 5.0, 3: 0.5}) == ([2, 3], 5.5)
+
+
+def test_cycles_and_unknown_steps_are_rejected():
+    with pytest.raises(PlanCycleError) as exc:
+        PlanGraph.from_plan(
+            [_step(1, depends_on=[2]), _step(2, inputs={"x": "$steps.1"})]
+        )
+    assert exc.value.step_ids == [1, 2]
+    with pytest.raises(ValueError):
+        PlanGraph.from_plan([_step(1, depends_on=[9])])
+
+
+def test_serialization_is_backward_compatible():
+    legacy = [
+        {"step_id": 1, "action": "foo", "inputs": {"a": 1}, "description": "d"},
+        {"step_id": 2, "action": "bar", "inputs": {}, "description": "e"},
+    ]
+    assert PlanGraph.from_plan(legacy).to_plan() == legacy
+
+    rich = {"plan": [_step(1), _step(2, depends_on=[1])], "used_capabilities": []}
+    out = PlanGraph.from_plan(json.loads(json.dumps(rich))).to_plan()
+    assert out == rich
+
+
+def test_resolve_step_references():
+    outputs = {1: {"rows": [{"id": 7}]}, 2: "text"}
+    inputs = {"first": "$steps.1.rows.0.id", "all": ["$steps.2", "$steps.1"], "n": 1}
+    assert resolve_step_references(inputs, outputs) == {
+        "first": 7,
+        "all": ["text", {"rows": [{"id": 7}]}],
+        "n": 1,
+    }
+    with pytest.raises(ValueError):
+        resolve_step_references({"x": "$steps.1.cols"}, outputs)
+    with pytest.raises(ValueError):
+        resolve_step_references({"x": "$steps.3"}, outputs)
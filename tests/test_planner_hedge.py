@@ -0,0 +1,71 @@
+import threading
+import time
+
+import orchestrator_core.planner.hedge as hedge
+import orchestrator_core.planner.parser as parser
+from orchestrator_core.planner.hedge import hedged_prompt_to_plan
+
+LLM_PLAN = [{"step_id": 1, "action": "llm", "inputs": {}, "description": ""}]
+LOCAL_PLAN = [{"step_id": 1, "action": "local", "inputs": {}, "description": ""}]
+
+
+def _patch(monkeypatch, delay=0.0, error=None, local=LOCAL_PLAN):
+    def fake_llm(prompt, timeout=None, specs=None):
+        time.sleep(delay)
+        if error:
+            raise Exception(error)
+        return LLM_PLAN
+
+    monkeypatch.setattr(parser, "_llm_prompt_to_plan", fake_llm)
+    monkeypatch.setattr(parser, "_keyword_plan", lambda prompt: local)
+
+
+def test_llm_wins_within_budget(monkeypatch):
+    _patch(monkeypatch, delay=0.01)
+    result = hedged_prompt_to_plan("parse pdf", latency_budget=2.0)
+    assert result["plan"] == LLM_PLAN
+    info = result["planner"]
+    assert info["winner"] == "llm"
+    assert info["llm_ms"] is not None and info["local_ms"] is not None
+    assert info["llm_error"] is None
+
+
+def test_local_wins_when_llm_exceeds_budget(monkeypatch):
+    _patch(monkeypatch, delay=1.0)
+    started = time.perf_counter()
+    result = hedged_prompt_to_plan("parse pdf", latency_budget=0.05)
+    assert time.perf_counter() - started < 0.5
+    assert result["plan"] == LOCAL_PLAN
+    assert result["planner"]["winner"] == "local"
+    assert result["planner"]["llm_ms"] is None
+    assert "budget" in result["planner"]["llm_error"]
+
+
+def test_local_wins_immediately_on_llm_error(monkeypatch):
+    _patch(monkeypatch, error="api error")
+    result = hedged_prompt_to_plan("parse pdf", latency_budget=5.0)
+    assert result["plan"] == LOCAL_PLAN
+    assert result["planner"]["winner"] == "local"
+    assert result["planner"]["llm_error"] == "api error"
+
+
+def test_empty_local_plan_waits_for_llm(monkeypatch):
+    _patch(monkeypatch, delay=0.2, local=[])
+    result = hedged_prompt_to_plan("parse pdf", latency_budget=0.01)
+    assert result["plan"] == LLM_PLAN
+    assert result["planner"]["winner"] == "llm"
+    assert result["planner"]["llm_error"] is None
+
+
+def test_busy_workers_skip_the_race(monkeypatch):
+    _patch(monkeypatch)
+    monkeypatch.setattr(hedge, "_SLOTS", threading.BoundedSemaphore(1))
+    hedge._SLOTS.acquire()
+    result = hedged_prompt_to_plan("parse pdf", latency_budget=5.0)
+    assert result["plan"] == LOCAL_PLAN
+    assert "busy" in result["planner"]["llm_error"]
+    # Without a local plan the LLM is asked on the calling thread instead
+    _patch(monkeypatch, local=[])
+    result = hedged_prompt_to_plan("parse pdf", latency_budget=5.0)
+    assert result["plan"] == LLM_PLAN
+    assert result["planner"]["winner"] == "llm"
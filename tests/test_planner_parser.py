@@ -31,7 +31,7 @@ def test_prompt_to_plan_happy(monkeypatch):
     ]
     content = json.dumps(plan_data)
     # Patch OpenAI client to return our DummyClient
-    monkeypatch.setattr(openai, "OpenAI", lambda api_key=None: DummyClient(content))
+    monkeypatch.setattr(openai, "OpenAI", lambda **kwargs: DummyClient(content))
 
     plan = parser.prompt_to_plan("do foo")
     assert plan == plan_data
@@ -40,9 +40,7 @@ def test_prompt_to_plan_happy(monkeypatch):
 def test_prompt_to_plan_invalid_json(monkeypatch):
     # Simulate OpenAI returning invalid JSON
     # Simulate invalid JSON from LLM
-    monkeypatch.setattr(
-        openai, "OpenAI", lambda api_key=None: DummyClient("not a json")
-    )
+    monkeypatch.setattr(openai, "OpenAI", lambda **kwargs: DummyClient("not a json"))
     # Monkey-patch fallback capabilities
     monkeypatch.setattr(parser, "prompt_to_capabilities", lambda prompt: ["cap1"])
 
@@ -55,7 +53,7 @@ def test_prompt_to_plan_api_error(monkeypatch):
     # Simulate API error
     # Simulate API error
     monkeypatch.setattr(
-        openai, "OpenAI", lambda api_key=None: DummyClient("irrelevant", error=True)
+        openai, "OpenAI", lambda **kwargs: DummyClient("irrelevant", error=True)
     )
     monkeypatch.setattr(parser, "prompt_to_capabilities", lambda prompt: ["A", "B"])
 
@@ -71,7 +69,7 @@ def test_prompt_to_plan_object_response(monkeypatch):
     # Simulate LLM returning a JSON object (rich response)
     data_obj = {"used_capabilities": [], "plan_details": "some explanation"}
     content = json.dumps(data_obj)
-    monkeypatch.setattr(openai, "OpenAI", lambda api_key=None: DummyClient(content))
+    monkeypatch.setattr(openai, "OpenAI", lambda **kwargs: DummyClient(content))
     plan = parser.prompt_to_plan("some prompt")
     # Should return the dict as-is
     assert isinstance(plan, dict)
@@ -0,0 +1,84 @@
+import numpy as np
+
+import orchestrator_core.catalog.index as index
+import orchestrator_core.planner.parser as parser
+import orchestrator_core.planner.ranker as ranker
+from orchestrator_core.planner.ranker import CapabilityRanker, tokenize
+
+SPECS = {
+    "FinancialDocumentParser": {
+        "name": "FinancialDocumentParser",
+        "description": "Extracts transactions from bank statements in PDF format",
+        "entrypoints": [{"name": "parse_document", "description": "Parse one file"}],
+    },
+    "chart_renderer": {
+        "name": "chart_renderer",
+        "description": "Render charts and plots for dashboards",
+        "entrypoints": [],
+    },
+}
+KEYWORDS = {"portfolio": ["portfolio_analyzer"], "file upload": ["document_upload"]}
+
+
+def test_tokenize_splits_case_and_separators():
+    assert tokenize("FinancialDocumentParser") == ["financial", "document", "parser"]
+    assert tokenize("upload my PDF statements") == ["upload", "pdf", "statement"]
+
+
+def test_rank_orders_by_relevance_with_confidence():
+    r = CapabilityRanker.from_catalog(SPECS, KEYWORDS)
+    ranked = r.rank("parse my pdf bank statements")
+    assert ranked[0][0] == "FinancialDocumentParser"
+    assert all(0.0 < conf <= 1.0 for _, _, conf in ranked)
+    assert r.rank("zzz unknown words") == []
+
+
+def test_batched_scores_match_single_prompt_scores():
+    r = CapabilityRanker.from_catalog(SPECS, KEYWORDS)
+    prompts = ["render a dashboard chart", "portfolio review", "upload pdf"]
+    scores, confidence = r.score_many(prompts)
+    assert scores.shape == (3, len(r.capabilities))
+    for row, prompt in enumerate(prompts):
+        single, _ = r.score_many([prompt])
+        assert np.allclose(scores[row], single[0])
+    assert (confidence >= 0).all() and (confidence <= 1).all()
+
+
+def test_local_mode_and_keyword_fallback_use_ranker(monkeypatch):
+    monkeypatch.setattr(
+        ranker,
+        "get_ranker",
+        lambda specs=None: CapabilityRanker.from_catalog(SPECS, KEYWORDS),
+    )
+    plan = parser.prompt_to_plan("chart for my dashboard", mode="local")
+    assert plan[0]["action"] == "chart_renderer"
+    assert plan[0]["step_id"] == 1
+    assert "confidence" in plan[0]
+
+    monkeypatch.setattr(parser, "prompt_to_capabilities", lambda prompt: [])
+    assert parser._keyword_plan("pdf bank statements")[0]["action"] == (
+        "FinancialDocumentParser"
+    )
+
+
+def test_get_ranker_reuses_the_cached_ranker(monkeypatch):
+    loads, hashes = [], []
+    monkeypatch.setattr(ranker, "_KEYWORD_MAPPING", None)
+    monkeypatch.setattr(ranker, "_LATEST", None)
+    monkeypatch.setattr(
+        parser, "_load_keyword_mapping", lambda: loads.append(1) or dict(KEYWORDS)
+    )
+    fingerprint = index.catalog_fingerprint
+    monkeypatch.setattr(
+        index,
+        "catalog_fingerprint",
+        lambda specs: hashes.append(1) or fingerprint(specs),
+    )
+    first = ranker.get_ranker(SPECS)
+    assert ranker.get_ranker(SPECS) is first
+    assert hashes == [1]
+    # An equal catalog loaded again keeps the ranker too
+    assert ranker.get_ranker(dict(SPECS)) is first
+    changed = dict(SPECS, extra={"name": "extra", "version": "1"})
+    assert ranker.get_ranker(changed) is not first
+    assert loads == [1]
@@ -0,0 +1,132 @@
+import orchestrator_core.planner.parser as parser
+from orchestrator_core.catalog.index import (
+    catalog_fingerprint,
+    catalog_versions,
+    diff_catalogs,
+)
+from orchestrator_core.planner.replan import replan, replan_stored
+from orchestrator_core.planner.store import PlanStore
+
+OLD = {"a": {"version": "1.0.0"}, "b": {"version": "1.0.0"}}
+NEW = {"a": {"version": "1.1.0"}, "c": {"version": "0.1.0"}}
+
+
+def _steps(*actions):
+    return [
+        {"step_id": i, "action": a, "inputs": {}, "description": ""}
+        for i, a in enumerate(actions, start=1)
+    ]
+
+
+def test_diff_catalogs():
+    diff = diff_catalogs(catalog_versions(OLD), catalog_versions(NEW))
+    assert diff.added == {"c": "0.1.0"}
+    assert diff.removed == {"b": "1.0.0"}
+    assert diff.changed == {"a": ("1.0.0", "1.1.0")}
+    assert diff.names == ["a", "b", "c"]
+    assert not diff_catalogs({"a": "1"}, {"a": "1"})
+
+
+def test_replan_classified_plan_without_llm(monkeypatch):
+    monkeypatch.setattr(parser, "_llm_prompt_to_plan", lambda p, **k: 1 / 0)
+    diff = diff_catalogs(catalog_versions(OLD), catalog_versions(NEW))
+    plan = {"prompt": "p", "resolved": ["a", "b"], "missing": ["c", "d"]}
+    result = replan(plan, diff, prompt="p")
+    assert result.plan == {"prompt": "p", "resolved": ["a", "c"], "missing": ["d", "b"]}
+    assert result.resolved == ["c"] and result.unresolved == ["b"]
+    assert result.bumped == {"a": ["1.0.0", "1.1.0"]}
+    assert result.changed and not result.llm
+
+
+def test_replan_steps_bumps_and_replans_structural_changes(monkeypatch):
+    diff = diff_catalogs(catalog_versions(OLD), catalog_versions(NEW))
+    steps = _steps("a")
+    steps[0]["version"] = "1.0.0"
+    result = replan(steps, diff, prompt="p", specs=NEW)
+    assert result.plan[0]["version"] == "1.1.0" and not result.llm
+
+    prompts = []
+    monkeypatch.setattr(
+        parser, "_llm_prompt_to_plan", lambda p, **k: prompts.append(p) or _steps("c")
+    )
+    result = replan(_steps("a", "b"), diff, prompt="p", use_llm=False, specs=NEW)
+    assert result.plan == _steps("a", "b") and "LLM" in result.error
+    assert prompts == []
+    result = replan(_steps("a", "b"), diff, prompt="p", specs=NEW)
+    assert result.plan == _steps("c") and result.llm and result.structural == ["b"]
+    assert prompts == ["p"]
+
+
+def test_replan_stored_touches_only_affected_plans(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, "_llm_prompt_to_plan", lambda p, **k: _steps("c"))
+    store = PlanStore(tmp_path / "plans.db")
+    old_fp = catalog_fingerprint(OLD)
+    versions = catalog_versions(OLD)
+    waiting = store.record(
+        "needs c", {"resolved": [], "missing": ["c"]}, old_fp, "cli", versions
+    )
+    broken = store.record("uses b", _steps("b"), old_fp, "cli", versions)
+    untouched = store.record("uses x", _steps("x"), old_fp, "cli", versions)
+    no_snapshot = store.record("needs c", {"missing": ["c"]}, "unknown", "cli")
+
+    reports = {r["plan_id"]: r for r in replan_stored(store, specs=NEW)}
+    assert set(reports) == {waiting, broken}
+    assert untouched not in reports and no_snapshot not in reports
+    assert reports[waiting]["resolved"] == ["c"] and not reports[waiting]["llm"]
+    assert reports[broken]["llm"]
+    new_item = store.get(reports[waiting]["new_plan_id"])
+    assert new_item["plan"]["resolved"] == ["c"]
+    assert new_item["catalog_fingerprint"] == catalog_fingerprint(NEW)
+    assert new_item["source"] == f"replan:{waiting}"
+    assert store.catalog_versions(catalog_fingerprint(NEW)) == catalog_versions(NEW)
+
+    # Plans already replanned against the current catalog are not redone
+    assert replan_stored(store, specs=NEW) == []
+
+
+def test_removed_steps_are_re_resolved_without_the_llm(monkeypatch):
+    monkeypatch.setattr(parser, "_llm_prompt_to_plan", lambda p, **k: 1 / 0)
+    new = {
+        "a": {"version": "1.1.0"},
+        "b-next": {"version": "2.0.0", "aliases": ["b"]},
+        "ledger": {"version": "1.0.0", "description": "parse bank statements"},
+    }
+    old = dict(OLD, reader={"version": "1.0.0"})
+    diff = diff_catalogs(catalog_versions(old), catalog_versions(new))
+    steps = _steps("a", "b", "reader")
+    steps[1]["version"] = "1.0.0"
+    steps[2]["description"] = "Parse the bank statements"
+    steps[2]["depends_on"] = [2]
+    result = replan(steps, diff, prompt="p", specs=new)
+    assert not result.llm and result.error is None
+    assert result.replaced == {"b": "b-next", "reader": "ledger"}
+    assert [s["action"] for s in result.plan] == ["a", "b-next", "ledger"]
+    assert result.plan[1]["version"] == "2.0.0"
+    assert result.plan[2]["depends_on"] == [2]
+
+
+def test_replan_stored_follows_only_the_newest_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, "_llm_prompt_to_plan", lambda p, **k: 1 / 0)
+    store = PlanStore(tmp_path / "plans.db")
+    first = store.record(
+        "needs c",
+        {"resolved": [], "missing": ["c", "d"]},
+        catalog_fingerprint(OLD),
+        "cli",
+        catalog_versions(OLD),
+    )
+    [report] = replan_stored(store, specs=NEW)
+    second = report["new_plan_id"]
+    newer = dict(NEW, d={"version": "0.1.0"})
+    reports = replan_stored(store, specs=newer)
+    # The original plan has a successor, so only the successor is replanned
+    assert [r["plan_id"] for r in reports] == [second]
+    assert store.get(reports[0]["new_plan_id"])["plan"]["resolved"] == ["c", "d"]
+    assert store.get(first)["plan"]["missing"] == ["c", "d"]
+
+
+def test_plan_ids_handles_many_capabilities(tmp_path):
+    store = PlanStore(tmp_path / "plans.db")
+    plan_id = store.record("p", _steps("cap1999"), "fp")
+    names = [f"cap{i}" for i in range(2000)]
+    assert store.plan_ids("fp", names) == [plan_id]
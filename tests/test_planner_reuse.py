@@ -0,0 +1,88 @@
+import json
+
+import orchestrator_core.planner.parser as parser
+from orchestrator_core.planner.reuse import PlanReuseIndex, jaccard, shingles
+
+PLAN = [{"step_id": 1, "action": "document_upload", "inputs": {}, "description": ""}]
+
+
+def test_rewordings_share_shingles():
+    a = shingles("upload pdf statements")
+    assert jaccard(a, shingles("upload my PDF statements")) == 1.0
+    assert jaccard(a, shingles("render a sales dashboard")) == 0.0
+    assert jaccard(shingles("?"), shingles("!")) == 0.0
+
+
+def test_index_reuses_similar_prompts_and_audits(tmp_path):
+    index = PlanReuseIndex(
+        path=tmp_path / "index.jsonl", audit_path=tmp_path / "audit.jsonl"
+    )
+    entry_id = index.add("upload pdf statements", PLAN)
+    assert index.reuse("Upload my PDF statements, please") == PLAN
+    assert index.reuse("render a sales dashboard") is None
+
+    audit = [
+        json.loads(line) for line in (tmp_path / "audit.jsonl").read_text().splitlines()
+    ]
+    assert len(audit) == 1
+    assert audit[0]["reused_entry"] == entry_id
+    assert audit[0]["matched_prompt"] == "upload pdf statements"
+
+    # The index is persisted and reloaded
+    reloaded = PlanReuseIndex(path=tmp_path / "index.jsonl")
+    assert len(reloaded) == 1
+    assert reloaded.lookup("upload pdf statements").entry_id == entry_id
+
+
+def test_threshold_is_configurable(tmp_path):
+    strict = PlanReuseIndex(threshold=1.0)
+    strict.add("upload pdf bank statements", PLAN)
+    assert strict.lookup("upload pdf bank statements monthly") is None
+    loose = PlanReuseIndex(threshold=0.5)
+    loose.add("upload pdf bank statements", PLAN)
+    assert loose.lookup("upload pdf bank statements monthly") is not None
+
+
+def test_planner_skips_llm_on_reuse(monkeypatch):
+    calls = []
+
+    def fake_llm(prompt, timeout=None, specs=None):
+        calls.append(prompt)
+        return PLAN
+
+    monkeypatch.setattr(parser, "_llm_prompt_to_plan", fake_llm)
+    monkeypatch.setattr(parser, "load_catalog", lambda: {})
+    index = PlanReuseIndex()
+    assert parser._existing_prompt_to_plan("upload pdf statements", index) == PLAN
+    assert parser._existing_prompt_to_plan("upload my pdf statements", index) == PLAN
+    assert calls == ["upload pdf statements"]
+
+
+def test_entries_are_scoped_to_the_catalog(tmp_path):
+    index = PlanReuseIndex()
+    index.add("upload pdf statements", PLAN, catalog="aaaa")
+    assert index.lookup("upload pdf statements", catalog="aaaa") is not None
+    assert index.lookup("upload pdf statements", catalog="bbbb") is None
+    assert index.lookup("upload pdf statements") is None
+
+
+def test_repeated_adds_are_deduplicated(tmp_path):
+    path = tmp_path / "index.jsonl"
+    index = PlanReuseIndex(path=path)
+    first = index.add("upload pdf statements", PLAN, catalog="aaaa")
+    assert index.add("upload pdf statements", PLAN, catalog="aaaa") == first
+    assert len(path.read_text().splitlines()) == 1
+    assert sum(ids.count(first) for ids in index._buckets.values()) == index.bands
+    # A new plan for the same prompt replaces the old one, also after reloading
+    newer = [dict(PLAN[0], action="other")]
+    index.add("upload pdf statements", newer, catalog="aaaa")
+    reloaded = PlanReuseIndex(path=path)
+    assert len(reloaded) == 1
+    assert reloaded.lookup("upload pdf statements", catalog="aaaa").plan == newer
+
+
+def test_empty_prompts_never_match():
+    index = PlanReuseIndex(threshold=0.0)
+    index.add("!!!", PLAN)
+    assert index.lookup("???") is None
+    assert index.lookup("upload") is None
@@ -0,0 +1,99 @@
+from contextlib import closing
+
+from fastapi.testclient import TestClient
+
+import orchestrator_core.api.main as api
+import orchestrator_core.planner.store as store_module
+from orchestrator_core.catalog.index import catalog_fingerprint
+from orchestrator_core.planner.store import PlanStore, plan_capabilities, prompt_hash
+
+
+def _steps(*actions):
+    return [
+        {"step_id": i, "action": a, "inputs": {}, "description": ""}
+        for i, a in enumerate(actions, start=1)
+    ]
+
+
+def test_plan_capabilities_for_each_format():
+    assert plan_capabilities(_steps("a", "b", "a")) == ["a", "b"]
+    assert plan_capabilities({"resolved": ["a"], "missing": ["b"]}) == ["a", "b"]
+    rich = {"used_capabilities": [{"name": "x"}], "proposed_utilities": [{"name": "y"}]}
+    assert plan_capabilities(rich) == ["x", "y"]
+
+
+def test_record_get_and_search(tmp_path):
+    store = PlanStore(tmp_path / "plans.db")
+    first = store.record("upload pdf", _steps("document_upload"), "fp1", "cli")
+    second = store.record("Upload  PDF", _steps("document_upload"), "fp2", "api")
+    third = store.record("bank statement", {"missing": ["statement_parser"]}, "fp1")
+    assert len({first, second, third}) == 3
+
+    item = store.get(first)
+    assert item["plan"] == _steps("document_upload")
+    assert item["prompt_hash"] == prompt_hash("upload   PDF")
+    assert item["capabilities"] == ["document_upload"]
+    assert store.get(999) is None
+
+    assert [i["id"] for i in store.search(capability="document_upload")["items"]] == [
+        second,
+        first,
+    ]
+    assert store.search(prompt="UPLOAD pdf")["total"] == 2
+    assert store.search(query="bank")["items"][0]["id"] == third
+    assert store.search(catalog_fingerprint="fp1")["total"] == 2
+
+
+def test_search_treats_like_wildcards_literally(tmp_path):
+    store = PlanStore(tmp_path / "plans.db")
+    store.record("grow revenue 100%", _steps("a"))
+    store.record("grow revenue 1000 times", _steps("a"))
+    store.record("parse bank_statement", _steps("a"))
+    store.record("parse bank statement", _steps("a"))
+    assert store.search(query="100%")["total"] == 1
+    assert store.search(query="bank_statement")["total"] == 1
+
+
+def test_record_plan_uses_the_given_catalog(tmp_path, monkeypatch):
+    store = PlanStore(tmp_path / "plans.db")
+    monkeypatch.setattr(store_module, "get_plan_store", lambda: store)
+    specs = {"foo": {"version": "1.0.0"}}
+    with_catalog = store_module.record_plan("a", _steps("foo"), specs=specs)
+    without = store_module.record_plan("b", _steps("foo"))
+    fingerprint = catalog_fingerprint(specs)
+    assert store.get(with_catalog)["catalog_fingerprint"] == fingerprint
+    assert store.catalog_versions(fingerprint) == {"foo": "1.0.0"}
+    assert store.get(without)["catalog_fingerprint"] == ""
+
+
+def test_pagination(tmp_path):
+    store = PlanStore(tmp_path / "plans.db")
+    ids = [store.record(f"prompt {i}", _steps("a")) for i in range(5)]
+    page = store.list(offset=1, limit=2)
+    assert page["total"] == 5
+    assert [i["id"] for i in page["items"]] == [ids[3], ids[2]]
+    assert "plan" not in page["items"][0]
+
+
+def test_plans_endpoints(tmp_path, monkeypatch):
+    store = PlanStore(tmp_path / "plans.db")
+    plan_id = store.record("upload pdf", _steps("document_upload"))
+    monkeypatch.setattr(api, "get_plan_store", lambda: store)
+    client = TestClient(api.app)
+    body = client.get("/plans", params={"limit": 10}).json()
+    assert body["total"] == 1 and body["items"][0]["id"] == plan_id
+    assert client.get(f"/plans/{plan_id}").json()["plan"][0]["action"] == (
+        "document_upload"
+    )
+    assert client.get("/plans/12345").status_code == 404
+    assert client.get("/plans", params={"limit": 0}).status_code == 400
+
+
+def test_capability_lookups_by_plan_use_an_index(tmp_path):
+    store = PlanStore(tmp_path / "plans.db")
+    with closing(store._connect()) as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT capability FROM plan_capabilities"
+            " WHERE plan_id IN (1, 2)"
+        ).fetchall()
+    assert "idx_plan_caps_plan" in " ".join(str(row[-1]) for row in plan)
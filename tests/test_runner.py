@@ -1,7 +1,11 @@
+import asyncio
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import orchestrator_core.executor.runner as runner
+from orchestrator_core.executor.loader import load_utility
 
 
 def test_prepare_environment_installs(monkeypatch, tmp_path):
@@ -40,3 +44,184 @@ def test_execute_utility_runs(tmp_path):
     assert result.return_value == "BOB"
     assert "hello bob" in result.stdout
     assert result.stderr == ""
+
+
+def test_prepare_environment_skips_unchanged_requirements(monkeypatch, tmp_path):
+    project = tmp_path / "proj"
+    util = project / "util"
+    util.mkdir(parents=True)
+    req = util / "requirements.txt"
+    req.write_text("package==1.0")
+
+    calls = []
+
+    def fake_run(args, check):
+        calls.append(args)
+        if args[1:3] == ["-m", "venv"]:
+            (project / "venv").mkdir()
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+
+    runner.prepare_environment(project)
+    assert len(calls) == 2
+    runner.prepare_environment(project)
+    assert len(calls) == 2
+
+    req.write_text("package==2.0")
+    runner.prepare_environment(project)
+    assert len(calls) == 3 and "--force-reinstall" not in calls[-1]
+
+    runner.prepare_environment(project, force_reinstall=True)
+    assert len(calls) == 4 and "--force-reinstall" in calls[-1]
+
+
+def test_concurrent_prepare_environment_installs_once(monkeypatch, tmp_path):
+    project = tmp_path / "proj"
+    util = project / "util"
+    util.mkdir(parents=True)
+    (util / "requirements.txt").write_text("package==1.0")
+
+    calls = []
+    running = []
+
+    def fake_run(args, check):
+        running.append(1)
+        assert len(running) == 1, "two installers ran at once"
+        time.sleep(0.05)
+        calls.append(args)
+        if args[1:3] == ["-m", "venv"]:
+            (project / "venv").mkdir()
+        running.pop()
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        venvs = list(
+            executor.map(lambda _: runner.prepare_environment(project), range(4))
+        )
+    assert venvs == [project / "venv"] * 4
+    # One venv and one install; the others found the stamp
+    assert len(calls) == 2
+
+
+SHARED_UTILITY = """\
+import time
+
+from . import helpers
+
+
+def run(n):
+    for i in range(5):
+        print(helpers.TAG, n, i)
+        time.sleep(0.001)
+    return [helpers.TAG, n]
+"""
+
+
+def test_concurrent_inprocess_executions(monkeypatch, tmp_path):
+    # Two projects ship a utility of the same name with different behaviour
+    projects = []
+    for tag in ("a", "b"):
+        util_dir = tmp_path / tag / "shared"
+        util_dir.mkdir(parents=True)
+        (util_dir / "__init__.py").write_text(SHARED_UTILITY)
+        (util_dir / "helpers.py").write_text(f"TAG = {tag!r}\n")
+        projects.append((tag, tmp_path / tag))
+    monkeypatch.setattr(runner, "prepare_environment", lambda *a, **k: None)
+    path = list(sys.path)
+
+    def call(n):
+        tag, project = projects[n % 2]
+        result = runner.execute_utility(project, "shared", "run", {"n": n})
+        return tag, n, result
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        results = list(executor.map(call, range(400)))
+
+    for tag, n, result in results:
+        assert result.return_value == [tag, n]
+        assert result.stdout == "".join(f"{tag} {n} {i}\n" for i in range(5))
+        assert result.stderr == ""
+    assert sys.path == path
+    assert "shared" not in sys.modules
+
+
+def test_inprocess_utilities_import_themselves_absolutely(monkeypatch, tmp_path):
+    projects = []
+    for tag in ("a", "b"):
+        util_dir = tmp_path / tag / "selfimp"
+        util_dir.mkdir(parents=True)
+        (util_dir / "__init__.py").write_text(
+            "from selfimp.core import run\nfrom . import core\n"
+        )
+        (util_dir / "core.py").write_text(
+            "from selfimp.helpers import TAG\n\n\ndef run():\n    return TAG\n"
+        )
+        (util_dir / "helpers.py").write_text(f"TAG = {tag!r}\n")
+        projects.append((tag, tmp_path / tag))
+    monkeypatch.setattr(runner, "prepare_environment", lambda *a, **k: None)
+
+    def call(n):
+        tag, project = projects[n % 2]
+        return tag, runner.execute_utility(project, "selfimp", "run", {})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(call, range(16)))
+
+    assert all(result.return_value == tag for tag, result in results)
+    package = load_utility(projects[0][1], "selfimp")
+    # The absolute and relative imports gave the same modules
+    assert package.core is sys.modules[f"{package.__name__}.core"]
+    assert package.run is package.core.run
+    assert not [name for name in sys.modules if name.startswith("selfimp")]
+
+
+ASYNC_UTILITY = """\
+import asyncio
+import time
+
+
+async def fetch(n, delay=0.0):
+    await asyncio.sleep(delay)
+    print("fetched", n)
+    return n * 2
+
+
+def compute(n):
+    time.sleep(0.05)
+    return n + 1
+"""
+
+
+def _async_project(monkeypatch, tmp_path):
+    project = tmp_path / "proj"
+    (project / "aio").mkdir(parents=True)
+    (project / "aio" / "__init__.py").write_text(ASYNC_UTILITY)
+    monkeypatch.setattr(runner, "prepare_environment", lambda *a, **k: None)
+    return project
+
+
+def test_execute_utility_runs_async_entrypoints(monkeypatch, tmp_path):
+    project = _async_project(monkeypatch, tmp_path)
+    result = runner.execute_utility(project, "aio", "fetch", {"n": 3})
+    assert result.return_value == 6
+    assert result.stdout == "fetched 3\n"
+
+
+def test_execute_utility_async_awaits_calls_concurrently(monkeypatch, tmp_path):
+    project = _async_project(monkeypatch, tmp_path)
+
+    async def main():
+        calls = [
+            runner.execute_utility_async(
+                project, "aio", "fetch", {"n": n, "delay": 0.3}
+            )
+            for n in range(50)
+        ]
+        calls.append(runner.execute_utility_async(project, "aio", "compute", {"n": 1}))
+        return await asyncio.gather(*calls)
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    assert time.perf_counter() - started < 2.0
+    assert [r.return_value for r in results] == [n * 2 for n in range(50)] + [2]
+    assert [r.stdout for r in results[:50]] == [f"fetched {n}\n" for n in range(50)]
@@ -0,0 +1,104 @@
+import json
+
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+import orchestrator_core.api.main as api
+import orchestrator_core.planner.parser as parser
+from orchestrator_core import telemetry
+from orchestrator_core.telemetry import collect_llm_calls, summarize, track_llm_call
+
+
+class Usage:
+    input_tokens = 120
+    output_tokens = 30
+
+
+class DummyResponse:
+    usage = Usage()
+    output_text = json.dumps(
+        [{"step_id": 1, "action": "foo", "inputs": {}, "description": "d"}]
+    )
+
+
+class DummyClient:
+    def __init__(self, api_key=None, max_retries=None):
+        self.responses = self
+
+    def create(self, **kwargs):
+        return DummyResponse()
+
+
+def test_track_records_usage_outcome_and_sinks(tmp_path):
+    sink = telemetry.JsonlSink(tmp_path / "llm.jsonl")
+    telemetry.add_sink(sink)
+    try:
+        with collect_llm_calls() as calls:
+            with track_llm_call("planner", "m1", "abc") as call:
+                call.record_response(DummyResponse())
+            with pytest.raises(RuntimeError):
+                with track_llm_call("skills", "m2"):
+                    raise RuntimeError("boom")
+    finally:
+        telemetry.remove_sink(sink)
+    assert [c.outcome for c in calls] == ["ok", "error"]
+    assert calls[0].input_tokens == 120 and calls[0].prompt_chars == 3
+    summary = summarize(calls)
+    assert summary["calls"] == 2 and summary["errors"] == 1
+    assert summary["by_endpoint"]["planner"]["output_tokens"] == 30
+    lines = (tmp_path / "llm.jsonl").read_text().splitlines()
+    assert json.loads(lines[1])["error"] == "boom"
+
+
+def test_planner_calls_are_instrumented(monkeypatch):
+    monkeypatch.setattr(openai, "OpenAI", DummyClient)
+    monkeypatch.setattr(parser, "load_catalog", lambda: {})
+    with collect_llm_calls() as calls:
+        parser.prompt_to_plan("do foo")
+    assert len(calls) == 1
+    assert calls[0].endpoint == "planner"
+    assert calls[0].model == parser.PLANNER_MODEL
+    assert calls[0].prompt_chars > len("do foo")
+
+
+def test_api_reports_per_request_usage(monkeypatch):
+    monkeypatch.setattr(openai, "OpenAI", DummyClient)
+    monkeypatch.setattr(parser, "load_catalog", lambda: {})
+    monkeypatch.setattr(api, "record_plan", lambda *a, **k: None)
+    client = TestClient(api.app)
+    response = client.post("/plan", json={"prompt": "do foo"})
+    assert response.status_code == 200
+    assert response.headers["X-LLM-Calls"] == "1"
+    assert response.headers["X-LLM-Input-Tokens"] == "120"
+    assert client.get("/metrics/llm").json()["by_endpoint"]["planner"]["calls"] >= 1
+
+
+class Flaky:
+    def __init__(self, failures, status_code=503):
+        self.failures = failures
+        self.status_code = status_code
+        self.attempts = 0
+
+    def __call__(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            error = RuntimeError("unavailable")
+            error.status_code = self.status_code
+            raise error
+        return "done"
+
+
+def test_transient_failures_are_retried_and_counted(monkeypatch):
+    monkeypatch.setattr(telemetry, "RETRY_BACKOFF", 0)
+    with collect_llm_calls() as calls:
+        with track_llm_call("planner", "m") as call:
+            assert telemetry.call_with_retries(call, Flaky(2)) == "done"
+        with pytest.raises(RuntimeError):
+            with track_llm_call("planner", "m") as call:
+                telemetry.call_with_retries(call, Flaky(5), retries=1)
+        with pytest.raises(RuntimeError):
+            with track_llm_call("planner", "m") as call:
+                telemetry.call_with_retries(call, Flaky(1, status_code=400))
+    assert [c.retries for c in calls] == [2, 1, 0]
+    assert summarize(calls)["retries"] == 3